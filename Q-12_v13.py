@@ -11,13 +11,38 @@ Con k=18 sí (en simulación ideal).
 
 from __future__ import annotations
 
-import itertools
 import math
-import cmath
-from typing import List, Tuple, Dict
-
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
-from qiskit_aer import AerSimulator
+from typing import TYPE_CHECKING, List, Tuple
+
+from qreality import phases as _phases
+from qreality import branches, vchain
+from qreality.analytic import analytic_counts, iteration_phases, q_matrix
+from qreality.autotune import load_profile
+from qreality.bitmask import (
+    CoherenceSpec,
+    count_good,
+    good_mask,
+    good_phys_strings,
+    index_from_phys,
+    is_good_index,
+    measured_string,
+)
+from qreality.cache import file_digest, transpile_cache
+from qreality.instrument import aer_result, note, stage, traced
+from qreality.model import PlaneModel
+from qreality.oracle import compile_phase_oracle
+from qreality.phase_table import lookup_phases
+from qreality.postprocess import count_good_shots, counts_to_arrays, split_good_bad, top_k
+from qreality.preflight import estimate, oracle_bytes, plan_simulation
+from qreality.redundancy import analyze, report
+from qreality.repeat import assemble_repeated
+from qreality.sampling import aer_probabilities, sample_probabilities
+from qreality.snapshots import aer_sweep, numpy_sweep, print_sweep
+from qreality.statevector import statevector_counts
+from qreality.symmetry import symmetric_counts
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit  # qiskit se importa al construir circuitos
 
 # -----------------------------
 # Configuración
@@ -26,47 +51,46 @@ SIGN = +1
 K_FIXED = 18          # <-- clave: 18, no 17
 SHOTS = 4096
 OPT_LEVEL = 1
+BACKEND = "aer"       # "analytic" -> 2D exacto; "numpy" -> statevector propio (O(N)/iter); "symmetric" -> órbitas
+ORACLE = "ancilla"    # "diagonal"/"mcp" -> oráculo sin ancillas (12 qubits)
+USE_CACHE = True      # caché de circuitos transpilados (memoria LRU + QPY en disco)
+SAMPLING = False      # True -> P(x) una vez (save_probabilities) + multinomial de SHOTS
+MCX_MODE = "noancilla"  # "vchain" -> MCP del difusor sintetizada con las ancillas libres
+MEMORY_BUDGET = None  # p.ej. "512M"; None -> $QREALITY_MEMORY_BUDGET o RAM/2
+K_SWEEP = None        # entero -> barrido P(good) para k=0..K_SWEEP en una simulación
+BOTH_SIGNS = False    # True -> ramas '+' y '-' en la misma ejecución (qubit de signo q[12])
 
 
 # -----------------------------
 # Coherencia / estados buenos
 # -----------------------------
 def axis_sign_bit(s_phys: str) -> int:
-    b0 = 1 if s_phys[0] == "1" else 0
-    b1 = 1 if s_phys[1] == "1" else 0
-    b2 = 1 if s_phys[2] == "1" else 0
-    b3 = 1 if s_phys[3] == "1" else 0
-    return b0 ^ b1 ^ b2 ^ b3
+    # XOR de los bits de eje (q0..q3), la paridad que fija SIGN en plane_model
+    x = index_from_phys(s_phys)
+    return sum((x >> b) & 1 for b in plane_model().parity_bits) & 1
+
+def plane_model(sign: int | None = None) -> PlaneModel:
+    # 4 ejes alineados; signo = XOR(q0..q3): '+' => 1, '-' => 0
+    return PlaneModel(planes=3, dim=4, axes=(0, 1, 2, 3), sign=SIGN if sign is None else sign,
+                      sign_rule="axes")
+
+
+def coherence_spec(sign: int | None = None) -> CoherenceSpec:
+    return plane_model(sign).spec()
 
 def coherent_string_phys(s_phys: str) -> bool:
     if len(s_phys) != 12:
         return False
-    axis0_ok = (s_phys[0] == s_phys[4] == s_phys[8])
-    axis1_ok = (s_phys[1] == s_phys[5] == s_phys[9])
-    axis2_ok = (s_phys[2] == s_phys[6] == s_phys[10])
-    axis3_ok = (s_phys[3] == s_phys[7] == s_phys[11])
-    signbit = axis_sign_bit(s_phys)
-    sign_ok = (signbit == 1) if SIGN == +1 else (signbit == 0)
-    return axis0_ok and axis1_ok and axis2_ok and axis3_ok and sign_ok
+    return is_good_index(coherence_spec(), index_from_phys(s_phys))
 
 def coherent_string_measured(bitstring_measured: str) -> bool:
     return coherent_string_phys(bitstring_measured[::-1])
 
-def count_good_states() -> int:
-    good = 0
-    for bits in itertools.product("01", repeat=12):
-        s = "".join(bits)
-        if coherent_string_phys(s):
-            good += 1
-    return good
+def count_good_states(sign: int | None = None) -> int:
+    return count_good(coherence_spec(sign))
 
-def list_good_states() -> List[str]:
-    goods = []
-    for bits in itertools.product("01", repeat=12):
-        s = "".join(bits)
-        if coherent_string_phys(s):
-            goods.append(s)
-    return goods
+def list_good_states(sign: int | None = None) -> List[str]:
+    return good_phys_strings(coherence_spec(sign))
 
 
 # -----------------------------
@@ -101,10 +125,11 @@ def apply_oracle_phased(qc: QuantumCircuit, controls, ph_qubit, phi_oracle: floa
 # -----------------------------
 # Difusión con fase
 # -----------------------------
-def grover_diffusion_phased(qc: QuantumCircuit, qubits, phi_diff: float):
+def grover_diffusion_phased(qc: QuantumCircuit, qubits, phi_diff: float, ancillas=()):
+    # ancillas: qubits limpios (|0>) para la MCP de 11 controles; sin ellas, qc.mcp
     qc.h(qubits)
     qc.x(qubits)
-    qc.mcp(phi_diff, qubits[:-1], qubits[-1])
+    vchain.mcp(qc, phi_diff, qubits[:-1], qubits[-1], clean=ancillas)
     qc.x(qubits)
     qc.h(qubits)
 
@@ -112,184 +137,296 @@ def grover_diffusion_phased(qc: QuantumCircuit, qubits, phi_diff: float):
 # ============================================================
 # Solver 2D exacto para la ÚLTIMA iteración
 # ============================================================
-def _matmul2(A, B):
-    return [
-        [A[0][0]*B[0][0] + A[0][1]*B[1][0], A[0][0]*B[0][1] + A[0][1]*B[1][1]],
-        [A[1][0]*B[0][0] + A[1][1]*B[1][0], A[1][0]*B[0][1] + A[1][1]*B[1][1]],
-    ]
-
-def _matvec2(A, v):
-    return [A[0][0]*v[0] + A[0][1]*v[1], A[1][0]*v[0] + A[1][1]*v[1]]
-
+# Forma cerrada vectorizada (ver qreality/phases.py); la rejilla 360x360 de
+# antes queda como respaldo (method="grid") evaluada en un solo paso NumPy.
 def Q_matrix(a: float, phi_oracle: float, phi_diff: float):
-    s = math.sqrt(a)
-    c = math.sqrt(1.0 - a)
-    eD = cmath.exp(1j * phi_diff)
-    eO = cmath.exp(1j * phi_oracle)
-
-    # |s><s|
-    ss00, ss01 = s*s, s*c
-    ss10, ss11 = s*c, c*c
-
-    # D(phi_diff) = I + (e^{i phi_diff}-1) |s><s|
-    lam = (eD - 1.0)
-    D = [
-        [1.0 + lam*ss00,      lam*ss01],
-        [     lam*ss10, 1.0 + lam*ss11],
-    ]
-
-    # O(phi_oracle) = diag(e^{i phi_oracle}, 1)
-    O = [
-        [eO, 0.0],
-        [0.0, 1.0],
-    ]
-
-    # Iteración: Q = D * O
-    return _matmul2(D, O)
+    # Iteración: Q = D(phi_diff) * O(phi_oracle) en la base (|good>, |bad>)
+    return q_matrix(a, phi_oracle, phi_diff)
 
 def evolve(a: float, steps: int, phi_oracle: float, phi_diff: float):
-    s = math.sqrt(a); c = math.sqrt(1.0 - a)
-    v = [s, c]
-    Q = Q_matrix(a, phi_oracle, phi_diff)
-    for _ in range(steps):
-        v = _matvec2(Q, v)
-    return v
-
-def find_last_step_phases(a: float, k_fixed: int) -> Tuple[float, float, float, float]:
+    return _phases.evolve(a, steps, phi_oracle, phi_diff)
+
+def find_last_step_phases(a: float, k_fixed: int, method: str = "closed") -> Tuple[float, float, float, float]:
     """
     (k_fixed-1) iteraciones estándar (pi,pi) y última iteración con (phi_last,varphi_last)
-    minimizando |bad|.
+    anulando |bad|.
+    """
+    return _phases.find_last_step_phases(a, k_fixed, method=method)
+
+def last_step_phases(M: int, k_fixed: int, n: int = 12) -> Tuple[float, float, float, float]:
+    """
+    Fases de la última iteración: consulta O(1) en la tabla precalculada
+    (python -m qreality.phase_table) y, si no está o no cubre (n, M, k), se resuelven.
     """
-    v_pre = evolve(a, k_fixed - 1, math.pi, math.pi)
-
-    two_pi = 2.0 * math.pi
-    best_err = None
-    best_phi = 0.0
-    best_var = 0.0
-    best_vf = None
-
-    GRID = 360
-    for i in range(GRID):
-        phi = two_pi * i / GRID
-        for j in range(GRID):
-            var = two_pi * j / GRID
-            Q = Q_matrix(a, phi, var)
-            vf = _matvec2(Q, v_pre)
-            err = abs(vf[1])
-            if best_err is None or err < best_err:
-                best_err, best_phi, best_var, best_vf = err, phi, var, vf
-
-    step = 0.05
-    for _ in range(80):
-        improved = False
-        for dphi in (0.0, step, -step):
-            for dvar in (0.0, step, -step):
-                phi = (best_phi + dphi) % two_pi
-                var = (best_var + dvar) % two_pi
-                Q = Q_matrix(a, phi, var)
-                vf = _matvec2(Q, v_pre)
-                err = abs(vf[1])
-                if err < best_err:
-                    best_err, best_phi, best_var, best_vf = err, phi, var, vf
-                    improved = True
-        if not improved:
-            step *= 0.5
-            if step < 1e-12:
-                break
-
-    p_good = abs(best_vf[0])**2
-    return best_phi, best_var, float(p_good), float(best_err)
+    entry = lookup_phases(n, M, k_fixed)
+    if entry is not None:
+        return entry
+    return find_last_step_phases(M / 2**n, k_fixed)
 
 
 # -----------------------------
-# Circuito: (k-1) estándar + última ajustada
+# Bloques del circuito
 # -----------------------------
-def build_circuit_exact(iterations: int, phi_oracle_last: float, phi_diff_last: float) -> QuantumCircuit:
-    data = QuantumRegister(12, "q")
+def new_circuit(oracle: str = "ancilla", both_signs: bool = False) -> QuantumCircuit:
+    """
+    Registros del circuito; con oráculo sin ancillas solo q (12) y c.
+    Con both_signs=True q[12] es el qubit de signo (qreality.branches).
+    """
+    from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+
+    data = QuantumRegister(12 + both_signs, "q")
+    c = ClassicalRegister(12 + both_signs, "c")
+    if oracle != "ancilla":
+        return QuantumCircuit(data, c)
+
     eq0 = QuantumRegister(1, "eq0")
     eq1 = QuantumRegister(1, "eq1")
     eq2 = QuantumRegister(1, "eq2")
     eq3 = QuantumRegister(1, "eq3")
     t = QuantumRegister(9, "t")
     ph = QuantumRegister(1, "ph")
-    c = ClassicalRegister(12, "c")
+    return QuantumCircuit(data, eq0, eq1, eq2, eq3, t, ph, c)
+
+def build_prep(oracle: str = "ancilla", both_signs: bool = False) -> QuantumCircuit:
+    qc = new_circuit(oracle, both_signs)
+    r = {reg.name: reg for reg in qc.qregs}
+    qc.h(r["q"])
+    if oracle == "ancilla":
+        qc.x(r["ph"][0])  # ph = |1>
+    return qc
 
-    qc = QuantumCircuit(data, eq0, eq1, eq2, eq3, t, ph, c)
-    q = data
+def build_iteration(phi_o: float, phi_d: float, oracle: str = "ancilla",
+                    mcx_mode: str = "noancilla", both_signs: bool = False,
+                    sign: int | None = None) -> QuantumCircuit:
+    """Una iteración (oráculo con fase phi_o + difusión con fase phi_d) como bloque."""
+    vchain.check_mode(mcx_mode)
+    sign = SIGN if sign is None else sign
+    qc = new_circuit(oracle, both_signs)
+    r = {reg.name: reg for reg in qc.qregs}
+    q = r["q"]
+    data = list(q)[:12]  # la difusión no toca el qubit de signo
+
+    if oracle != "ancilla":
+        # Oráculo sin ancillas compilado desde C(x): solo los 12 qubits de datos (+ signo)
+        if both_signs:
+            qc.compose(branches.joint_oracle([coherence_spec(s) for s in branches.SIGNS], phi_o, oracle),
+                       q, inplace=True)
+        else:
+            qc.compose(compile_phase_oracle(coherence_spec(sign), 12, phi_o, oracle), q, inplace=True)
+        grover_diffusion_phased(qc, data, phi_d)
+        return qc
 
-    qc.h(q)
-    qc.x(ph[0])  # ph = |1>
+    eq0, eq1, eq2, eq3 = r["eq0"], r["eq1"], r["eq2"], r["eq3"]
+    t, ph = r["t"], r["ph"]
 
-    for it in range(iterations):
-        if it == iterations - 1:
-            phi_o = phi_oracle_last
-            phi_d = phi_diff_last
-        else:
-            phi_o = math.pi
-            phi_d = math.pi
+    compute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
+    compute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
+    compute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
+    compute_eq_three(qc, q[3], q[7], q[11], eq3[0], t[6], t[7])
+
+    # signo = XOR(q0..q3) en t[8]; con both_signs q[12]=1 ('-') invierte el signo
+    sign_model = plane_model(+1 if both_signs else sign)
+    sign_qubit = q[12] if both_signs else None
+    branches.compute_sign_flag(qc, q, t[8], sign_model, sign_qubit)
 
-        compute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
-        compute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
-        compute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
-        compute_eq_three(qc, q[3], q[7], q[11], eq3[0], t[6], t[7])
+    apply_oracle_phased(qc, [eq0[0], eq1[0], eq2[0], eq3[0], t[8]], ph[0], phi_o)
 
-        qc.cx(q[0], t[8])
-        qc.cx(q[1], t[8])
-        qc.cx(q[2], t[8])
-        qc.cx(q[3], t[8])
+    branches.uncompute_sign_flag(qc, q, t[8], sign_model, sign_qubit)
 
-        if SIGN == -1:
-            qc.x(t[8])
+    uncompute_eq_three(qc, q[3], q[7], q[11], eq3[0], t[6], t[7])
+    uncompute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
+    uncompute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
+    uncompute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
 
-        apply_oracle_phased(qc, [eq0[0], eq1[0], eq2[0], eq3[0], t[8]], ph[0], phi_o)
+    # eq/t ya descomputados: vuelven a estar a |0> y sirven de ancillas limpias
+    grover_diffusion_phased(qc, data, phi_d,
+                            vchain.idle_ancillas(qc) if mcx_mode == "vchain" else ())
+    return qc
 
-        if SIGN == -1:
-            qc.x(t[8])
-        qc.cx(q[3], t[8])
-        qc.cx(q[2], t[8])
-        qc.cx(q[1], t[8])
-        qc.cx(q[0], t[8])
 
-        uncompute_eq_three(qc, q[3], q[7], q[11], eq3[0], t[6], t[7])
-        uncompute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
-        uncompute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
-        uncompute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
+# -----------------------------
+# Circuito: (k-1) estándar + última ajustada
+# -----------------------------
+def build_circuit_exact(iterations: int, phi_oracle_last: float | None = None,
+                        phi_diff_last: float | None = None,
+                        oracle: str = "ancilla", mcx_mode: str = "noancilla",
+                        both_signs: bool = False, sign: int | None = None) -> QuantumCircuit:
+    if phi_oracle_last is None or phi_diff_last is None:
+        phi_oracle_last, phi_diff_last, _, _ = last_step_phases(count_good_states(sign), iterations)
+    qc = build_prep(oracle, both_signs)
+    step = build_iteration(math.pi, math.pi, oracle, mcx_mode, both_signs, sign)
 
-        grover_diffusion_phased(qc, list(q), phi_d)
+    for it in range(iterations):
+        if it == iterations - 1:
+            qc.compose(build_iteration(phi_oracle_last, phi_diff_last, oracle, mcx_mode, both_signs,
+                                       sign), inplace=True)
+        else:
+            qc.compose(step, inplace=True)
 
-    qc.measure(q, c)
+    qc.measure(qc.qregs[0], qc.cregs[0])
     return qc
 
-
-def run():
+def build_transpiled(iterations: int, phi_oracle_last: float, phi_diff_last: float, backend,
+                     opt_level: int = 1, oracle: str = "ancilla",
+                     cache_inputs: dict | None = None, measure: bool = True,
+                     mcx_mode: str = "noancilla", both_signs: bool = False,
+                     sign: int | None = None) -> QuantumCircuit:
+    # solo la última iteración (fases propias) se transpila aparte
+    return assemble_repeated(lambda: build_prep(oracle, both_signs),
+                             lambda: build_iteration(math.pi, math.pi, oracle, mcx_mode, both_signs, sign),
+                             iterations, backend, opt_level,
+                             last_step=lambda: build_iteration(phi_oracle_last, phi_diff_last,
+                                                               oracle, mcx_mode, both_signs, sign),
+                             cache_inputs=cache_inputs, measure=measure,
+                             last_inputs={"phases": (phi_oracle_last, phi_diff_last)})
+
+
+def sweep(k_max: int = 60, backend: str = "numpy", oracle: str = "ancilla", opt_level: int = 1):
+    """
+    P(good) para k = 0..k_max iteraciones estándar (pi, pi) en una sola simulación.
+    (La última iteración con fases exactas depende de k: ver find_last_step_phases.)
+    """
+    good = good_mask(coherence_spec())
+    if backend == "numpy":
+        result = numpy_sweep(good, k_max)
+    elif backend == "aer":
+        from qiskit_aer import AerSimulator
+
+        sim = AerSimulator(method="statevector")
+        result = aer_sweep(lambda: build_prep(oracle), lambda: build_iteration(math.pi, math.pi, oracle),
+                           k_max, good, sim, opt_level)
+    else:
+        raise ValueError(f"backend desconocido: {backend!r} (usa 'numpy' o 'aer')")
+    print_sweep(result)
+    return result
+
+@traced("v13")
+def run(backend: str = BACKEND, oracle: str = ORACLE, use_cache: bool = USE_CACHE,
+        sampling: bool = SAMPLING, memory_budget: int | str | None = MEMORY_BUDGET,
+        mcx_mode: str = MCX_MODE, k_fixed: int = K_FIXED, shots: int = SHOTS,
+        opt_level: int = OPT_LEVEL, both_signs: bool = BOTH_SIGNS, sign: int | None = None):
+    """sign: +1/-1 (None -> SIGN del módulo); con both_signs se simulan las dos ramas."""
+    if both_signs and backend == "symmetric":
+        raise ValueError("both_signs no está soportado con el backend 'symmetric'")
+    sign = SIGN if sign is None else sign
     N = 2**12
-    M = count_good_states()
+    specs = [coherence_spec(s) for s in branches.SIGNS]
+    with stage("count_good"):
+        M = count_good_states(sign)
+        if both_signs:
+            # las dos ramas comparten k y fases: las de la rama con más estados good
+            M_branches = [count_good(spec) for spec in specs]
+            M = max(M_branches)
     a = M / N
 
-    print(f"SIGN={'+' if SIGN==1 else '-'}  N={N}  M={M}  a={a:.12f}  k_fijo={K_FIXED}")
-
-    phi_last, var_last, p_theory, bad_theory = find_last_step_phases(a, K_FIXED)
+    print(f"SIGN={'±' if both_signs else '+' if sign == 1 else '-'}  N={N}  M={M}  a={a:.12f}  k_fijo={k_fixed}")
+    if both_signs:
+        print("  ".join(f"M({branches.label(b)})={m}" for b, m in enumerate(M_branches))
+              + "  (qubit de signo q[12]: 0 -> '+', 1 -> '-')")
+    note(M=M, sign="±" if both_signs else sign)
+    with stage("redundancy"):
+        analysis = analyze(coherence_spec(sign))
+    if analysis.empty and not both_signs:
+        print(report(analysis))
+        return
+
+    with stage("phases"):
+        phi_last, var_last, p_theory, bad_theory = last_step_phases(M, k_fixed)
     print("\n[Exact last-step phases]")
     print(f"phi_oracle_last = {phi_last:.12f} rad")
     print(f"phi_diff_last   = {var_last:.12f} rad")
-    print(f"P_theory(k={K_FIXED}) ≈ {p_theory:.15f}")
+    print(f"P_theory(k={k_fixed}) ≈ {p_theory:.15f}")
     print(f"|bad|_theory      ≈ {bad_theory:.3e}")
 
-    qc = build_circuit_exact(K_FIXED, phi_last, var_last)
-    sim = AerSimulator()
-    tqc = transpile(qc, sim, optimization_level=OPT_LEVEL)
-    res = sim.run(tqc, shots=SHOTS).result()
-    counts = res.get_counts()
-
-    good_shots = sum(v for k, v in counts.items() if coherent_string_measured(k))
-    print(f"\nShots coherentes: {good_shots} / {SHOTS} = {good_shots/SHOTS:.6f}")
+    if backend == "analytic":
+        phases = iteration_phases(k_fixed, last=(phi_last, var_last))
+        with stage("simulate"):
+            if both_signs:
+                # las dos ramas en una pasada (una fila por rama)
+                counts = branches.analytic_counts(specs, phases, shots)
+            else:
+                counts = analytic_counts(coherence_spec(sign), phases, shots)
+    elif backend == "numpy":
+        phases = iteration_phases(k_fixed, last=(phi_last, var_last))
+        with stage("simulate"):
+            if both_signs:
+                counts = branches.numpy_counts(specs, phases, shots)
+            else:
+                counts = statevector_counts(good_mask(coherence_spec(sign)), 12, phases, shots)
+    elif backend == "symmetric":
+        # una amplitud por órbita (permutaciones de planos); 2^12 solo al muestrear
+        phases = iteration_phases(k_fixed, last=(phi_last, var_last))
+        with stage("simulate"):
+            counts = symmetric_counts(coherence_spec(sign), phases, shots)
+    elif backend == "aer":
+        # memoria/tiempo antes de simular; si no cabe se degrada (oráculo, precisión, método)
+        with stage("preflight"):
+            plan = plan_simulation(lambda o: new_circuit(o, both_signs).num_qubits, oracle, memory_budget,
+                                   circuit_bytes_for=lambda o: oracle_bytes(o, 12 + both_signs, k_fixed))
+        print(plan.report())
+        oracle = plan.oracle
+        note(plan={"oracle": oracle, "method": plan.method, "precision": plan.precision,
+                   "qubits": plan.n_qubits})
+        profile = load_profile("v13", oracle, k_fixed)  # python -m qreality.autotune
+        if profile:
+            print(f"[autotune] perfil: {profile}")
+        sim = plan.simulator(**profile)
+        key = None
+        if use_cache:
+            # las fases de la última iteración las añade build_transpiled solo al bloque "last"
+            key = {"variant": "v13", "source": file_digest(__file__), "sign": sign,
+                   "oracle": oracle, "mcx_mode": mcx_mode, "both_signs": both_signs}
+        tqc = build_transpiled(k_fixed, phi_last, var_last, sim, opt_level, oracle=oracle,
+                               cache_inputs=key, measure=not sampling, mcx_mode=mcx_mode,
+                               both_signs=both_signs, sign=sign)
+        if use_cache:
+            print(transpile_cache().report())
+        if mcx_mode == "vchain" and oracle == "ancilla":
+            print(vchain.compare(build_iteration(math.pi, math.pi, oracle, both_signs=both_signs, sign=sign),
+                                 build_iteration(math.pi, math.pi, oracle, mcx_mode, both_signs, sign),
+                                 opt_level))
+        print(estimate(tqc, plan).report())
+        if sampling:
+            # P(x) una sola vez + multinomial: coste independiente de shots
+            with stage("simulate"):
+                probs = aer_probabilities(tqc, sim)
+            with stage("sampling"):
+                counts = sample_probabilities(probs, shots)
+        else:
+            with stage("simulate"):
+                res = sim.run(tqc, shots=shots).result()
+            aer_result(res)
+            counts = res.data(0)["counts"]  # claves hex, sin formatear strings
+    else:
+        raise ValueError(f"backend desconocido: {backend!r} (usa 'aer', 'analytic', 'numpy' o 'symmetric')")
 
-    bads = {k: v for k, v in counts.items() if not coherent_string_measured(k)}
-    if bads:
-        print("MALOS:", sorted(bads.items(), key=lambda x: x[1], reverse=True)[:10])
+    # conteos -> arrays (idx, cnt); clasificación con la máscara, top-k con argpartition
+    with stage("postprocess"):
+        idx, cnt = counts_to_arrays(counts)
+        if both_signs:
+            rows = branches.summary(idx, cnt, specs)
+        else:
+            good = good_mask(coherence_spec(sign))
+            good_shots = count_good_shots(idx, cnt, good)
+            bad_idx, bad_cnt = split_good_bad(idx, cnt, good)["bad"]
+            if bad_idx.size:
+                top_idx, top_cnt = top_k(bad_idx, bad_cnt, 10)
+    if both_signs:
+        note(p_good={branches.label(b): r["p_good"] for b, r in enumerate(rows)})
+        print()
+        print(branches.report(rows))
+        return
+    note(p_good=good_shots / shots)
+    print(f"\nShots coherentes: {good_shots} / {shots} = {good_shots/shots:.6f}")
+
+    if bad_idx.size:
+        print("MALOS:", [(measured_string(x, 12), c) for x, c in zip(top_idx.tolist(), top_cnt.tolist())])
     else:
         print("MALOS: ninguno (100% coherentes en estos shots).")
 
 
 if __name__ == "__main__":
-    run()
+    if K_SWEEP is not None:
+        sweep(K_SWEEP)
+    else:
+        run()
@@ -0,0 +1,37 @@
+"""
+qreality: utilidades compartidas por los scripts quant_v*/Q-12_v*.
+
+Los scripts siguen siendo ejecutables por separado; este paquete agrupa las
+piezas comunes (motor de coherencia, backends, herramientas de rendimiento).
+"""
+
+from qreality.bitmask import (
+    CoherenceSpec,
+    count_good,
+    good_indices,
+    good_mask,
+    good_phys_strings,
+    index_from_measured,
+    index_from_phys,
+    is_good_index,
+    measured_string,
+    phys_string,
+    popcount,
+)
+from qreality.combinatorics import count_structured, iter_good_indices
+
+__all__ = [
+    "CoherenceSpec",
+    "count_good",
+    "count_structured",
+    "good_indices",
+    "good_mask",
+    "good_phys_strings",
+    "index_from_measured",
+    "index_from_phys",
+    "is_good_index",
+    "iter_good_indices",
+    "measured_string",
+    "phys_string",
+    "popcount",
+]
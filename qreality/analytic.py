@@ -0,0 +1,117 @@
+"""
+qreality/analytic.py
+
+Backend "analytic": los oráculos solo aplican una fase sobre la partición
+good/bad y la difusión refleja sobre |s>, así que la evolución de Grover vive
+en el subespacio 2D span{|good>, |bad>} (el mismo modelo que Q_matrix/evolve
+de Q-12_v13.py). La distribución final es uniforme dentro de good y dentro de
+bad; basta con M/N, k y las fases para obtenerla y muestrear los conteos.
+
+Los conteos se devuelven en el mismo formato que AerSimulator.get_counts():
+{bitstring_medido: shots}, con q[0] a la derecha.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from qreality.bitmask import CoherenceSpec, good_indices
+
+
+Phases = Tuple[float, float]  # (phi_oracle, phi_diff)
+
+
+def iteration_phases(iterations: int, last: Phases | None = None) -> List[Phases]:
+    """k iteraciones estándar (pi, pi); opcionalmente la última con fases propias."""
+    phases = [(math.pi, math.pi)] * iterations
+    if last is not None and iterations > 0:
+        phases[-1] = last
+    return phases
+
+
+def q_matrix(a: float, phi_oracle: float, phi_diff: float) -> np.ndarray:
+    """Q = D(phi_diff) O(phi_oracle) en la base (|good>, |bad>)."""
+    s = math.sqrt(a)
+    c = math.sqrt(1.0 - a)
+    ss = np.array([[s * s, s * c], [s * c, c * c]], dtype=complex)
+    D = np.eye(2, dtype=complex) + (np.exp(1j * phi_diff) - 1.0) * ss
+    O = np.diag([np.exp(1j * phi_oracle), 1.0])
+    return D @ O
+
+
+def final_amplitudes(a: float, phases: Sequence[Phases]) -> np.ndarray:
+    """Amplitudes (good, bad) tras aplicar las iteraciones, partiendo de |s>."""
+    v = np.array([math.sqrt(a), math.sqrt(1.0 - a)], dtype=complex)
+    for phi_o, phi_d in phases:
+        v = q_matrix(a, phi_o, phi_d) @ v
+    return v
+
+
+def p_good(a: float, phases: Sequence[Phases]) -> float:
+    g, b = final_amplitudes(a, phases)
+    pg = abs(g) ** 2
+    return float(pg / (pg + abs(b) ** 2))
+
+
+def p_good_batch(a: Sequence[float], phases: Sequence[Phases]) -> np.ndarray:
+    """p_good para varios M/N a la vez (p. ej. las ramas ±): matrices (B, 2, 2) por iteración."""
+    a = np.asarray(a, dtype=float)
+    s, c = np.sqrt(a), np.sqrt(1.0 - a)
+    v = np.stack([s, c], axis=-1).astype(complex)
+    ss = v[:, :, None].real * v[:, None, :].real
+    for phi_o, phi_d in phases:
+        v = v * np.array([np.exp(1j * phi_o), 1.0])
+        v = v + (np.exp(1j * phi_d) - 1.0) * np.einsum("bij,bj->bi", ss, v)
+    pg = np.abs(v[:, 0]) ** 2
+    return pg / (pg + np.abs(v[:, 1]) ** 2)
+
+
+def sample_counts(good: np.ndarray, n_bits: int, prob_good: float, shots: int,
+                  rng: np.random.Generator | None = None) -> Dict[str, int]:
+    """
+    Muestrea `shots` medidas de la distribución uniforme-por-bloques:
+    P(x) = prob_good/M para x good y (1-prob_good)/(N-M) para x bad.
+    Los estados bad se eligen por rango sin materializar los 2^n índices.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    n_states = 1 << n_bits
+    m_good = len(good)
+
+    if m_good == 0:
+        prob_good = 0.0
+    elif m_good == n_states:
+        prob_good = 1.0
+    n_good = int(rng.binomial(shots, min(max(prob_good, 0.0), 1.0)))
+    n_bad = shots - n_good
+
+    idx_parts = []
+    cnt_parts = []
+    if n_good:
+        c = rng.multinomial(n_good, np.full(m_good, 1.0 / m_good))
+        nz = c > 0
+        idx_parts.append(good[nz].astype(np.int64))
+        cnt_parts.append(c[nz])
+    if n_bad:
+        ranks = rng.integers(0, n_states - m_good, size=n_bad, dtype=np.int64)
+        # rango r entre los bad -> índice: r + #good con (good_i - i) <= r
+        shift = np.searchsorted(good.astype(np.int64) - np.arange(m_good), ranks, side="right")
+        u, c = np.unique(ranks + shift, return_counts=True)
+        idx_parts.append(u)
+        cnt_parts.append(c)
+
+    counts: Dict[str, int] = {}
+    fmt = f"0{n_bits}b"
+    for idx, cnt in zip(idx_parts, cnt_parts):
+        for x, v in zip(idx.tolist(), cnt.tolist()):
+            counts[format(x, fmt)] = v
+    return counts
+
+
+def analytic_counts(spec: CoherenceSpec, phases: Sequence[Phases], shots: int,
+                    rng: np.random.Generator | None = None) -> Dict[str, int]:
+    good = good_indices(spec)
+    a = len(good) / (1 << spec.n_bits)
+    return sample_counts(good, spec.n_bits, p_good(a, phases), shots, rng)
@@ -0,0 +1,188 @@
+"""
+qreality/autotune.py
+
+Autoajuste de opciones de AerSimulator sobre los circuitos transpilados
+reales de cada variante, en esta máquina:
+
+  method, precision, fusion_enable, fusion_max_qubit, max_parallel_threads,
+  statevector_parallel_threshold, max_parallel_shots
+
+Búsqueda por coordenadas: se parte de los valores por defecto de Aer y se
+ajusta una opción cada vez (la mejor se queda para las siguientes), midiendo
+el mínimo de `repeats` ejecuciones; un cambio solo se acepta si mejora al
+menos un MIN_GAIN. El mejor perfil se guarda por
+(variante, oráculo, k) en ~/.cache/qreality/aer_profiles.json
+($QREALITY_AER_PROFILE) y run() lo carga solo; para un k sin perfil se usa
+el del k más cercano de la misma variante y oráculo.
+
+Uso:
+    python -m qreality.autotune v8 --oracle diagonal --iterations 20
+    python -m qreality.autotune v5 v8 v10 v13 --methods statevector matrix_product_state
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from qreality import variants
+
+
+Options = Dict[str, Any]
+
+DEFAULT_METHODS = ("statevector",)
+DEFAULT_PRECISIONS = ("double", "single")
+MIN_GAIN = 0.03   # mejora relativa mínima para cambiar una opción (por debajo es ruido)
+
+
+def profile_path() -> Path:
+    env = os.environ.get("QREALITY_AER_PROFILE")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "qreality" / "aer_profiles.json"
+
+
+def _cpus() -> int:
+    return os.cpu_count() or 1
+
+
+def profile_key(variant: str, oracle: str, iterations: int) -> str:
+    return f"{variant}:{oracle}:k={iterations}"
+
+
+def _read(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_profile(variant: str, oracle: str, iterations: int,
+                 path: str | os.PathLike | None = None) -> Options:
+    """
+    Opciones de AerSimulator guardadas para (variante, oráculo, k) en esta
+    máquina; {} si no hay. Sin k exacto se usa el k más cercano.
+    """
+    profiles = _read(Path(path) if path is not None else profile_path()).get("profiles", {})
+    prefix = f"{variant}:{oracle}:k="
+    best: Tuple[int, Options] | None = None
+    for key, entry in profiles.items():
+        if not key.startswith(prefix) or entry.get("cpus") != _cpus():
+            continue
+        dist = abs(int(key[len(prefix):]) - iterations)
+        if best is None or dist < best[0]:
+            best = (dist, entry["options"])
+    return dict(best[1]) if best else {}
+
+
+def save_profile(variant: str, oracle: str, iterations: int, options: Options, seconds: float,
+                 baseline: float, path: str | os.PathLike | None = None) -> Path:
+    path = Path(path) if path is not None else profile_path()
+    data = _read(path)
+    data.setdefault("profiles", {})[profile_key(variant, oracle, iterations)] = {
+        "options": options, "seconds": seconds, "baseline_seconds": baseline,
+        "cpus": _cpus(), "machine": platform.node(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    return path
+
+
+def candidate_space(methods: Sequence[str] = DEFAULT_METHODS,
+                    precisions: Sequence[str] = DEFAULT_PRECISIONS) -> List[Tuple[str, list]]:
+    """(opción, valores) en el orden en que se ajustan; el primer valor es el de Aer."""
+    cpus = _cpus()
+    threads = [0] + [t for t in (1, 2, 4, 8, 16, 32, 64, 128) if t < cpus]
+    space: List[Tuple[str, list]] = [
+        ("method", list(methods)),
+        ("precision", list(precisions)),
+        ("fusion_enable", [True, False]),
+        ("fusion_max_qubit", [5, 2, 3, 4]),
+    ]
+    if cpus > 1:
+        space += [
+            ("max_parallel_threads", threads),
+            ("statevector_parallel_threshold", [14, 10, 12, 16]),
+            ("max_parallel_shots", [0, 1]),
+        ]
+    return space
+
+
+def _time_run(tqc, options: Options, shots: int, repeats: int) -> float:
+    from qiskit_aer import AerSimulator
+
+    sim = AerSimulator(**options)
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        sim.run(tqc, shots=shots).result()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def tune(variant: str, oracle: str = "ancilla", iterations: int | None = None, shots: int = 4096,
+         repeats: int = 3, methods: Sequence[str] = DEFAULT_METHODS,
+         precisions: Sequence[str] = DEFAULT_PRECISIONS, opt_level: int = 1,
+         verbose: bool = True) -> Tuple[Options, float, float]:
+    """Devuelve (mejores opciones, tiempo, tiempo con opciones por defecto)."""
+    from qiskit_aer import AerSimulator
+
+    if iterations is None:
+        iterations = variants.default_iterations(variant)
+    tqc = variants.transpiled(variant, iterations, AerSimulator(), oracle, opt_level)
+
+    best: Options = {}
+    baseline = best_t = _time_run(tqc, best, shots, repeats)
+    if verbose:
+        print(f"[autotune] {profile_key(variant, oracle, iterations)} qubits={tqc.num_qubits} "
+              f"puertas={tqc.size()} por defecto={baseline:.3f}s")
+
+    for name, values in candidate_space(methods, precisions):
+        if name == "fusion_max_qubit" and best.get("fusion_enable") is False:
+            continue
+        for value in values:
+            if value == best.get(name, values[0]):
+                continue   # valor actual, ya medido
+            trial = dict(best, **{name: value})
+            t = _time_run(tqc, trial, shots, repeats)
+            if verbose:
+                print(f"[autotune]   {name}={value!r}: {t:.3f}s")
+            if t < best_t * (1.0 - MIN_GAIN):
+                best, best_t = trial, t
+    if verbose:
+        print(f"[autotune] mejor={best} {best_t:.3f}s (x{baseline / best_t:.2f})")
+    return best, best_t, baseline
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Autoajuste de AerSimulator por variante.")
+    parser.add_argument("variants", nargs="+", choices=sorted(variants.VARIANTS))
+    parser.add_argument("--oracle", default="ancilla", choices=("ancilla", "diagonal", "mcp"))
+    parser.add_argument("--iterations", type=int, nargs="*", default=None,
+                        help="valores de k (por defecto el k de cada variante)")
+    parser.add_argument("--shots", type=int, default=4096)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--methods", nargs="+", default=list(DEFAULT_METHODS))
+    parser.add_argument("--precisions", nargs="+", default=list(DEFAULT_PRECISIONS))
+    args = parser.parse_args(argv)
+
+    for variant in args.variants:
+        for k in args.iterations or [None]:
+            k = variants.default_iterations(variant) if k is None else k
+            options, t, baseline = tune(variant, args.oracle, k, args.shots, args.repeats,
+                                        args.methods, args.precisions)
+            path = save_profile(variant, args.oracle, k, options, t, baseline)
+    print(f"[autotune] perfiles guardados en {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+qreality/bench.py
+
+Benchmark de las variantes (v5, v8, v10, v13) por etapas, sobre el mismo
+camino que run() con backend="aer":
+
+  build       construir los bloques prep / step (/ last en v13)
+  transpile   transpilar los bloques y ensamblar k iteraciones (sin caché)
+  simulate    AerSimulator.run con `shots`
+  postprocess conteos -> arrays, máscara good, top-10
+
+Por etapa: tiempo de pared (mínimo de `repeats` ejecuciones) y pico de RSS
+(VmHWM, reiniciado antes de cada etapa vía /proc/self/clear_refs; fuera de
+Linux, ru_maxrss del proceso).
+Por configuración: anchura, profundidad, puertas y CX del circuito
+transpilado, CX por iteración en base cx/u y P(good) obtenida.
+
+Uso:
+    python -m qreality.bench run v5 v13 --oracle diagonal --iterations 10 20 \\
+        --opt-levels 1 2 --shots 1024 65536 -o bench.json
+    python -m qreality.bench compare baseline.json bench.json --tolerance 0.25
+
+compare sale con código 1 si hay regresiones: tiempo o RSS por encima de la
+tolerancia relativa (y de un mínimo absoluto, para no marcar ruido), más
+puertas/profundidad/CX, o P(good) más baja.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence
+
+from qreality import variants
+from qreality.instrument import peak_rss, reset_peak_rss
+
+STAGES = ("build", "transpile", "simulate", "postprocess")
+MIN_SECONDS = 0.05          # diferencias de tiempo por debajo de esto no cuentan
+MIN_RSS = 8 * 2**20         # ídem para RSS (bytes)
+P_GOOD_TOLERANCE = 0.01
+
+Record = Dict[str, Any]
+
+
+# ---------------------------
+# Medida
+# ---------------------------
+@contextmanager
+def stage(stages: Dict[str, Dict[str, float]], name: str) -> Iterator[None]:
+    reset_peak_rss()
+    t0 = time.perf_counter()
+    yield
+    stages[name] = {"seconds": time.perf_counter() - t0, "peak_rss": peak_rss()}
+
+
+def environment() -> Dict[str, Any]:
+    import numpy
+    import qiskit
+    import qiskit_aer
+
+    return {"machine": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version(),
+            "numpy": numpy.__version__, "qiskit": qiskit.__version__,
+            "qiskit_aer": qiskit_aer.__version__, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+# ---------------------------
+# Una configuración
+# ---------------------------
+def bench_one(name: str, iterations: int, opt_level: int, shots: int,
+              oracle: str = "ancilla", seed: int | None = 1234) -> Record:
+    from qreality.bitmask import good_mask
+    from qreality.postprocess import count_good_shots, counts_to_arrays, top_k
+    from qreality.preflight import oracle_bytes, plan_simulation
+    from qreality.repeat import assemble_repeated
+    from qreality.vchain import cx_depth
+
+    m = variants.load(name)
+    plan = plan_simulation(lambda o: m.new_circuit(o).num_qubits, oracle,
+                           circuit_bytes_for=lambda o: oracle_bytes(o, 12, iterations))
+    sim = plan.simulator()
+    stages: Dict[str, Dict[str, float]] = {}
+
+    with stage(stages, "build"):
+        blocks = variants.blocks(name, iterations, plan.oracle)
+
+    with stage(stages, "transpile"):
+        last = blocks.get("last")
+        tqc = assemble_repeated(lambda: blocks["prep"], lambda: blocks["step"], iterations, sim,
+                                opt_level, last_step=(lambda: last) if last is not None else None)
+
+    with stage(stages, "simulate"):
+        counts = sim.run(tqc, shots=shots, seed_simulator=seed).result().data(0)["counts"]
+
+    with stage(stages, "postprocess"):
+        idx, cnt = counts_to_arrays(counts)
+        good = good_mask(m.coherence_spec())
+        good_shots = count_good_shots(idx, cnt, good)
+        top_k(idx, cnt, 10)
+
+    ops = tqc.count_ops()
+    cx_iter, _ = cx_depth(blocks["step"], opt_level)
+    return {
+        "variant": name, "oracle": plan.oracle, "iterations": iterations, "opt_level": opt_level,
+        "shots": shots, "method": plan.method, "precision": plan.precision,
+        "stages": stages,
+        "circuit": {"width": tqc.num_qubits, "depth": tqc.depth(),
+                    "gates": sum(v for k, v in ops.items() if k not in ("measure", "barrier")),
+                    "cx": ops.get("cx", 0), "cx_basis_per_iteration": cx_iter},
+        "p_good": good_shots / shots,
+    }
+
+
+def config_key(r: Record) -> str:
+    return f"{r['variant']}:{r['oracle']}:k={r['iterations']}:opt={r['opt_level']}:shots={r['shots']}"
+
+
+def best_of(runs: Sequence[Record]) -> Record:
+    """Mínimo de tiempo y máximo de RSS por etapa entre repeticiones de la misma configuración."""
+    r = dict(runs[0])
+    r["stages"] = {n: {"seconds": min(x["stages"][n]["seconds"] for x in runs),
+                       "peak_rss": max(x["stages"][n]["peak_rss"] for x in runs)} for n in STAGES}
+    r["repeats"] = len(runs)
+    return r
+
+
+def run_suite(names: Sequence[str], iterations: Sequence[int] | None, opt_levels: Sequence[int],
+              shots: Sequence[int], oracle: str = "ancilla", repeats: int = 3,
+              verbose: bool = True) -> Dict[str, Any]:
+    results: List[Record] = []
+    for name in names:
+        for k in iterations or [variants.default_iterations(name)]:
+            for opt in opt_levels:
+                for s in shots:
+                    r = best_of([bench_one(name, k, opt, s, oracle) for _ in range(repeats)])
+                    results.append(r)
+                    if verbose:
+                        print(format_record(r))
+    return {"environment": environment(), "results": results}
+
+
+def format_record(r: Record) -> str:
+    st = " ".join(f"{n}={r['stages'][n]['seconds']:.3f}s" for n in STAGES)
+    rss = max(v["peak_rss"] for v in r["stages"].values()) / 2**20
+    c = r["circuit"]
+    return (f"[bench] {config_key(r)} {st} rss={rss:.0f}MB width={c['width']} depth={c['depth']} "
+            f"cx/iter={c['cx_basis_per_iteration']} P(good)={r['p_good']:.4f}")
+
+
+# ---------------------------
+# Comparación
+# ---------------------------
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.25) -> List[str]:
+    """Lista de regresiones de `current` respecto a `baseline` (misma configuración)."""
+    base = {config_key(r): r for r in baseline["results"]}
+    out: List[str] = []
+    for r in current["results"]:
+        key = config_key(r)
+        b = base.get(key)
+        if b is None:
+            continue
+        for n in STAGES:
+            t0, t1 = b["stages"][n]["seconds"], r["stages"][n]["seconds"]
+            if t1 > t0 * (1 + tolerance) and t1 - t0 > MIN_SECONDS:
+                out.append(f"{key} {n}: tiempo {t0:.3f}s -> {t1:.3f}s (+{(t1 / t0 - 1) * 100:.0f}%)")
+            m0, m1 = b["stages"][n]["peak_rss"], r["stages"][n]["peak_rss"]
+            if m1 > m0 * (1 + tolerance) and m1 - m0 > MIN_RSS:
+                out.append(f"{key} {n}: rss {m0 / 2**20:.0f}MB -> {m1 / 2**20:.0f}MB")
+        for field, v0 in b["circuit"].items():
+            v1 = r["circuit"].get(field, v0)
+            if field != "width" and v1 > v0:
+                out.append(f"{key} {field}: {v0} -> {v1}")
+        if r["p_good"] < b["p_good"] - P_GOOD_TOLERANCE:
+            out.append(f"{key} P(good): {b['p_good']:.4f} -> {r['p_good']:.4f}")
+    return out
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark por etapas de las variantes.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("run", help="ejecutar el benchmark y guardar JSON")
+    p.add_argument("variants", nargs="*", help=f"{', '.join(variants.VARIANTS)} (por defecto todas)")
+    p.add_argument("--oracle", default="ancilla", choices=("ancilla", "diagonal", "mcp"))
+    p.add_argument("--iterations", type=int, nargs="+", default=None,
+                   help="valores de k (por defecto el k de cada variante)")
+    p.add_argument("--opt-levels", type=int, nargs="+", default=[1])
+    p.add_argument("--shots", type=int, nargs="+", default=[4096])
+    p.add_argument("--repeats", type=int, default=3, help="repeticiones (mejor tiempo)")
+    p.add_argument("-o", "--output", default="bench.json")
+
+    c = sub.add_parser("compare", help="comparar con una línea base; código 1 si hay regresiones")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--tolerance", type=float, default=0.25, help="tolerancia relativa (0.25 = 25%%)")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "run":
+        unknown = set(args.variants) - set(variants.VARIANTS)
+        if unknown:
+            parser.error(f"variante desconocida: {', '.join(sorted(unknown))}")
+        data = run_suite(args.variants or list(variants.VARIANTS), args.iterations,
+                         args.opt_levels, args.shots, args.oracle, args.repeats)
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=1)
+        print(f"[bench] {len(data['results'])} configuraciones -> {args.output}")
+        return 0
+
+    regressions = compare(_load(args.baseline), _load(args.current), args.tolerance)
+    for line in regressions:
+        print(f"[bench] REGRESIÓN {line}")
+    if not regressions:
+        print("[bench] sin regresiones")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
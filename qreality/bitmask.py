@@ -0,0 +1,186 @@
+"""
+qreality/bitmask.py
+
+Motor de coherencia vectorizado: los estados base se representan como enteros
+en un array de NumPy y las restricciones (peso por plano, ejes alineados,
+paridad/signo) se evalúan con máscaras y popcount, en una sola pasada.
+
+El conteo (count_good) y, cuando los good son escasos, la enumeración
+(good_indices, good_mask) usan la estructura de las restricciones en lugar
+del recorrido: ver qreality.combinatorics.
+
+Convención de bits (la misma que usa Qiskit para el índice del statevector):
+  bit i del entero  <=>  qubit q[i]  <=>  s_phys[i]
+Por tanto el entero coincide con int(s_measured, 2) y s_phys es su lectura
+con el bit 0 a la izquierda.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+# Tamaño de bloque al recorrer 2^n estados (acota la memoria de temporales).
+CHUNK_BITS = 22
+# Enumerar cuesta ~50 us por estado good y recorrer ~10 ns por estado: se
+# enumera cuando M <= 2^n / 2^ENUMERATE_SHIFT.
+ENUMERATE_SHIFT = 12
+
+
+@dataclass(frozen=True)
+class CoherenceSpec:
+    """
+    Restricciones de coherencia C(x) sobre un registro de n_bits.
+
+    planes       : grupos de bits cuyo peso de Hamming debe ser plane_weight
+    axes         : grupos de bits que deben ser todos iguales
+    parity_bits  : bits cuyo XOR debe valer parity_value (None => sin signo)
+    """
+    n_bits: int
+    planes: Tuple[Tuple[int, ...], ...] = ()
+    plane_weight: int | None = None
+    axes: Tuple[Tuple[int, ...], ...] = ()
+    parity_bits: Tuple[int, ...] = ()
+    parity_value: int | None = None
+
+
+def bits_mask(positions: Sequence[int]) -> int:
+    m = 0
+    for p in positions:
+        m |= 1 << p
+    return m
+
+
+def _state_dtype(n_bits: int):
+    return np.uint32 if n_bits <= 32 else np.uint64
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(x: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(x)
+else:  # NumPy < 2.0: SWAR sobre uint64
+    def popcount(x: np.ndarray) -> np.ndarray:
+        v = x.astype(np.uint64, copy=True)
+        v -= (v >> np.uint64(1)) & np.uint64(0x5555555555555555)
+        v = (v & np.uint64(0x3333333333333333)) + ((v >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        v = (v + (v >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return ((v * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.uint8)
+
+
+def _good_mask_block(spec: CoherenceSpec, x: np.ndarray) -> np.ndarray:
+    ok = np.ones(x.shape, dtype=bool)
+    dt = x.dtype.type
+
+    if spec.plane_weight is not None:
+        for plane in spec.planes:
+            ok &= popcount(x & dt(bits_mask(plane))) == spec.plane_weight
+
+    for axis in spec.axes:
+        am = dt(bits_mask(axis))
+        sel = x & am
+        ok &= (sel == 0) | (sel == am)
+
+    if spec.parity_value is not None:
+        pm = dt(bits_mask(spec.parity_bits))
+        ok &= (popcount(x & pm) & 1) == spec.parity_value
+
+    return ok
+
+
+def good_mask(spec: CoherenceSpec, states: np.ndarray | None = None) -> np.ndarray:
+    """
+    Máscara booleana de estados coherentes.
+    Sin `states` cubre los 2^n estados; mask[x] <=> C(x).
+    """
+    if states is not None:
+        return _good_mask_block(spec, np.asarray(states, dtype=_state_dtype(spec.n_bits)))
+
+    if _enumerate(spec):
+        out = np.zeros(1 << spec.n_bits, dtype=bool)
+        out[good_indices(spec)] = True
+        return out
+    out = np.empty(1 << spec.n_bits, dtype=bool)
+    for start, ok in _mask_blocks(spec):
+        out[start:start + ok.size] = ok
+    return out
+
+
+def _mask_blocks(spec: CoherenceSpec):
+    """(inicio, máscara) por bloques de 2^CHUNK_BITS estados, sin la máscara completa."""
+    dt = _state_dtype(spec.n_bits)
+    step = 1 << min(CHUNK_BITS, spec.n_bits)
+    for start in range(0, 1 << spec.n_bits, step):
+        yield start, _good_mask_block(spec, np.arange(start, start + step, dtype=dt))
+
+
+def _enumerate(spec: CoherenceSpec) -> bool:
+    """Enumerar (qreality.combinatorics) sale más barato que recorrer 2^n si M es muy escaso."""
+    return count_good(spec) <= (1 << spec.n_bits) >> ENUMERATE_SHIFT
+
+
+def good_indices(spec: CoherenceSpec) -> np.ndarray:
+    if _enumerate(spec):
+        from qreality.combinatorics import iter_good_indices
+        return np.fromiter(iter_good_indices(spec), dtype=np.int64, count=count_good(spec))
+    return good_indices_scan(spec)
+
+
+def count_good(spec: CoherenceSpec) -> int:
+    """M exacto sin recorrer 2^n (programación dinámica en qreality.combinatorics)."""
+    from qreality.combinatorics import count_structured
+    return count_structured(spec)
+
+
+def good_indices_scan(spec: CoherenceSpec) -> np.ndarray:
+    # Por bloques: con n grande la máscara de 2^n bool no cabe, los índices good sí
+    parts = [start + np.flatnonzero(ok) for start, ok in _mask_blocks(spec)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def count_good_scan(spec: CoherenceSpec) -> int:
+    """M recorriendo los 2^n estados (referencia para count_good)."""
+    return sum(int(np.count_nonzero(ok)) for _, ok in _mask_blocks(spec))
+
+
+def is_good_index(spec: CoherenceSpec, x: int) -> bool:
+    """Versión escalar (enteros de Python) para comprobar un único estado."""
+    if spec.plane_weight is not None:
+        for plane in spec.planes:
+            if bin(x & bits_mask(plane)).count("1") != spec.plane_weight:
+                return False
+    for axis in spec.axes:
+        am = bits_mask(axis)
+        if x & am not in (0, am):
+            return False
+    if spec.parity_value is not None:
+        if bin(x & bits_mask(spec.parity_bits)).count("1") & 1 != spec.parity_value:
+            return False
+    return True
+
+
+# ---------------------------
+# Conversión índice <-> cadenas
+# ---------------------------
+
+def phys_string(x: int, n_bits: int) -> str:
+    return format(x, f"0{n_bits}b")[::-1]
+
+
+def measured_string(x: int, n_bits: int) -> str:
+    return format(x, f"0{n_bits}b")
+
+
+def index_from_phys(s_phys: str) -> int:
+    return int(s_phys[::-1], 2)
+
+
+def index_from_measured(bitstring_measured: str) -> int:
+    return int(bitstring_measured, 2)
+
+
+def good_phys_strings(spec: CoherenceSpec) -> List[str]:
+    """Estados coherentes en marco físico, en orden lexicográfico (como itertools.product)."""
+    return sorted(phys_string(int(x), spec.n_bits) for x in good_indices(spec))
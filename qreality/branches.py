@@ -0,0 +1,131 @@
+"""
+qreality/branches.py
+
+Las dos ramas ± (v8, v10, v13) en una sola ejecución, en lugar de cambiar
+SIGN y transpilar/simular dos veces.
+
+El registro de datos lleva un qubit más, q[n] (0 = '+', 1 = '-'), que se
+prepara en |+> con el resto de q. El flip de paridad del oráculo se controla
+con él (CX desde q[n] a la ancilla de paridad, compute_sign_flag; el mismo
+helper sirve para una sola rama) y la difusión actúa solo sobre
+q[0..n-1]: cada rama evoluciona por separado y medir q[n] reparte los shots
+entre ambas (la mitad en promedio). Un circuito, un transpile, una simulación.
+
+Índice conjunto: x + (b << n), con b = 0 para '+' y b = 1 para '-'.
+
+Los backends analytic y numpy calculan las dos ramas en una sola pasada
+vectorizada (una fila por rama).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from qreality.analytic import Phases, p_good_batch, sample_counts
+from qreality.bitmask import CoherenceSpec, good_indices, good_mask
+from qreality.sampling import sample_probabilities
+from qreality.statevector import GroverStatevector
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+    from qreality.model import PlaneModel
+
+SIGNS = (+1, -1)   # rama b = SIGNS.index(sign)
+
+
+def label(b: int) -> str:
+    return "+" if SIGNS[b] == +1 else "-"
+
+
+def joint_indices(specs: Sequence[CoherenceSpec]) -> np.ndarray:
+    """Índices good conjuntos (x + (b << n)) de las ramas `specs` (en el orden de SIGNS)."""
+    return np.concatenate([good_indices(s) + (b << s.n_bits) for b, s in enumerate(specs)])
+
+
+def joint_mask(specs: Sequence[CoherenceSpec]) -> np.ndarray:
+    return np.concatenate([good_mask(s) for s in specs])
+
+
+def joint_oracle(specs: Sequence[CoherenceSpec], phi: float = math.pi, method: str = "diagonal"):
+    """Oráculo sin ancillas sobre q[0..n] (con el qubit de signo)."""
+    from qreality.oracle import compile_phase_oracle
+
+    return compile_phase_oracle(joint_indices(specs), specs[0].n_bits + 1, phi, method)
+
+
+def compute_sign_flag(qc: QuantumCircuit, q, target, model: PlaneModel, sign_qubit=None) -> None:
+    """
+    target (ancilla a |0>) = 1 <=> XOR de q[model.parity_bits] == model.parity_value,
+    el control de signo del oráculo con ancillas. Con `sign_qubit` (q[n] de
+    both_signs; `model` con sign=+1) la rama '-' (q[n] = 1) invierte la condición.
+    """
+    for i in model.parity_bits:
+        qc.cx(q[i], target)
+    if model.parity_value == 0:
+        qc.x(target)
+    if sign_qubit is not None:
+        qc.cx(sign_qubit, target)
+
+
+def uncompute_sign_flag(qc: QuantumCircuit, q, target, model: PlaneModel, sign_qubit=None) -> None:
+    if sign_qubit is not None:
+        qc.cx(sign_qubit, target)
+    if model.parity_value == 0:
+        qc.x(target)
+    for i in reversed(model.parity_bits):
+        qc.cx(q[i], target)
+
+
+# ---------------------------
+# Backends clásicos: ambas ramas en una pasada
+# ---------------------------
+def analytic_counts(specs: Sequence[CoherenceSpec], phases: Sequence[Phases], shots: int,
+                    rng: np.random.Generator | None = None) -> Dict[str, int]:
+    rng = np.random.default_rng() if rng is None else rng
+    n = specs[0].n_bits
+    goods = [good_indices(s) for s in specs]
+    p = p_good_batch([len(g) / (1 << n) for g in goods], phases)
+    counts: Dict[str, int] = {}
+    for b, (g, pg, k) in enumerate(zip(goods, p, rng.multinomial(shots, [0.5, 0.5]))):
+        for key, v in sample_counts(g, n, float(pg), int(k), rng).items():
+            counts[str(b) + key] = v   # q[n] es el bit más significativo
+    return counts
+
+
+def numpy_counts(specs: Sequence[CoherenceSpec], phases: Sequence[Phases], shots: int,
+                 rng: np.random.Generator | None = None) -> Dict[str, int]:
+    sv = GroverStatevector(np.stack([good_mask(s) for s in specs])).evolve(phases)
+    probs = sv.probabilities().ravel() / len(specs)
+    return sample_probabilities(probs, shots, specs[0].n_bits + 1, rng, as_dict=True)
+
+
+# ---------------------------
+# Resultados por rama
+# ---------------------------
+def split(idx: np.ndarray, cnt: np.ndarray, n_bits: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(idx, cnt) de cada rama, con idx ya sin el bit de signo."""
+    b = idx >> n_bits
+    return [(idx[b == i] & ((1 << n_bits) - 1), cnt[b == i]) for i in range(len(SIGNS))]
+
+
+def summary(idx: np.ndarray, cnt: np.ndarray, specs: Sequence[CoherenceSpec]) -> List[Dict]:
+    """Shots, shots good y P(good | rama) por rama."""
+    out = []
+    for b, ((i, c), spec) in enumerate(zip(split(idx, cnt, specs[0].n_bits), specs)):
+        total = int(c.sum())
+        good = int(c[good_mask(spec)[i]].sum()) if total else 0
+        out.append({"sign": SIGNS[b], "shots": total, "good": good,
+                    "p_good": good / total if total else None})
+    return out
+
+
+def report(rows: Sequence[Dict]) -> str:
+    lines = []
+    for b, r in enumerate(rows):
+        p = "n/d" if r["p_good"] is None else f"{r['p_good']:.6f}"
+        lines.append(f"[±] rama {label(b)}: shots={r['shots']}  good={r['good']}  P(good|{label(b)})={p}")
+    return "\n".join(lines)
@@ -0,0 +1,210 @@
+"""
+qreality/cache.py
+
+Caché de circuitos transpilados. Cada run() reconstruye el circuito y vuelve
+a transpilarlo; con ~20 iteraciones de MCX de 11 controles transpilar cuesta
+más que simular. Aquí se guarda el resultado:
+
+  - en memoria, con expulsión LRU
+  - en disco, en formato QPY (sobrevive entre procesos)
+
+La clave es un hash de las entradas de construcción (variante, iteraciones,
+SIGN, fases, oráculo, opt_level...) más la versión de Qiskit, el backend, un
+digest del fichero fuente de la variante y un digest de los fuentes del
+paquete qreality (peephole, vchain, oracle, model... también construyen los
+bloques), de modo que editar el script o el paquete invalida sus entradas.
+Las entradas se pasan por bloque: lo que solo afecta a un bloque (p. ej. las
+fases de la última iteración de v13) no entra en la clave de los demás.
+
+Directorio en disco: $QREALITY_CACHE_DIR o ~/.cache/qreality/transpiled
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict
+
+from qreality.instrument import stage
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+
+DEFAULT_MAXSIZE = 32
+
+
+def default_cache_dir() -> Path:
+    env = os.environ.get("QREALITY_CACHE_DIR")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "qreality" / "transpiled"
+
+
+def file_digest(path: str | os.PathLike) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def package_digest() -> str:
+    """Digest de todos los qreality/*.py (los bloques se construyen con ellos)."""
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+class TranspileCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, cache_dir: str | os.PathLike | None = None,
+                 use_disk: bool = True):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self.use_disk = use_disk
+        self._mem: "OrderedDict[str, tuple[QuantumCircuit, float]]" = OrderedDict()
+
+        self.hits_mem = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.last_event = ""
+
+    # ---------------------------
+    # Clave
+    # ---------------------------
+    @staticmethod
+    def make_key(inputs: Dict[str, Any], backend_name: str) -> str:
+        import qiskit
+
+        payload = dict(inputs)
+        payload["_qiskit"] = qiskit.__version__
+        payload["_backend"] = backend_name
+        payload["_package"] = package_digest()
+        blob = json.dumps(payload, sort_keys=True, default=repr)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    # ---------------------------
+    # Memoria (LRU)
+    # ---------------------------
+    def _mem_get(self, key: str):
+        item = self._mem.get(key)
+        if item is not None:
+            self._mem.move_to_end(key)
+        return item
+
+    def _mem_put(self, key: str, tqc: QuantumCircuit, cost: float) -> None:
+        self._mem[key] = (tqc, cost)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    # ---------------------------
+    # Disco (QPY + sidecar JSON con el coste original)
+    # ---------------------------
+    def _paths(self, key: str):
+        return self.cache_dir / f"{key}.qpy", self.cache_dir / f"{key}.json"
+
+    def _disk_get(self, key: str):
+        qpy_path, meta_path = self._paths(key)
+        if not (self.use_disk and qpy_path.exists() and meta_path.exists()):
+            return None
+        from qiskit import qpy
+
+        try:
+            with open(qpy_path, "rb") as f:
+                tqc = qpy.load(f)[0]
+            with open(meta_path) as f:
+                cost = float(json.load(f)["cost_seconds"])
+        except Exception:
+            # entrada corrupta o de una versión QPY no legible: se recalcula
+            return None
+        return tqc, cost
+
+    def _disk_put(self, key: str, tqc: QuantumCircuit, cost: float, inputs: Dict[str, Any]) -> None:
+        if not self.use_disk:
+            return
+        from qiskit import qpy
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        qpy_path, meta_path = self._paths(key)
+        # tmp + os.replace en los dos ficheros: procesos en paralelo (runner)
+        tmp = qpy_path.with_suffix(f".qpy.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            qpy.dump(tqc, f)
+        os.replace(tmp, qpy_path)
+        tmp = meta_path.with_suffix(f".json.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"cost_seconds": cost, "inputs": inputs}, f, default=repr)
+        os.replace(tmp, meta_path)
+
+    # ---------------------------
+    # API
+    # ---------------------------
+    def get_or_transpile(self, inputs: Dict[str, Any], build: Callable[[], QuantumCircuit],
+                         backend, opt_level: int) -> QuantumCircuit:
+        inputs = dict(inputs, opt_level=opt_level)
+        key = self.make_key(inputs, getattr(backend, "name", type(backend).__name__))
+
+        t0 = time.perf_counter()
+        item = self._mem_get(key)
+        source = "mem"
+        if item is None:
+            item = self._disk_get(key)
+            source = "disk"
+        if item is not None:
+            tqc, cost = item
+            if source == "mem":
+                self.hits_mem += 1
+            else:
+                self.hits_disk += 1
+                self._mem_put(key, tqc, cost)
+            saved = max(0.0, cost - (time.perf_counter() - t0))
+            self.saved_seconds += saved
+            self.last_event = f"hit({source}) ahorro={saved:.3f}s"
+            return tqc
+
+        from qiskit import transpile
+
+        qc = build()
+        with stage("transpile"):
+            tqc = transpile(qc, backend, optimization_level=opt_level)
+        cost = time.perf_counter() - t0
+        self.misses += 1
+        self._mem_put(key, tqc, cost)
+        self._disk_put(key, tqc, cost, inputs)
+        self.last_event = f"miss build+transpile={cost:.3f}s"
+        return tqc
+
+    def clear(self, disk: bool = False) -> None:
+        self._mem.clear()
+        if disk and self.cache_dir.exists():
+            for p in self.cache_dir.glob("*.qpy"):
+                p.unlink()
+            for p in self.cache_dir.glob("*.json"):
+                p.unlink()
+
+    def report(self) -> str:
+        return (f"[cache] {self.last_event} | hits mem={self.hits_mem} disk={self.hits_disk} "
+                f"misses={self.misses} ahorro_total={self.saved_seconds:.3f}s")
+
+
+_DEFAULT: TranspileCache | None = None
+
+
+def transpile_cache() -> TranspileCache:
+    """Caché compartida del proceso (la usan los run() de todas las variantes)."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = TranspileCache()
+    return _DEFAULT
+
+
+def cached_transpile(inputs: Dict[str, Any], build: Callable[[], QuantumCircuit],
+                     backend, opt_level: int) -> QuantumCircuit:
+    return transpile_cache().get_or_transpile(inputs, build, backend, opt_level)
@@ -0,0 +1,89 @@
+"""
+qreality/classical.py
+
+Análisis clásico de las variantes sin importar Qiskit: N, M, k sugerido,
+P(good) exacta en k (subespacio 2D), restricciones redundantes y, para v13,
+las fases de la última iteración. Pensado para trabajos de planificación que
+lanzan muchos procesos cortos: solo carga numpy y los scripts (que importan
+qiskit al construir el primer circuito, no al importarse).
+
+Uso:
+    python -m qreality.classical                 # todas las variantes
+    python -m qreality.classical v8 v13 --k 10 20 --list
+    python -m qreality.classical v13 --json      # una línea JSON por (variante, k)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from typing import Any, Dict, List, Sequence
+
+from qreality import variants
+from qreality.analytic import iteration_phases, p_good
+from qreality.bitmask import good_phys_strings
+from qreality.redundancy import analyze, label
+
+N_BITS = 12
+
+
+def analysis(name: str, iterations: int | None = None, list_states: bool = False) -> Dict[str, Any]:
+    m = variants.load(name)
+    spec = m.coherence_spec()
+    n_states = 2 ** N_BITS
+    m_good = m.count_good_states()
+    k = variants.default_iterations(name) if iterations is None else iterations
+    a = m_good / n_states
+
+    out: Dict[str, Any] = {
+        "variant": name, "N": n_states, "M": m_good, "a": a, "k": k,
+        "k_optimo": math.floor(math.pi / (4 * math.asin(math.sqrt(a)))) if m_good else None,
+        "p_good": p_good(a, iteration_phases(k)) if m_good else 0.0,
+    }
+    red = analyze(spec)
+    out["redundantes"] = [label(c, spec) for c in red.removed]
+    if hasattr(m, "last_step_phases") and m_good:
+        phi_o, phi_d, p_theory, bad = m.last_step_phases(m_good, k, N_BITS)
+        out["last_step"] = {"phi_oracle": phi_o, "phi_diff": phi_d, "p_good": p_theory, "bad": bad}
+    if list_states:
+        out["good_phys"] = good_phys_strings(spec)
+    return out
+
+
+def format_analysis(r: Dict[str, Any]) -> List[str]:
+    lines = [f"[{r['variant']}] N={r['N']}  M={r['M']}  M/N={r['a']:.6f}  k={r['k']} "
+             f"(óptimo {r['k_optimo']})  P(good)={r['p_good']:.6f}"]
+    if r["redundantes"]:
+        lines.append(f"[{r['variant']}] redundantes: {'; '.join(r['redundantes'])}")
+    if "last_step" in r:
+        ls = r["last_step"]
+        lines.append(f"[{r['variant']}] última iteración: phi_oracle={ls['phi_oracle']:.12f} "
+                     f"phi_diff={ls['phi_diff']:.12f} P={ls['p_good']:.15f} |bad|={ls['bad']:.3e}")
+    if "good_phys" in r:
+        lines.append(f"[{r['variant']}] good (físico): {' '.join(r['good_phys'])}")
+    return lines
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Análisis clásico de las variantes (sin Qiskit).")
+    parser.add_argument("variants", nargs="*", help=f"{', '.join(variants.VARIANTS)} (por defecto todas)")
+    parser.add_argument("--k", type=int, nargs="+", default=None,
+                        help="iteraciones (por defecto el k de cada variante)")
+    parser.add_argument("--list", action="store_true", help="listar los estados good")
+    parser.add_argument("--json", action="store_true", help="una línea JSON por resultado")
+    args = parser.parse_args(argv)
+    unknown = set(args.variants) - set(variants.VARIANTS)
+    if unknown:
+        parser.error(f"variante desconocida: {', '.join(sorted(unknown))}")
+
+    for name in args.variants or list(variants.VARIANTS):
+        for k in args.k or [None]:
+            r = analysis(name, k, args.list)
+            print(json.dumps(r) if args.json else "\n".join(format_analysis(r)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
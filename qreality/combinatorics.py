@@ -0,0 +1,123 @@
+"""
+qreality/combinatorics.py
+
+Conteo y enumeración de estados good usando la estructura de C(x), sin
+recorrer los 2^n estados:
+
+  - los ejes atan bits: cada clase de bits unidos por ejes (union-find) es
+    una sola variable binaria;
+  - cada clase aporta a cada plano tantos bits como tenga en él, y a la
+    paridad el número de sus bits en parity_bits (mod 2);
+  - el estado de la programación dinámica es (peso acumulado por plano,
+    paridad acumulada), acotado por plane_weight.
+
+count_structured agrupa las clases con la misma aportación (p. ej. los bits
+libres de un plano) y suma con binomiales: O(clases · (w+1)^p · 2) con
+enteros exactos de Python. iter_good_indices recorre las clases de mayor a
+menor bit con una tabla de estados alcanzables por sufijo, de modo que solo
+se visitan ramas con al menos una solución: produce los índices good en orden
+creciente con coste O(n) por estado.
+
+Misma convención de bits que qreality.bitmask (bit i del entero = q[i]).
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+from qreality.bitmask import CoherenceSpec
+
+State = Tuple[int, ...]   # (peso por plano..., paridad)
+
+
+def _classes(spec: CoherenceSpec) -> List[Tuple[int, State]]:
+    """(máscara de bits, aportación) por clase, ordenadas por su bit más alto (descendente)."""
+    parent = list(range(spec.n_bits))
+
+    def find(b: int) -> int:
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        return b
+
+    for axis in spec.axes:
+        for b in axis[1:]:
+            parent[find(b)] = find(axis[0])
+
+    members: Dict[int, List[int]] = defaultdict(list)
+    for b in range(spec.n_bits):
+        members[find(b)].append(b)
+
+    planes = spec.planes if spec.plane_weight is not None else ()
+    parity = set(spec.parity_bits) if spec.parity_value is not None else set()
+    out = []
+    for bits in members.values():
+        vec = tuple(sum(b in plane for b in bits) for plane in planes)
+        out.append((sum(1 << b for b in bits), vec + (sum(b in parity for b in bits) & 1,)))
+    out.sort(key=lambda c: -c[0])   # máscaras disjuntas: mayor máscara <=> bit más alto mayor
+    return out
+
+
+def _target(spec: CoherenceSpec) -> State:
+    planes = spec.planes if spec.plane_weight is not None else ()
+    return tuple(spec.plane_weight for _ in planes) + (spec.parity_value or 0,)
+
+
+def _add(s: State, c: State, times: int = 1) -> State:
+    return tuple(a + times * b for a, b in zip(s[:-1], c[:-1])) + ((s[-1] + times * c[-1]) & 1,)
+
+
+def _fits(s: State, target: State) -> bool:
+    return all(a <= t for a, t in zip(s[:-1], target[:-1]))
+
+
+def count_structured(spec: CoherenceSpec) -> int:
+    """M exacto por programación dinámica sobre clases de bits (sin recorrer 2^n)."""
+    classes = _classes(spec)
+    target = _target(spec)
+    table: Dict[State, int] = {tuple(0 for _ in target): 1}
+    for contrib, g in Counter(c for _, c in classes).items():
+        nxt: Dict[State, int] = defaultdict(int)
+        for s, ways in table.items():
+            for j in range(g + 1):
+                t = _add(s, contrib, j)
+                if not _fits(t, target):
+                    break   # el peso solo crece con j
+                nxt[t] += ways * math.comb(g, j)
+        table = nxt
+    return table.get(target, 0)
+
+
+def iter_good_indices(spec: CoherenceSpec) -> Iterator[int]:
+    """Índices good en orden creciente, generados bajo demanda."""
+    classes = _classes(spec)
+    target = _target(spec)
+    zero = tuple(0 for _ in target)
+
+    # reach[t]: aportaciones alcanzables con las clases t.. (poda de ramas sin solución)
+    reach = [set() for _ in range(len(classes) + 1)]
+    reach[-1].add(zero)
+    for t in range(len(classes) - 1, -1, -1):
+        contrib = classes[t][1]
+        reach[t] = reach[t + 1] | {u for u in (_add(s, contrib) for s in reach[t + 1])
+                                   if _fits(u, target)}
+
+    def need(acc: State) -> State:
+        return tuple(t - a for t, a in zip(target[:-1], acc[:-1])) + (target[-1] ^ acc[-1],)
+
+    def walk(t: int, acc: State, x: int) -> Iterator[int]:
+        if t == len(classes):
+            yield x
+            return
+        mask, contrib = classes[t]
+        # bit más alto de la clase a 0 antes que a 1 => orden creciente
+        if need(acc) in reach[t + 1]:
+            yield from walk(t + 1, acc, x)
+        acc1 = _add(acc, contrib)
+        if _fits(acc1, target) and need(acc1) in reach[t + 1]:
+            yield from walk(t + 1, acc1, x | mask)
+
+    if need(zero) in reach[0]:
+        yield from walk(0, zero, 0)
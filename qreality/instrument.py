@@ -0,0 +1,206 @@
+"""
+qreality/instrument.py
+
+Instrumentación opcional de run() por etapas, para lanzar los scripts en
+lotes y detectar regresiones. Se activa con variables de entorno:
+
+  QREALITY_TRACE=run.jsonl   añade una línea JSON por run() ("-" = stdout)
+  QREALITY_PROFILE=run.prof  vuelca cProfile de todo run() (pstats/snakeviz;
+                             se sobrescribe en cada run())
+
+Sin ellas @traced llama a run() directamente y stage() es un contexto vacío:
+coste nulo. Desde código, `with collect() as records:` guarda los registros
+en una lista (lo usa qreality.runner).
+
+Cada línea lleva la configuración de la llamada (argumentos de run()), por
+etapa el tiempo acumulado (perf_counter), número de llamadas y pico de RSS,
+el RSS final y, si se simuló en Aer, result.time_taken y los metadatos del
+resultado y del experimento. Etapas que pueden aparecer:
+
+  count_good, redundancy, phases, preflight, build, transpile, simulate,
+  sampling, postprocess
+
+(build/transpile se miden dentro de qreality.repeat por bloque; con caché no
+hay build.)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import functools
+import inspect
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+
+# ---------------------------
+# Memoria
+# ---------------------------
+def reset_peak_rss() -> bool:
+    """Reinicia VmHWM (Linux >= 4.0); False si no se puede."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _status(field: str) -> int | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss() -> int:
+    """Pico de memoria residente en bytes (desde el último reinicio si se pudo)."""
+    peak = _status("VmHWM:")
+    if peak is not None:
+        return peak
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss() -> int | None:
+    return _status("VmRSS:")
+
+
+# ---------------------------
+# Traza de un run()
+# ---------------------------
+class Trace:
+    def __init__(self, variant: str, config: Dict[str, Any], path: str | None = None,
+                 profile: str | None = None):
+        self.variant = variant
+        self.config = config
+        self.path = path
+        self.profile_path = profile
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.aer: Dict[str, Any] = {}
+        self.fields: Dict[str, Any] = {}
+        self.error: str | None = None
+        self._profiler = cProfile.Profile() if profile else None
+        self._t0 = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        reset_peak_rss()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            s = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "peak_rss": 0})
+            s["seconds"] += dt
+            s["calls"] += 1
+            s["peak_rss"] = max(s["peak_rss"], peak_rss())
+
+    def aer_result(self, result) -> None:
+        """time_taken y metadatos de un Result de Aer (se acumulan si hay varios)."""
+        self.aer["time_taken"] = self.aer.get("time_taken", 0.0) + float(result.time_taken or 0.0)
+        self.aer.setdefault("metadata", []).append(result.metadata)
+        self.aer.setdefault("experiments", []).extend(
+            {"time_taken": r.time_taken, "metadata": r.metadata} for r in result.results)
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "variant": self.variant, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": platform.node(), "pid": os.getpid(),
+            "config": self.config, "total_seconds": time.perf_counter() - self._t0,
+            "stages": self.stages, "rss_end": current_rss(), "aer": self.aer or None,
+            **self.fields, "error": self.error,
+        }
+
+    def close(self) -> Dict[str, Any]:
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+        rec = self.record()
+        if not self.path:
+            return rec
+        line = json.dumps(rec, default=str)
+        if self.path == "-":
+            print(line)
+        else:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        return rec
+
+
+_ACTIVE: Trace | None = None
+_COLLECT: List[Dict[str, Any]] | None = None
+
+
+def active() -> Trace | None:
+    return _ACTIVE
+
+
+def stage(name: str):
+    """Contexto que mide la etapa `name` del run() activo (vacío si no hay traza)."""
+    if _ACTIVE is None:
+        return contextlib.nullcontext()
+    return _ACTIVE.stage(name)
+
+
+def aer_result(result) -> None:
+    if _ACTIVE is not None:
+        _ACTIVE.aer_result(result)
+
+
+def note(**fields) -> None:
+    """Campos extra en el registro (p. ej. M, k, oráculo tras la degradación)."""
+    if _ACTIVE is not None:
+        _ACTIVE.fields.update(fields)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[List[Dict[str, Any]]]:
+    """Registros de los run() trazados dentro del bloque (además de QREALITY_TRACE)."""
+    global _COLLECT
+    previous, _COLLECT = _COLLECT, []
+    try:
+        yield _COLLECT
+    finally:
+        _COLLECT = previous
+
+
+def traced(variant: str) -> Callable:
+    """Decorador para run(): una traza por llamada si QREALITY_TRACE/QREALITY_PROFILE."""
+    def deco(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _ACTIVE
+            path = os.environ.get("QREALITY_TRACE")
+            profile = os.environ.get("QREALITY_PROFILE")
+            if not (path or profile or _COLLECT is not None) or _ACTIVE is not None:
+                return fn(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            _ACTIVE = Trace(variant, dict(bound.arguments), path, profile)
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as e:
+                _ACTIVE.error = repr(e)
+                raise
+            finally:
+                trace, _ACTIVE = _ACTIVE, None
+                rec = trace.close()
+                if _COLLECT is not None:
+                    _COLLECT.append(rec)
+        return wrapper
+    return deco
@@ -0,0 +1,354 @@
+"""
+qreality/model.py
+
+Modelo parametrizado ±[((-1,+1)^d)^p]: p planos de d bits cada uno, con
+
+  peso por plano   cada plano tiene exactamente `weight` bits a 1
+  ejes alineados   para cada eje j de `axes`, los bits j de todos los planos
+                   son iguales (q[j] = q[d+j] = ... = q[(p-1)d+j])
+  signo            paridad de un grupo de bits fijada por `sign` (ver SIGN_RULES)
+
+De un mismo PlaneModel salen el predicado clásico C(x), el spec de
+qreality.bitmask (conteo y enumeración de good), el número de iteraciones y
+los circuitos (preparación e iteración, con oráculo de ancillas o sin ellas)
+para cualquier tamaño, sin escribir un script por forma. Las variantes de 12
+bits son casos particulares (PRESETS).
+
+Convención de bits: bit j del plano i = q[i*d + j] = s_phys[i*d + j].
+
+Uso:
+    from qreality.model import PlaneModel
+    m = PlaneModel(planes=4, dim=6, weight=3, axes=(0, 1, 2, 3), sign=+1)
+    m.count(), m.iterations(), build_iteration(m, oracle="ancilla")
+
+Benchmark de escalado (12 -> 32 bits lógicos, por backend): qreality.scaling.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, List, Tuple
+
+import numpy as np
+
+from qreality import vchain
+from qreality.bitmask import CoherenceSpec, count_good, good_indices, index_from_phys, is_good_index
+from qreality.combinatorics import iter_good_indices
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+# "total": XOR de todos los bits; '+' = par (v8/v10)
+# "axes" : XOR de los bits de los ejes alineados en el plano 0 (producto de los
+#          signos de eje); '+' = impar (v13)
+SIGN_RULES = ("total", "axes")
+
+
+@dataclass(frozen=True)
+class PlaneModel:
+    """
+    planes, dim : p y d (n_bits = p*d)
+    weight      : peso de Hamming exigido en cada plano (None => libre)
+    axes        : índices j (0..d-1) de los ejes que deben estar alineados
+    sign        : +1 / -1, o None (sin restricción de signo)
+    sign_rule   : qué paridad fija `sign` (SIGN_RULES)
+    """
+    planes: int
+    dim: int
+    weight: int | None = None
+    axes: Tuple[int, ...] = ()
+    sign: int | None = None
+    sign_rule: str = "total"
+
+    def __post_init__(self):
+        object.__setattr__(self, "axes", tuple(sorted(set(self.axes))))
+        if self.planes < 1 or self.dim < 1:
+            raise ValueError(f"planes y dim deben ser >= 1 (planes={self.planes}, dim={self.dim})")
+        if self.weight is not None and not 0 <= self.weight <= self.dim:
+            raise ValueError(f"weight={self.weight} fuera de 0..{self.dim}")
+        if any(not 0 <= j < self.dim for j in self.axes):
+            raise ValueError(f"ejes {self.axes} fuera de 0..{self.dim - 1}")
+        if self.axes and self.planes < 2:
+            raise ValueError("los ejes alineados requieren al menos 2 planos")
+        if self.sign not in (None, 1, -1):
+            raise ValueError(f"sign debe ser +1, -1 o None (sign={self.sign})")
+        if self.sign_rule not in SIGN_RULES:
+            raise ValueError(f"sign_rule desconocida: {self.sign_rule!r} (usa {SIGN_RULES})")
+        if self.sign is not None and self.sign_rule == "axes" and not self.axes:
+            raise ValueError("sign_rule='axes' requiere ejes alineados")
+        if self.weight is None and not self.axes and self.sign is None:
+            raise ValueError("modelo sin restricciones: todos los estados serían good")
+
+    @classmethod
+    def from_spec(cls, spec: CoherenceSpec) -> "PlaneModel":
+        """PlaneModel equivalente a `spec`; ValueError si no tiene forma de planos x ejes."""
+        n = spec.n_bits
+        if spec.axes:
+            p = len(spec.axes[0])
+        elif spec.plane_weight is not None and spec.planes:
+            p = len(spec.planes)
+        else:
+            raise ValueError("spec sin ejes ni planos: no hay estructura p x d")
+        if p < 1 or n % p:
+            raise ValueError(f"{n} bits no se reparten en {p} planos")
+        d = n // p
+
+        axes = []
+        for axis in spec.axes:
+            j = min(axis)
+            if sorted(axis) != [i * d + j for i in range(p)] or j >= d:
+                raise ValueError(f"el eje {axis} no es una columna de {p} planos de {d} bits")
+            axes.append(j)
+
+        weight = spec.plane_weight
+        if weight is not None:
+            planes = sorted(tuple(sorted(plane)) for plane in spec.planes)
+            if planes != [tuple(range(i * d, (i + 1) * d)) for i in range(p)]:
+                raise ValueError(f"los planos {spec.planes} no son {p} bloques de {d} bits")
+
+        sign, rule = None, "total"
+        if spec.parity_value is not None:
+            bits = set(spec.parity_bits)
+            if bits == set(range(n)):
+                sign = +1 if spec.parity_value == 0 else -1
+            elif axes and bits == set(axes):
+                rule = "axes"
+                sign = +1 if spec.parity_value == 1 else -1
+            else:
+                raise ValueError(f"paridad sobre {spec.parity_bits}: ni total ni de los ejes")
+        return cls(p, d, weight=weight, axes=tuple(axes), sign=sign, sign_rule=rule)
+
+    # ---------------------------
+    # Estructura
+    # ---------------------------
+    @property
+    def n_bits(self) -> int:
+        return self.planes * self.dim
+
+    @property
+    def n_states(self) -> int:
+        return 1 << self.n_bits
+
+    def plane_bits(self, i: int) -> Tuple[int, ...]:
+        return tuple(range(i * self.dim, (i + 1) * self.dim))
+
+    def axis_bits(self, j: int) -> Tuple[int, ...]:
+        return tuple(i * self.dim + j for i in range(self.planes))
+
+    @property
+    def parity_bits(self) -> Tuple[int, ...]:
+        if self.sign is None:
+            return ()
+        if self.sign_rule == "total":
+            return tuple(range(self.n_bits))
+        return self.axes
+
+    @property
+    def parity_value(self) -> int | None:
+        if self.sign is None:
+            return None
+        plus = 0 if self.sign_rule == "total" else 1
+        return plus if self.sign == +1 else 1 - plus
+
+    def spec(self) -> CoherenceSpec:
+        return CoherenceSpec(
+            n_bits=self.n_bits,
+            planes=tuple(self.plane_bits(i) for i in range(self.planes)) if self.weight is not None else (),
+            plane_weight=self.weight,
+            axes=tuple(self.axis_bits(j) for j in self.axes),
+            parity_bits=self.parity_bits,
+            parity_value=self.parity_value,
+        )
+
+    @property
+    def label(self) -> str:
+        out = f"{self.planes}x{self.dim}"
+        if self.weight is not None:
+            out += f" w={self.weight}"
+        if self.axes:
+            out += f" ejes={','.join(map(str, self.axes))}"
+        if self.sign is not None:
+            out += f" sign={self.sign:+d} ({self.sign_rule})"
+        return out
+
+    # ---------------------------
+    # Clásico
+    # ---------------------------
+    def is_good(self, x: int) -> bool:
+        return is_good_index(self.spec(), x)
+
+    def predicate(self, s_phys: str) -> bool:
+        """C(x) sobre la cadena física (q[0] a la izquierda)."""
+        return len(s_phys) == self.n_bits and self.is_good(index_from_phys(s_phys))
+
+    def count(self) -> int:
+        return count_good(self.spec())
+
+    def good_indices(self) -> np.ndarray:
+        return good_indices(self.spec())
+
+    def iter_good(self) -> Iterator[int]:
+        """Índices good en orden creciente, sin materializar la lista."""
+        return iter_good_indices(self.spec())
+
+    def iterations(self, m_good: int | None = None) -> int:
+        """k sugerido (mismo criterio que suggested_grover_iterations de los scripts)."""
+        m_good = self.count() if m_good is None else m_good
+        if m_good <= 0 or m_good >= self.n_states:
+            return 0
+        theta = math.asin(math.sqrt(m_good / self.n_states))
+        return max(0, int((math.pi / (4 * theta)) - 0.5))
+
+    # ---------------------------
+    # Ancillas del oráculo
+    # ---------------------------
+    @property
+    def n_ancillas(self) -> int:
+        """w (1 por plano) + eq (1 por eje) + t (p-1 por eje, +1 de paridad) + ph."""
+        n = self.planes if self.weight is not None else 0
+        n += len(self.axes) * self.planes
+        return n + (self.sign is not None) + 1
+
+
+# Las variantes de 12 bits como casos particulares (v8/v10/v13: signo del script)
+PRESETS = {
+    "v5": PlaneModel(3, 4, weight=2, axes=(0, 1, 2)),
+    "v8": PlaneModel(3, 4, weight=2, axes=(0, 1, 2), sign=+1),
+    "v10": PlaneModel(3, 4, weight=2, axes=(0, 1, 2), sign=+1),
+    "v13": PlaneModel(3, 4, axes=(0, 1, 2, 3), sign=+1, sign_rule="axes"),
+}
+
+
+# ---------------------------
+# Circuitos
+# ---------------------------
+def weight_patterns(dim: int, weight: int) -> List[Tuple[int, ...]]:
+    """
+    Patrones de peso `weight` en orden Gray: cada uno a distancia de Hamming
+    mínima del anterior, para que qreality.peephole cancele las X entre marcas.
+    """
+    left = [tuple(1 if j in c else 0 for j in range(dim))
+            for c in itertools.combinations(range(dim), weight)]
+    out = [left.pop(0)]
+    while left:
+        prev = out[-1]
+        nxt = min(left, key=lambda p: sum(a != b for a, b in zip(p, prev)))
+        left.remove(nxt)
+        out.append(nxt)
+    return out
+
+
+def mark_pattern(qc: QuantumCircuit, qubits, flag, pattern_bits) -> None:
+    for qb, b in zip(qubits, pattern_bits):
+        if b == 0:
+            qc.x(qb)
+    qc.mcx(list(qubits), flag)
+    for qb, b in zip(qubits, pattern_bits):
+        if b == 0:
+            qc.x(qb)
+
+
+def new_circuit(model: PlaneModel, oracle: str = "ancilla") -> QuantumCircuit:
+    """Registros q (p*d) y c; con oráculo de ancillas además w, eq, t y ph."""
+    from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+
+    data = QuantumRegister(model.n_bits, "q")
+    c = ClassicalRegister(model.n_bits, "c")
+    if oracle != "ancilla":
+        return QuantumCircuit(data, c)
+
+    regs = [data]
+    if model.weight is not None:
+        regs.append(QuantumRegister(model.planes, "w"))
+    if model.axes:
+        regs.append(QuantumRegister(len(model.axes), "eq"))
+    n_t = len(model.axes) * (model.planes - 1) + (model.sign is not None)
+    if n_t:
+        regs.append(QuantumRegister(n_t, "t"))
+    regs.append(QuantumRegister(1, "ph"))
+    return QuantumCircuit(*regs, c)
+
+
+def build_prep(model: PlaneModel, oracle: str = "ancilla") -> QuantumCircuit:
+    qc = new_circuit(model, oracle)
+    r = {reg.name: reg for reg in qc.qregs}
+    qc.h(r["q"])
+    if oracle == "ancilla":
+        qc.x(r["ph"][0])   # |1>: el oráculo es una MCP(phi) sobre ph
+    return qc
+
+
+def _compute_flags(qc: QuantumCircuit, model: PlaneModel, r) -> list:
+    """Calcula los flags de restricción en w / eq / t y devuelve los controles del oráculo."""
+    q = r["q"]
+    controls = []
+    if model.weight is not None:
+        patterns = weight_patterns(model.dim, model.weight)
+        for i in range(model.planes):
+            plane = [q[b] for b in model.plane_bits(i)]
+            for p in patterns:
+                mark_pattern(qc, plane, r["w"][i], p)
+            controls.append(r["w"][i])
+
+    t = iter(r["t"]) if "t" in r else iter(())
+    for e, j in enumerate(model.axes):
+        bits = [q[b] for b in model.axis_bits(j)]
+        ts = [next(t) for _ in range(model.planes - 1)]
+        # t_k = a_k XOR a_{k+1};  eq ^= AND(~t)
+        for k, tk in enumerate(ts):
+            qc.cx(bits[k], tk)
+            qc.cx(bits[k + 1], tk)
+        qc.x(ts)
+        qc.mcx(ts, r["eq"][e])
+        qc.x(ts)
+        controls.append(r["eq"][e])
+
+    if model.sign is not None:
+        tp = next(t)
+        for b in model.parity_bits:
+            qc.cx(q[b], tp)
+        if model.parity_value == 0:
+            qc.x(tp)
+        controls.append(tp)
+    return controls
+
+
+def build_iteration(model: PlaneModel, oracle: str = "ancilla", phi_oracle: float = math.pi,
+                    phi_diff: float = math.pi, mcx_mode: str = "noancilla") -> QuantumCircuit:
+    """Una iteración (oráculo con fase phi_oracle + difusión con fase phi_diff)."""
+    from qreality.oracle import compile_phase_oracle
+
+    vchain.check_mode(mcx_mode)
+    qc = new_circuit(model, oracle)
+    r = {reg.name: reg for reg in qc.qregs}
+    q = list(r["q"])
+
+    if oracle != "ancilla":
+        qc.compose(compile_phase_oracle(model.spec(), model.n_bits, phi_oracle, oracle), q, inplace=True)
+    else:
+        compute = new_circuit(model, oracle)
+        controls = _compute_flags(compute, model, {reg.name: reg for reg in compute.qregs})
+        qc.compose(compute, inplace=True)
+        qc.mcp(phi_oracle, [qc.qubits[compute.find_bit(b).index] for b in controls], r["ph"][0])
+        qc.compose(compute.inverse(), inplace=True)
+
+    ancillas = vchain.idle_ancillas(qc) if mcx_mode == "vchain" and oracle == "ancilla" else ()
+    qc.h(q)
+    qc.x(q)
+    vchain.mcp(qc, phi_diff, q[:-1], q[-1], clean=ancillas)
+    qc.x(q)
+    qc.h(q)
+    return qc
+
+
+def build_circuit(model: PlaneModel, iterations: int | None = None, oracle: str = "ancilla",
+                  mcx_mode: str = "noancilla") -> QuantumCircuit:
+    k = model.iterations() if iterations is None else iterations
+    qc = build_prep(model, oracle)
+    step = build_iteration(model, oracle, mcx_mode=mcx_mode)
+    for _ in range(k):
+        qc.compose(step, inplace=True)
+    qc.measure(qc.qregs[0], qc.cregs[0])
+    return qc
@@ -0,0 +1,81 @@
+"""
+qreality/oracle.py
+
+Compilador de oráculos de fase sin ancillas: a partir del predicado clásico
+de coherencia (CoherenceSpec, función sobre s_phys o lista de estados good)
+emite un oráculo diagonal que actúa solo sobre los n qubits de datos:
+
+    O(phi) |x> = e^{i phi} |x>   si C(x)
+                 |x>             en otro caso
+
+Dos formas de síntesis:
+  "diagonal" : una única DiagonalGate (Aer la simula de forma nativa)
+  "mcp"      : una fase multicontrolada por estado good, con X en los ceros
+"""
+
+from __future__ import annotations
+
+import cmath
+import itertools
+import math
+from typing import TYPE_CHECKING, Callable, Iterable, Union
+
+import numpy as np
+
+from qreality.bitmask import CoherenceSpec, good_indices, index_from_phys
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+
+OracleSource = Union[CoherenceSpec, Callable[[str], bool], Iterable[int]]
+
+ORACLE_METHODS = ("diagonal", "mcp")
+
+
+def good_states_from(source: OracleSource, n_bits: int) -> np.ndarray:
+    """Índices good (bit i = q[i]) a partir de un spec, un predicado o una lista."""
+    if isinstance(source, CoherenceSpec):
+        return good_indices(source)
+    if callable(source):
+        goods = [index_from_phys("".join(bits))
+                 for bits in itertools.product("01", repeat=n_bits)
+                 if source("".join(bits))]
+        return np.array(sorted(goods), dtype=np.int64)
+    return np.array(sorted(int(x) for x in source), dtype=np.int64)
+
+
+def diagonal_oracle(good: np.ndarray, n_bits: int, phi: float = math.pi) -> QuantumCircuit:
+    diag = np.ones(1 << n_bits, dtype=complex)
+    diag[good] = cmath.exp(1j * phi)
+    from qiskit import QuantumCircuit
+    from qiskit.circuit.library import DiagonalGate
+
+    qc = QuantumCircuit(n_bits, name="oracle")
+    qc.append(DiagonalGate(diag.tolist()), range(n_bits))
+    return qc
+
+
+def mcp_oracle(good: np.ndarray, n_bits: int, phi: float = math.pi) -> QuantumCircuit:
+    from qiskit import QuantumCircuit
+
+    qc = QuantumCircuit(n_bits, name="oracle")
+    q = list(range(n_bits))
+    for x in good.tolist():
+        zeros = [i for i in q if not (x >> i) & 1]
+        if zeros:
+            qc.x(zeros)
+        qc.mcp(phi, q[:-1], q[-1])
+        if zeros:
+            qc.x(zeros)
+    return qc
+
+
+def compile_phase_oracle(source: OracleSource, n_bits: int, phi: float = math.pi,
+                         method: str = "diagonal") -> QuantumCircuit:
+    good = good_states_from(source, n_bits)
+    if method == "diagonal":
+        return diagonal_oracle(good, n_bits, phi)
+    if method == "mcp":
+        return mcp_oracle(good, n_bits, phi)
+    raise ValueError(f"método de oráculo desconocido: {method!r} (usa {ORACLE_METHODS})")
@@ -0,0 +1,124 @@
+"""
+qreality/peephole.py
+
+Pase de mirilla previo a transpile, independiente del optimization_level de
+Qiskit, pensado para los patrones compute/uncompute de los oráculos:
+
+  - mark_pattern envuelve cada MCX con X en los bits a 0; entre dos patrones
+    consecutivos quedan pares X X sobre el mismo qubit
+  - compute_eq_three / uncompute_eq_three dejan x(t1); x(t2) seguidos a
+    ambos lados de la MCX del oráculo
+  - capas H H (p. ej. difusión + preparación) y pares CX/MCX idénticos
+
+Se recorre el circuito una vez con una pila por qubit: una puerta autoinversa
+se cancela con la última puerta superviviente si es idéntica (nombre,
+controles, qubits en el mismo orden) y es la última en TODOS sus qubits, es
+decir, son adyacentes en el DAG. Las cancelaciones se encadenan (X X X X).
+
+Con los patrones en orden Gray (consecutivos a distancia de Hamming mínima)
+quedan menos X entre MCX: ver _PATTERNS_W2 en los scripts.
+
+Comprobación de tamaños por variante: falla si algún bloque crece y, con el
+oráculo de ancillas, si las puertas antes/después no son las de EXPECTED
+(p. ej. si se pierde el orden Gray de _PATTERNS_W2). Ver tests/test_peephole.py.
+    python -m qreality.peephole
+    python -m qreality.peephole v8 v13 --oracle ancilla
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+SELF_INVERSE = frozenset({"x", "y", "z", "h", "cx", "cy", "cz", "ch", "swap", "ccx", "mcx"})
+
+# puertas (antes, después) por bloque con oracle="ancilla"; actualizar a propósito
+EXPECTED: Dict[Tuple[str, str], Tuple[int, int]] = {
+    ("v5", "prep"): (14, 14), ("v5", "step"): (286, 214),
+    ("v8", "prep"): (14, 14), ("v8", "step"): (286, 214),
+    ("v10", "prep"): (14, 14), ("v10", "step"): (286, 214),
+    ("v13", "prep"): (13, 13), ("v13", "step"): (130, 114), ("v13", "last"): (130, 114),
+}
+
+
+def _cancel_key(inst) -> Tuple | None:
+    op = inst.operation
+    if op.name not in SELF_INVERSE or op.params or inst.clbits:
+        return None
+    return (op.name, getattr(op, "ctrl_state", None), tuple(inst.qubits))
+
+
+def optimize(qc: QuantumCircuit) -> QuantumCircuit:
+    """Copia de `qc` sin los pares de puertas autoinversas adyacentes."""
+    kept: List = []                    # instrucciones supervivientes (None = cancelada)
+    last: Dict[object, List[int]] = {}  # qubit -> pila de índices en kept
+    for inst in qc.data:
+        key = _cancel_key(inst)
+        if key is not None:
+            tops = {last[q][-1] if last.get(q) else None for q in inst.qubits}
+            j = tops.pop() if len(tops) == 1 else None
+            if j is not None and _cancel_key(kept[j]) == key:
+                kept[j] = None
+                for q in inst.qubits:
+                    last[q].pop()
+                continue
+        kept.append(inst)
+        for q in inst.qubits:
+            last.setdefault(q, []).append(len(kept) - 1)
+
+    out = qc.copy_empty_like()
+    for inst in kept:
+        if inst is not None:
+            out.append(inst.operation, inst.qubits, inst.clbits, copy=False)
+    return out
+
+
+def hamming(a: Sequence[int], b: Sequence[int]) -> int:
+    return sum(x != y for x, y in zip(a, b))
+
+
+def x_between(patterns: Sequence[Sequence[int]]) -> int:
+    """X que sobreviven entre MCX consecutivas de mark_pattern (tras cancelar)."""
+    return sum(hamming(p, r) for p, r in zip(patterns, patterns[1:]))
+
+
+def check(names: Sequence[str], oracle: str = "ancilla") -> bool:
+    """
+    Tamaño de cada bloque antes/después; False si alguno crece o, con
+    oracle="ancilla", si no coincide con EXPECTED.
+    """
+    from qreality import variants
+
+    ok = True
+    for name in names:
+        for block, qc in variants.blocks(name, oracle=oracle).items():
+            after = optimize(qc)
+            sizes = (qc.size(), after.size())
+            expected = EXPECTED.get((name, block)) if oracle == "ancilla" else None
+            ok &= after.size() <= qc.size() and (expected is None or sizes == expected)
+            mismatch = f"  ESPERADO {expected[0]} -> {expected[1]}" if expected not in (None, sizes) else ""
+            print(f"[peephole] {name:>3} {block:<4} puertas {qc.size()} -> {after.size()}  "
+                  f"x {qc.count_ops().get('x', 0)} -> {after.count_ops().get('x', 0)}  "
+                  f"depth {qc.depth()} -> {after.depth()}{mismatch}")
+    return ok
+
+
+def main(argv=None) -> int:
+    from qreality import variants
+
+    parser = argparse.ArgumentParser(description="Pase de mirilla: puertas por bloque y variante.")
+    parser.add_argument("variants", nargs="*", help=f"{', '.join(variants.VARIANTS)} (por defecto todas)")
+    parser.add_argument("--oracle", default="ancilla", choices=("ancilla", "diagonal", "mcp"))
+    args = parser.parse_args(argv)
+    unknown = set(args.variants) - set(variants.VARIANTS)
+    if unknown:
+        parser.error(f"variante desconocida: {', '.join(sorted(unknown))}")
+    return 0 if check(args.variants or list(variants.VARIANTS), args.oracle) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
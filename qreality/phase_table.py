@@ -0,0 +1,155 @@
+"""
+qreality/phase_table.py
+
+Tabla precalculada de fases exactas de la última iteración para todos los
+(N = 2^n, M, k) de unos rangos dados, para no resolver fases en cada
+construcción de circuito.
+
+Formato en disco (junto, como en la caché de circuitos, un sidecar JSON):
+
+  phases.npy   array float64 (filas, k_max, 4) con (phi, varphi, p_good, err)
+  phases.json  índice: n_min, n_max, m_max, k_max y offset de fila por n
+
+Fila de (n, M) = offset[n] + (M - 1), columna k - 1: la consulta es O(1) y
+el .npy se abre con mmap (solo se leen las páginas consultadas).
+Las entradas sin solución exacta guardan la fase refinada (err > 0) de
+last_step_phase_table, la misma que da find_last_step_phases.
+
+Uso:
+    python -m qreality.phase_table --n 1 12 --k-max 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from qreality.phases import last_step_phase_table
+
+
+FORMAT_VERSION = 2   # 2: entradas sin solución exacta refinadas
+DEFAULT_N = (1, 12)
+DEFAULT_K_MAX = 60
+
+Entry = Tuple[float, float, float, float]   # (phi, varphi, p_good, err)
+
+
+def default_table_path() -> Path:
+    env = os.environ.get("QREALITY_PHASE_TABLE")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "qreality" / "phases.npy"
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+
+def _m_count(n: int, m_max: int | None) -> int:
+    # M = 1 .. 2^n - 1 (M = N no tiene nada que amplificar)
+    full = 2**n - 1
+    return full if m_max is None else min(full, m_max)
+
+
+def build_table(path: str | os.PathLike | None = None, n_range: Tuple[int, int] = DEFAULT_N,
+                k_max: int = DEFAULT_K_MAX, m_max: int | None = None) -> Path:
+    """Calcula la tabla (un lote vectorizado por n) y la escribe junto a su índice."""
+    path = Path(path) if path is not None else default_table_path()
+    n_min, n_max = n_range
+    if not (1 <= n_min <= n_max) or k_max < 1:
+        raise ValueError("rangos inválidos: se requiere 1 <= n_min <= n_max y k_max >= 1")
+
+    offsets: Dict[str, int] = {}
+    rows = 0
+    for n in range(n_min, n_max + 1):
+        offsets[str(n)] = rows
+        rows += _m_count(n, m_max)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".npy.tmp")
+    table = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64, shape=(rows, k_max, 4))
+    ks = np.arange(1, k_max + 1)
+    for n in range(n_min, n_max + 1):
+        m = np.arange(1, _m_count(n, m_max) + 1)
+        phi, var, p, err = last_step_phase_table(m[:, None] / 2**n, ks[None, :])
+        r0 = offsets[str(n)]
+        table[r0:r0 + m.size] = np.stack([phi, var, p, err], axis=-1)
+    table.flush()
+    del table
+    os.replace(tmp, path)
+
+    with open(_index_path(path), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "n_min": n_min, "n_max": n_max,
+                   "m_max": m_max, "k_max": k_max, "offsets": offsets}, f)
+    return path
+
+
+class PhaseTable:
+    def __init__(self, path: str | os.PathLike | None = None):
+        self.path = Path(path) if path is not None else default_table_path()
+        with open(_index_path(self.path)) as f:
+            index = json.load(f)
+        if index.get("version") != FORMAT_VERSION:
+            raise ValueError(f"versión de tabla no soportada: {index.get('version')!r}")
+        self.n_min = index["n_min"]
+        self.n_max = index["n_max"]
+        self.m_max = index["m_max"]
+        self.k_max = index["k_max"]
+        self._offsets = {int(n): r for n, r in index["offsets"].items()}
+        self._data = np.load(self.path, mmap_mode="r")
+
+    def __contains__(self, key: Tuple[int, int, int]) -> bool:
+        n, M, k = key
+        return (self.n_min <= n <= self.n_max and 1 <= M <= _m_count(n, self.m_max)
+                and 1 <= k <= self.k_max)
+
+    def lookup(self, n: int, M: int, k: int) -> Entry | None:
+        """(phi, varphi, p_good, err) para (2^n, M, k), o None si está fuera de rango."""
+        if (n, M, k) not in self:
+            return None
+        row = self._data[self._offsets[n] + M - 1, k - 1]
+        return float(row[0]), float(row[1]), float(row[2]), float(row[3])
+
+
+_OPEN: Dict[Path, PhaseTable | None] = {}
+
+
+def open_table(path: str | os.PathLike | None = None) -> PhaseTable | None:
+    """Tabla abierta (una vez por proceso), o None si no se ha generado."""
+    path = Path(path) if path is not None else default_table_path()
+    if path not in _OPEN:
+        try:
+            _OPEN[path] = PhaseTable(path)
+        except (OSError, ValueError, KeyError):
+            _OPEN[path] = None
+    return _OPEN[path]
+
+
+def lookup_phases(n: int, M: int, k: int, path: str | os.PathLike | None = None) -> Entry | None:
+    table = open_table(path)
+    return None if table is None else table.lookup(n, M, k)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Precalcula la tabla de fases exactas (n, M, k).")
+    parser.add_argument("--n", nargs=2, type=int, default=DEFAULT_N, metavar=("N_MIN", "N_MAX"),
+                        help="rango de qubits n (N = 2^n)")
+    parser.add_argument("--k-max", type=int, default=DEFAULT_K_MAX)
+    parser.add_argument("--m-max", type=int, default=None, help="limita M a 1..m_max")
+    parser.add_argument("--out", default=None, help="ruta del .npy (por defecto $QREALITY_PHASE_TABLE)")
+    args = parser.parse_args(argv)
+
+    path = build_table(args.out, tuple(args.n), args.k_max, args.m_max)
+    table = PhaseTable(path)
+    size = path.stat().st_size / 2**20
+    print(f"[phase_table] {path}  n={table.n_min}..{table.n_max}  k<={table.k_max}  "
+          f"filas={table._data.shape[0]}  {size:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+qreality/phases.py
+
+Fases exactas de la última iteración ("Exact Grover"): (k-1) iteraciones
+estándar (pi, pi) y una última con (phi, varphi) tales que la amplitud bad
+final se anula.
+
+Con Q = D(varphi) O(phi), D = I + lam |s><s|, lam = e^{i varphi} - 1 y
+v_pre = (g, b) tras las k-1 iteraciones estándar:
+
+    bad_final = b + lam * c * (s e^{i phi} g + c b)              (s = sqrt(a), c = sqrt(1-a))
+
+bad_final = 0 fija lam; exigir |1 + lam| = 1 da la condición cerrada
+
+    cos(phi + alpha) = -(c^2 - s^2) |b|^2 / (2 c s |g b*|),      alpha = arg(g b*)
+
+Además v_pre es analítico: Q(pi, pi) = -G (G = iteración de Grover estándar),
+así que v_j = (-1)^j (sin((2j+1) theta), cos((2j+1) theta)), sin(theta) = s.
+Todo está vectorizado sobre arrays de (a, k). Si la condición no tiene
+solución (k demasiado pequeño para a) se toma el coseno saturado a +-1, que
+da la fase con menor |bad| alcanzable, y se refina localmente (también por
+lotes, en last_step_phase_table). La rejilla NumPy (evaluada en una sola pasada) queda disponible
+como method="grid".
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+from qreality.analytic import q_matrix
+
+
+TWO_PI = 2.0 * math.pi
+REFINE_CHUNK = 2048   # entradas por paso de _refine en last_step_phase_table
+
+
+def evolve(a: float, steps: int, phi_oracle: float, phi_diff: float) -> np.ndarray:
+    """Q(phi_oracle, phi_diff)^steps aplicado a |s> (potencia de matriz, no bucle)."""
+    v0 = np.array([math.sqrt(a), math.sqrt(1.0 - a)], dtype=complex)
+    return np.linalg.matrix_power(q_matrix(a, phi_oracle, phi_diff), steps) @ v0
+
+
+def standard_amplitudes(a, steps) -> Tuple[np.ndarray, np.ndarray]:
+    """(good, bad) tras `steps` iteraciones (pi, pi), vectorizado en a y steps."""
+    a = np.asarray(a, dtype=float)
+    steps = np.asarray(steps)
+    theta = np.arcsin(np.sqrt(a))
+    sign = np.where(steps % 2 == 0, 1.0, -1.0)
+    ang = (2 * steps + 1) * theta
+    return (sign * np.sin(ang)).astype(complex), (sign * np.cos(ang)).astype(complex)
+
+
+def _bad_final(a, g, b, phi, var):
+    s = np.sqrt(a)
+    c = np.sqrt(1.0 - a)
+    lam = np.exp(1j * var) - 1.0
+    return b + lam * c * (s * np.exp(1j * phi) * g + c * b)
+
+
+def closed_form_phases(a, k):
+    """
+    Solución cerrada vectorizada. Devuelve (phi, varphi, feasible) como arrays;
+    donde feasible es False no existe solución exacta para ese (a, k).
+    """
+    a = np.asarray(a, dtype=float)
+    k = np.asarray(k)
+    g, b = standard_amplitudes(a, k - 1)
+    s = np.sqrt(a)
+    c = np.sqrt(1.0 - a)
+
+    gb = g * np.conj(b)
+    R = np.abs(gb)
+    alpha = np.angle(gb)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rhs = -(c * c - s * s) * np.abs(b) ** 2 / (2.0 * c * s * R)
+    feasible = np.isfinite(rhs) & (np.abs(rhs) <= 1.0)
+
+    phi = np.mod(np.arccos(np.clip(rhs, -1.0, 1.0)) - alpha, TWO_PI)
+    z = s * np.exp(1j * phi) * g + c * b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lam = -b / (c * z)
+    var = np.mod(np.angle(1.0 + lam), TWO_PI)
+
+    # b == 0 (ya en |good>): basta la iteración trivial
+    done = np.abs(b) < 1e-15
+    phi = np.where(done, 0.0, phi)
+    var = np.where(done, 0.0, var)
+    feasible = feasible | done
+    return phi, var, feasible
+
+
+def _refine(a, k, phi, var, span: float, rounds: int = 40):
+    """
+    Zoom local 21x21 alrededor de (phi, var), cada ronda en un solo paso NumPy.
+    Acepta escalares o arrays 1-D (una entrada por elemento, todas a la vez).
+    """
+    scalar = np.ndim(phi) == 0
+    a, k, phi, var = (np.atleast_1d(x) for x in np.broadcast_arrays(
+        np.asarray(a, dtype=float), np.asarray(k), np.asarray(phi, dtype=float),
+        np.asarray(var, dtype=float)))
+    g, b = standard_amplitudes(a, k - 1)
+    rows = np.arange(a.size)
+    local = np.linspace(-1.0, 1.0, 21)
+    best = np.abs(_bad_final(a, g, b, phi, var))
+    for _ in range(rounds):
+        P = phi[:, None] + span * local
+        V = var[:, None] + span * local
+        e = np.abs(_bad_final(a[:, None, None], g[:, None, None], b[:, None, None],
+                              P[:, :, None], V[:, None, :])).reshape(a.size, -1)
+        flat = np.argmin(e, axis=1)
+        i, j = np.divmod(flat, local.size)
+        better = e[rows, flat] < best
+        best = np.where(better, e[rows, flat], best)
+        phi = np.where(better, P[rows, i], phi)
+        var = np.where(better, V[rows, j], var)
+        span *= 0.25
+        if span < 1e-14:
+            break
+    phi, var = phi % TWO_PI, var % TWO_PI
+    return (float(phi[0]), float(var[0])) if scalar else (phi, var)
+
+
+def grid_phases(a: float, k: int, grid: int = 360) -> Tuple[float, float]:
+    """Rejilla grid x grid evaluada en un solo paso NumPy + zoom local alrededor del mínimo."""
+    g, b = standard_amplitudes(a, k - 1)
+    phis = np.linspace(0.0, TWO_PI, grid, endpoint=False)
+    err = np.abs(_bad_final(a, g, b, phis[:, None], phis[None, :]))
+    i, j = np.unravel_index(np.argmin(err), err.shape)
+    return _refine(a, k, phis[i], phis[j], TWO_PI / grid)
+
+
+def find_last_step_phases(a: float, k_fixed: int, method: str = "closed") -> Tuple[float, float, float, float]:
+    """
+    (k_fixed-1) iteraciones estándar y última con (phi_last, varphi_last).
+    Devuelve (phi, varphi, p_good, err) con err = |bad| final.
+    """
+    if k_fixed < 1:
+        raise ValueError("k_fixed debe ser >= 1")
+    if method == "closed":
+        phi, var, ok = closed_form_phases(a, k_fixed)
+        phi, var = float(phi), float(var)
+        if not bool(ok):
+            phi, var = _refine(a, k_fixed, phi, var, 0.05)
+    elif method == "grid":
+        phi, var = grid_phases(a, k_fixed)
+    else:
+        raise ValueError(f"método desconocido: {method!r} (usa 'closed' o 'grid')")
+
+    g, b = standard_amplitudes(a, k_fixed - 1)
+    err = float(np.abs(_bad_final(a, g, b, phi, var)))
+    return phi, var, max(0.0, 1.0 - err * err), err
+
+
+def last_step_phase_table(a, k) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Versión por lotes para muchos (a, k) a la vez (arrays con broadcasting, k >= 1).
+    Las entradas sin solución exacta parten de la fase saturada y se refinan
+    como en find_last_step_phases (err > 0), en bloques de REFINE_CHUNK.
+    """
+    a, k = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(k))
+    phi, var, ok = closed_form_phases(a, k)
+    phi, var = np.array(phi, dtype=float), np.array(var, dtype=float)
+
+    todo = np.flatnonzero(~ok)
+    flat_phi, flat_var = phi.reshape(-1), var.reshape(-1)
+    for c in range(0, todo.size, REFINE_CHUNK):
+        idx = todo[c:c + REFINE_CHUNK]
+        flat_phi[idx], flat_var[idx] = _refine(a.reshape(-1)[idx], k.reshape(-1)[idx],
+                                               flat_phi[idx], flat_var[idx], 0.05)
+
+    g, b = standard_amplitudes(a, k - 1)
+    err = np.abs(_bad_final(a, g, b, phi, var))
+    return phi, var, np.maximum(0.0, 1.0 - err * err), err
@@ -0,0 +1,88 @@
+"""
+qreality/postprocess.py
+
+Post-proceso de conteos sobre arrays: en lugar de recorrer el dict de
+get_counts() invirtiendo cada string y comprobando C(x) carácter a carácter,
+
+  - los conteos se pasan a (idx, cnt) enteros (claves binarias, hex de
+    result.data()["counts"], memoria por shot o el array de sampling)
+  - good/bad se clasifica con la máscara vectorizada: good[idx]
+  - el top-k sale de argpartition (O(n), sin ordenar todo el dict)
+  - el marco físico (bits invertidos) se obtiene con una tabla de 256
+    entradas por byte, solo para lo que se imprime
+
+idx = int(bitstring medido, 2) = bit i en q[i], igual que good_mask, así que
+clasificar no necesita invertir bits.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+# REV8[b] = byte b con los bits invertidos
+REV8 = np.array([int(f"{b:08b}"[::-1], 2) for b in range(256)], dtype=np.uint64)
+
+
+def reverse_bits(x, n_bits: int) -> np.ndarray:
+    """Índice medido -> índice en marco físico (s_phys leído como binario)."""
+    x = np.asarray(x, dtype=np.uint64)
+    n_bytes = (n_bits + 7) // 8
+    out = np.zeros_like(x)
+    for b in range(n_bytes):
+        out = (out << np.uint64(8)) | REV8[(x >> np.uint64(8 * b)) & np.uint64(0xFF)]
+    return (out >> np.uint64(8 * n_bytes - n_bits)).astype(np.int64)
+
+
+def phys_strings(idx, n_bits: int) -> List[str]:
+    fmt = f"0{n_bits}b"
+    return [format(x, fmt) for x in reverse_bits(idx, n_bits).tolist()]
+
+
+def counts_to_arrays(counts) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (idx, cnt) int64 desde un dict de conteos (claves '0101...' o '0x..') o
+    desde un array de conteos por estado (sampling.multinomial_counts).
+    """
+    if isinstance(counts, np.ndarray):
+        idx = np.flatnonzero(counts)
+        return idx.astype(np.int64), counts[idx].astype(np.int64)
+    n = len(counts)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    base = 16 if next(iter(counts)).startswith("0x") else 2
+    idx = np.fromiter((int(k, base) for k in counts), dtype=np.int64, count=n)
+    cnt = np.fromiter(counts.values(), dtype=np.int64, count=n)
+    return idx, cnt
+
+
+def memory_to_arrays(memory: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(idx, cnt) desde result.get_memory() / data()['memory'] (un string por shot)."""
+    if len(memory) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    base = 16 if memory[0].startswith("0x") else 2
+    shots = np.fromiter((int(m, base) for m in memory), dtype=np.int64, count=len(memory))
+    idx, cnt = np.unique(shots, return_counts=True)
+    return idx, cnt.astype(np.int64)
+
+
+def count_good_shots(idx: np.ndarray, cnt: np.ndarray, good: np.ndarray) -> int:
+    return int(cnt[good[idx]].sum())
+
+
+def top_k(idx: np.ndarray, cnt: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Los k resultados más frecuentes, de mayor a menor (argpartition + orden de k)."""
+    if cnt.size > k:
+        sel = np.argpartition(cnt, cnt.size - k)[cnt.size - k:]
+    else:
+        sel = np.arange(cnt.size)
+    sel = sel[np.argsort(-cnt[sel], kind="stable")]
+    return idx[sel], cnt[sel]
+
+
+def split_good_bad(idx: np.ndarray, cnt: np.ndarray,
+                   good: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    g = good[idx]
+    return {"good": (idx[g], cnt[g]), "bad": (idx[~g], cnt[~g])}
@@ -0,0 +1,267 @@
+"""
+qreality/preflight.py
+
+Comprobación previa a la simulación en Aer: memoria del statevector,
+profundidad y puertas del circuito transpilado y tiempo previsto, con
+degradación automática si se supera el presupuesto de memoria.
+
+  memoria statevector = 2^n_qubits * 16 B (double) o 8 B (single)
+  memoria circuito    = k * 2^n_datos * repeat.PARAM_BYTES con oráculo "diagonal"
+                        (una DiagonalGate densa por iteración; oracle_bytes)
+  tiempo previsto     = ns_por_puerta_amplitud * puertas * 2^n_qubits
+
+La constante del modelo de tiempo se calibra con calibrate() o
+`python -m qreality.preflight` (circuito de prueba en este equipo) y se guarda en ~/.cache/qreality/preflight.json
+($QREALITY_CALIBRATION); sin calibrar se usa un valor por defecto medido
+en una CPU de un núcleo.
+
+Presupuesto: argumento memory_budget, $QREALITY_MEMORY_BUDGET ("512M",
+"2G", bytes) o, por defecto, la mitad de la RAM física. Si no cabe se prueba,
+en orden: oráculo sin ancillas, precisión single, matrix_product_state. El
+oráculo sin ancillas solo se elige si la memoria total (estado + circuito) baja:
+con muchas iteraciones sus parámetros pesan más que los qubits que ahorra.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_NS_PER_GATE_AMP = 7.5
+DOWNGRADES = ("oracle", "single", "mps")
+FALLBACK_ORACLE = "diagonal"
+
+_BYTES_PER_AMP = {"double": 16, "single": 8}
+_UNITS = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def calibration_path() -> Path:
+    env = os.environ.get("QREALITY_CALIBRATION")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "qreality" / "preflight.json"
+
+
+def parse_bytes(value: int | str) -> int:
+    if isinstance(value, int):
+        return value
+    v = value.strip().upper().rstrip("B")
+    if v and v[-1] in _UNITS:
+        return int(float(v[:-1]) * _UNITS[v[-1]])
+    return int(float(v))
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def physical_memory() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def memory_budget(value: int | str | None = None) -> int | None:
+    """Presupuesto en bytes (None = sin límite conocido)."""
+    if value is None:
+        value = os.environ.get("QREALITY_MEMORY_BUDGET")
+    if value is not None:
+        return parse_bytes(value)
+    ram = physical_memory()
+    return None if ram is None else ram // 2
+
+
+def statevector_bytes(n_qubits: int, precision: str = "double") -> int:
+    return (1 << n_qubits) * _BYTES_PER_AMP[precision]
+
+
+def oracle_bytes(oracle: str, n_data: int, iterations: int) -> int:
+    """
+    Memoria de construcción del oráculo en `iterations` iteraciones: "diagonal"
+    lleva 2^n_data parámetros por copia; "ancilla" y "mcp" no tienen parámetros densos.
+    """
+    if oracle != "diagonal":
+        return 0
+    from qreality.repeat import PARAM_BYTES
+
+    return PARAM_BYTES * (1 << n_data) * iterations
+
+
+def ns_per_gate_amp() -> float:
+    try:
+        with open(calibration_path()) as f:
+            return float(json.load(f)["ns_per_gate_amp"])
+    except (OSError, ValueError, KeyError):
+        return DEFAULT_NS_PER_GATE_AMP
+
+
+def calibrate(n_qubits: int = 18, layers: int = 20, seed: int = 0) -> float:
+    """Mide ns por (puerta * amplitud) con un circuito aleatorio de prueba y lo guarda."""
+    from qiskit import QuantumCircuit, transpile
+    from qiskit_aer import AerSimulator
+
+    rng = np.random.default_rng(seed)
+    qc = QuantumCircuit(n_qubits)
+    for _ in range(layers):
+        for q in range(n_qubits):
+            r = rng.integers(4)
+            if r == 0:
+                qc.h(q)
+            elif r == 1:
+                qc.x(q)
+            elif r == 2:
+                qc.cx(q, (q + 1) % n_qubits)
+            else:
+                qc.ccx(q, (q + 1) % n_qubits, (q + 2) % n_qubits)
+    qc.save_probabilities()
+
+    sim = AerSimulator(method="statevector")
+    tqc = transpile(qc, sim)
+    sim.run(tqc, shots=1).result()   # calentamiento
+    t0 = time.perf_counter()
+    sim.run(tqc, shots=1).result()
+    ns = (time.perf_counter() - t0) * 1e9 / (tqc.size() * (1 << n_qubits))
+
+    path = calibration_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"ns_per_gate_amp": ns, "n_qubits": n_qubits, "gates": tqc.size()}, f)
+    return ns
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Configuración elegida para Aer (oráculo, método, precisión) y por qué."""
+    oracle: str
+    n_qubits: int
+    method: str = "statevector"
+    precision: str = "double"
+    budget: int | None = None
+    downgrades: Tuple[str, ...] = ()       # degradaciones aplicadas, en orden
+    requested_memory: int | None = None    # memoria de la configuración pedida
+    fits: bool = True
+    circuit_memory: int = 0                # parámetros del circuito (oracle_bytes)
+
+    @property
+    def memory(self) -> int | None:
+        if self.method != "statevector":
+            # MPS: el estado depende del entrelazamiento; solo se conoce la parte del circuito
+            return self.circuit_memory or None
+        return statevector_bytes(self.n_qubits, self.precision) + self.circuit_memory
+
+    def simulator(self, **options):
+        """
+        AerSimulator del plan. `options` (p. ej. un perfil de autotune) puede fijar
+        method/precision salvo que el plan se haya degradado por memoria.
+        $QREALITY_AER_THREADS limita los hilos de Aer (lo fija qreality.runner
+        en cada proceso del pool).
+        """
+        from qiskit_aer import AerSimulator
+        opts = dict(options)
+        threads = os.environ.get("QREALITY_AER_THREADS")
+        if threads:
+            opts["max_parallel_threads"] = int(threads)
+        if self.downgrades or "method" not in opts:
+            opts["method"] = self.method
+        if self.downgrades or "precision" not in opts:
+            opts["precision"] = self.precision
+        return AerSimulator(**opts)
+
+    def report(self) -> str:
+        mem = "n/d (MPS)" if self.memory is None else format_bytes(self.memory)
+        budget = "sin límite" if self.budget is None else format_bytes(self.budget)
+        if self.circuit_memory:
+            mem += f" (circuito {format_bytes(self.circuit_memory)})"
+        msg = (f"[preflight] qubits={self.n_qubits} oracle={self.oracle} method={self.method} "
+               f"precision={self.precision} memoria={mem} presupuesto={budget}")
+        if self.downgrades:
+            msg += (f" | degradado ({format_bytes(self.requested_memory)} > presupuesto): "
+                    + " + ".join(self.downgrades))
+        if not self.fits:
+            msg += " | AVISO: sigue sin caber en el presupuesto"
+        return msg
+
+
+def plan_simulation(n_qubits_for: Callable[[str], int], oracle: str,
+                    budget: int | str | None = None,
+                    downgrades: Sequence[str] = DOWNGRADES,
+                    circuit_bytes_for: Callable[[str], int] | None = None) -> Plan:
+    """
+    Elige la configuración de Aer. `n_qubits_for(oracle)` da los qubits del
+    circuito con ese oráculo (p. ej. lambda o: new_circuit(o).num_qubits) y
+    `circuit_bytes_for(oracle)`, si se da, la memoria de construcción del
+    circuito (p. ej. lambda o: oracle_bytes(o, 12, k)).
+    """
+    def circuit_bytes(o: str) -> int:
+        return 0 if circuit_bytes_for is None else circuit_bytes_for(o)
+
+    limit = memory_budget(budget)
+    plan = Plan(oracle=oracle, n_qubits=n_qubits_for(oracle), budget=limit,
+                circuit_memory=circuit_bytes(oracle))
+    if limit is None or plan.memory <= limit:
+        return plan
+
+    requested = plan.memory
+    for step in downgrades:
+        if step == "oracle" and plan.oracle == "ancilla":
+            candidate = replace(plan, oracle=FALLBACK_ORACLE, n_qubits=n_qubits_for(FALLBACK_ORACLE),
+                                circuit_memory=circuit_bytes(FALLBACK_ORACLE))
+            if plan.memory is not None and candidate.memory >= plan.memory:
+                continue   # sus parámetros cuestan más que los qubits que ahorra
+            plan = candidate
+            reason = f"oráculo sin ancillas ({FALLBACK_ORACLE})"
+        elif step == "single" and plan.precision == "double":
+            plan = replace(plan, precision="single")
+            reason = "precisión single"
+        elif step == "mps" and plan.method != "matrix_product_state":
+            plan = replace(plan, method="matrix_product_state")
+            reason = "método matrix_product_state"
+        else:
+            continue
+        plan = replace(plan, downgrades=plan.downgrades + (reason,), requested_memory=requested)
+        if plan.memory is None or plan.memory <= limit:
+            return plan
+    return replace(plan, fits=False, requested_memory=requested)
+
+
+@dataclass(frozen=True)
+class Estimate:
+    plan: Plan
+    depth: int
+    gates: Dict[str, int]
+    seconds: float | None
+    param_bytes: int = 0       # parámetros del circuito (circuito + ensamblado Aer)
+
+    def report(self) -> str:
+        total = sum(self.gates.values())
+        ops = " ".join(f"{k}={v}" for k, v in sorted(self.gates.items(), key=lambda kv: -kv[1]))
+        t = "n/d" if self.seconds is None else f"{self.seconds:.2f}s"
+        params = f" parámetros≈{format_bytes(self.param_bytes)}" if self.param_bytes > 2**20 else ""
+        return f"[preflight] depth={self.depth} puertas={total} ({ops}){params} tiempo_previsto≈{t}"
+
+
+def estimate(tqc, plan: Plan) -> Estimate:
+    """Profundidad, puertas, memoria de parámetros y tiempo previsto del circuito transpilado `tqc`."""
+    from qreality.repeat import repeated_bytes
+
+    gates = {k: v for k, v in tqc.count_ops().items() if k not in ("measure", "barrier")}
+    seconds = None
+    if plan.method == "statevector":
+        seconds = ns_per_gate_amp() * 1e-9 * sum(gates.values()) * (1 << tqc.num_qubits)
+    return Estimate(plan, tqc.depth(), dict(gates), seconds, repeated_bytes(tqc, 1))
+
+
+if __name__ == "__main__":
+    print(f"[preflight] calibrado: {calibrate():.2f} ns por puerta*amplitud -> {calibration_path()}")
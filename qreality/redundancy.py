@@ -0,0 +1,127 @@
+"""
+qreality/redundancy.py
+
+Análisis de redundancia de las restricciones de coherencia antes de
+construir el oráculo. Cada restricción de CoherenceSpec (peso por plano,
+eje alineado, paridad/signo) se prueba quitándola: como quitar una
+restricción solo puede agrandar el conjunto good, si M no cambia la
+restricción está implícita en las demás y no hace falta evaluarla en el
+circuito. Se quitan de una en una (greedy), re-evaluando tras cada paso, para
+no eliminar a la vez dos restricciones que solo se implican mutuamente.
+
+Caso típico: con peso 2 en tres planos de 4 bits el popcount total es 6, así
+que la paridad de los 12 bits es siempre par (rama '+' implícita) y la rama
+'-' es vacía (M = 0): no hay nada que amplificar y no se simula.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Tuple
+
+from qreality.bitmask import CoherenceSpec, count_good
+
+
+Constraint = Tuple[str, int]   # ("plane", i) | ("axis", i) | ("parity", 0)
+
+_LABELS = {"plane": "peso plano", "axis": "eje", "parity": "paridad"}
+
+
+def constraints(spec: CoherenceSpec) -> List[Constraint]:
+    """Restricciones de `spec`, en el orden en que se intenta quitarlas (la paridad primero)."""
+    out: List[Constraint] = []
+    if spec.parity_value is not None:
+        out.append(("parity", 0))
+    out += [("axis", i) for i in range(len(spec.axes))]
+    if spec.plane_weight is not None:
+        out += [("plane", i) for i in range(len(spec.planes))]
+    return out
+
+
+def without(spec: CoherenceSpec, drop: Iterable[Constraint]) -> CoherenceSpec:
+    drop = set(drop)
+    planes = tuple(p for i, p in enumerate(spec.planes) if ("plane", i) not in drop)
+    axes = tuple(a for i, a in enumerate(spec.axes) if ("axis", i) not in drop)
+    if ("parity", 0) in drop:
+        return replace(spec, planes=planes, axes=axes, parity_bits=(), parity_value=None)
+    return replace(spec, planes=planes, axes=axes)
+
+
+def label(c: Constraint, spec: CoherenceSpec) -> str:
+    kind, i = c
+    if kind == "plane":
+        return f"{_LABELS[kind]} {i} (wt={spec.plane_weight} en {spec.planes[i]})"
+    if kind == "axis":
+        return f"{_LABELS[kind]} {i} {spec.axes[i]}"
+    return f"{_LABELS[kind]} ({len(spec.parity_bits)} bits) = {spec.parity_value}"
+
+
+def forced_parity(spec: CoherenceSpec) -> int | None:
+    """
+    Paridad fijada por los pesos de plano si parity_bits es exactamente una
+    unión de planos: XOR = (número de planos * peso) mod 2. None si no aplica.
+    """
+    if spec.plane_weight is None or not spec.parity_bits:
+        return None
+    bits = set(spec.parity_bits)
+    covered = [p for p in spec.planes if set(p) <= bits]
+    if set().union(*map(set, covered)) != bits:
+        return None
+    return (len(covered) * spec.plane_weight) % 2
+
+
+@dataclass(frozen=True)
+class Analysis:
+    spec: CoherenceSpec
+    reduced: CoherenceSpec
+    removed: Tuple[Constraint, ...]
+    reasons: Dict[Constraint, str]
+    m_good: int
+
+    @property
+    def empty(self) -> bool:
+        return self.m_good == 0
+
+    def dropped(self, kind: str, i: int = 0) -> bool:
+        return (kind, i) in self.removed
+
+
+def analyze(spec: CoherenceSpec) -> Analysis:
+    m_good = count_good(spec)
+    reasons: Dict[Constraint, str] = {}
+    fp = forced_parity(spec)
+
+    if m_good == 0:
+        # conjunto vacío: se señala la restricción cuya ausencia lo haría no vacío
+        if fp is not None and fp != spec.parity_value:
+            reasons[("parity", 0)] = f"contradicción: los pesos fijan paridad {fp}"
+        else:
+            for c in constraints(spec):
+                if count_good(without(spec, [c])) > 0:
+                    reasons[c] = "sin ella M>0"
+                    break
+        return Analysis(spec, spec, (), reasons, 0)
+
+    removed: List[Constraint] = []
+    for c in constraints(spec):
+        if count_good(without(spec, removed + [c])) == m_good:
+            removed.append(c)
+            if c == ("parity", 0) and fp is not None:
+                reasons[c] = f"implícita: los pesos de plano fijan paridad {fp}"
+            else:
+                reasons[c] = "implícita por las demás (M sin cambio)"
+    return Analysis(spec, without(spec, removed), tuple(removed), reasons, m_good)
+
+
+def report(analysis: Analysis, gates_saved: int | None = None) -> str:
+    spec = analysis.spec
+    if analysis.empty:
+        why = "; ".join(f"{label(c, spec)}: {r}" for c, r in analysis.reasons.items())
+        return f"[redundancy] conjunto vacío (M=0), no se simula{' -> ' + why if why else ''}"
+    if not analysis.removed:
+        return "[redundancy] ninguna restricción redundante"
+    parts = [f"{label(c, spec)} ({analysis.reasons[c]})" for c in analysis.removed]
+    msg = "[redundancy] quitadas del oráculo: " + "; ".join(parts)
+    if gates_saved is not None:
+        msg += f" | puertas ahorradas por iteración: {gates_saved}"
+    return msg
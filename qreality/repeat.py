@@ -0,0 +1,170 @@
+"""
+qreality/repeat.py
+
+Construcción por bloques: la preparación y la iteración de Grover
+(oráculo + difusión) se construyen y transpilan UNA vez, y el circuito final
+se ensambla componiendo k copias del bloque ya transpilado. Así el coste de
+build + transpile no depende de k; solo la composición (barata) crece con k.
+
+Los bloques comparten registros con el circuito final (q = qregs[0] y
+c = cregs[0]); transpilar para AerSimulator no cambia el layout, así que los
+bloques transpilados se pueden componer directamente.
+
+Cada bloque pasa antes por qreality.peephole (pares X/H/CX/MCX adyacentes).
+
+Transpilar por separado pierde las fusiones de 1 qubit entre bloques (la
+difusión acaba con H sobre q y el oráculo siguiente empieza con X): +6
+puertas por iteración frente a transpilar el circuito entero. Por eso cada
+bloque se parte en cabeza / cuerpo / cola (puertas de 1 qubit antes de la
+primera y después de la última puerta multi-qubit de cada qubit) y cada
+costura cola + cabeza distinta (prep|step, step|step, step|last) se
+transpila UNA vez; el coste sigue sin depender de k.
+
+Las k copias comparten las operaciones del bloque (compose con copy=False),
+pero Qiskit guarda los parámetros por instrucción y Aer los vuelve a copiar al
+ensamblar: un bloque con parámetros densos (DiagonalGate del oráculo
+"diagonal": 2^n complejos) cuesta ~PARAM_BYTES por parámetro y copia. Con
+`max_bytes` se comprueba antes de componer (repeated_bytes) y se lanza
+MemoryError en lugar de dejar que el proceso muera por falta de memoria.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple
+
+from qreality.cache import cached_transpile
+from qreality.instrument import stage
+from qreality.peephole import optimize
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+
+BlockBuilder = Callable[[], "QuantumCircuit"]
+
+# bytes por parámetro y copia del bloque: ~20 en el circuito Python + ~57 al
+# ensamblar en Aer (medido con DiagonalGate de 2^16 entradas, k=100)
+PARAM_BYTES = 80
+
+
+def block_params(qc: QuantumCircuit) -> int:
+    return sum(len(inst.operation.params) for inst in qc.data)
+
+
+def repeated_bytes(block: QuantumCircuit, copies: int) -> int:
+    """Memoria de los parámetros de `copies` copias de `block` (circuito + ensamblado Aer)."""
+    return PARAM_BYTES * block_params(block) * copies
+
+
+def transpile_block(name: str, build: BlockBuilder, backend, opt_level: int,
+                    cache_inputs: Dict[str, Any] | None = None,
+                    peephole: bool = True) -> QuantumCircuit:
+    def built() -> QuantumCircuit:
+        # peephole: cancela pares X/H/CX/MCX del compute/uncompute antes de transpile
+        with stage("build"):
+            qc = build()
+            return optimize(qc) if peephole else qc
+
+    if cache_inputs is None:
+        from qiskit import transpile
+
+        qc = built()
+        with stage("transpile"):
+            return transpile(qc, backend, optimization_level=opt_level)
+    return cached_transpile(dict(cache_inputs, block=name, peephole=peephole), built, backend,
+                            opt_level)
+
+
+def _single_qubit(inst) -> bool:
+    from qiskit.circuit import Gate
+
+    return len(inst.qubits) == 1 and not inst.clbits and isinstance(inst.operation, Gate)
+
+
+def split_block(qc: QuantumCircuit) -> Tuple[QuantumCircuit, QuantumCircuit, QuantumCircuit]:
+    """
+    (cabeza, cuerpo, cola) de `qc`: la cabeza son las puertas de 1 qubit
+    anteriores a la primera multi-qubit de su qubit y la cola las posteriores
+    a la última (un qubit sin puertas multi-qubit va entero a la cola); ambas
+    conmutan con el cuerpo. La fase global se queda en el cuerpo.
+    """
+    first: Dict[object, int] = {}
+    last: Dict[object, int] = {}
+    for i, inst in enumerate(qc.data):
+        if not _single_qubit(inst):
+            for q in inst.qubits:
+                first.setdefault(q, i)
+                last[q] = i
+    head, body, tail = qc.copy_empty_like(), qc.copy_empty_like(), qc.copy_empty_like()
+    head.global_phase = tail.global_phase = 0
+    for i, inst in enumerate(qc.data):
+        part = body
+        if _single_qubit(inst):
+            q = inst.qubits[0]
+            if q in last and i < first[q]:
+                part = head
+            elif q not in last or i > last[q]:
+                part = tail
+        part.append(inst.operation, inst.qubits, inst.clbits, copy=False)
+    return head, body, tail
+
+
+def _seam(tail: QuantumCircuit, head: QuantumCircuit, backend, opt_level: int) -> QuantumCircuit:
+    """cola de un bloque + cabeza del siguiente, transpiladas juntas (fusiones de 1 qubit)."""
+    from qiskit import transpile
+
+    qc = tail.compose(head)
+    with stage("transpile"):
+        return transpile(qc, backend, optimization_level=opt_level)
+
+
+def assemble_repeated(prep: BlockBuilder, step: BlockBuilder, iterations: int, backend,
+                      opt_level: int, last_step: BlockBuilder | None = None,
+                      cache_inputs: Dict[str, Any] | None = None,
+                      measure: bool = True, max_bytes: int | None = None,
+                      last_inputs: Dict[str, Any] | None = None) -> QuantumCircuit:
+    """
+    prep + step^(k) + medida de q en c, con los bloques transpilados una vez.
+    Con `last_step` la última de las k iteraciones usa ese bloque (fases propias);
+    `last_inputs` se añade solo a la clave de caché de ese bloque.
+    Con measure=False no se añaden medidas (para save_probabilities / muestreo).
+    Con `max_bytes`, MemoryError si las copias de los parámetros no caben.
+    """
+    tprep = transpile_block("prep", prep, backend, opt_level, cache_inputs)
+
+    n_std = iterations
+    tlast = None
+    if last_step is not None and iterations > 0:
+        n_std -= 1
+        last_key = None if cache_inputs is None else dict(cache_inputs, **(last_inputs or {}))
+        tlast = transpile_block("last", last_step, backend, opt_level, last_key)
+
+    tstep = None
+    if n_std > 0:
+        tstep = transpile_block("step", step, backend, opt_level, cache_inputs)
+        need = repeated_bytes(tstep, n_std)
+        if max_bytes is not None and need > max_bytes:
+            from qreality.preflight import format_bytes
+
+            raise MemoryError(f"{n_std} copias del bloque step: {format_bytes(need)} de parámetros"
+                              f" > {format_bytes(max_bytes)}")
+
+    head, body, pending = split_block(tprep)
+    qc = head.compose(body)
+    parts = {id(b): split_block(b) for b in (tstep, tlast) if b is not None}
+    seams: Dict[Tuple[int, int], QuantumCircuit] = {}
+    prev = id(tprep)
+    for block in [tstep] * n_std + ([tlast] if tlast is not None else []):
+        head, body, tail = parts[id(block)]
+        # costura cola(prev) + cabeza(block): una transpilación por par de bloques
+        if (prev, id(block)) not in seams:
+            seams[prev, id(block)] = _seam(pending, head, backend, opt_level)
+        # copy=False: las copias comparten las operaciones del bloque (no se modifican)
+        qc.compose(seams[prev, id(block)], inplace=True, copy=False)
+        qc.compose(body, inplace=True, copy=False)
+        pending, prev = tail, id(block)
+    qc.compose(pending, inplace=True, copy=False)
+
+    if measure:
+        qc.measure(qc.qregs[0], qc.cregs[0])
+    return qc
@@ -0,0 +1,245 @@
+"""
+qreality/runner.py
+
+Barridos de configuraciones en un pool de procesos, sin editar las constantes
+de los scripts (SIGN, K_FIXED, SHOTS) ni relanzarlos a mano.
+
+Una configuración es un dict con:
+
+  variant   v5 | v8 | v10 | v13
+  sign      +1 | -1 (v8, v10, v13; None = el del script)
+  iterations, opt_level, shots, oracle, backend, sampling, mcx_mode
+
+La rejilla es el producto cartesiano de listas de valores (CLI o JSON). Cada
+proceso del pool carga los scripts una vez y llama a run() con los parámetros
+del punto (sign incluido: no se toca ninguna constante del módulo); el
+resultado es el registro de qreality.instrument (etapas, P(good), metadatos
+de Aer) más la configuración, o el error.
+
+Hilos: cada proceso limita Aer a cpus // workers hilos ($QREALITY_AER_THREADS
+y OMP_NUM_THREADS), para no sobresuscribir los núcleos.
+
+Los resultados se añaden a un JSONL en cuanto termina cada punto. Al
+relanzar con el mismo fichero se saltan los puntos ya completados (sin
+error): un barrido interrumpido continúa donde se quedó.
+
+Uso:
+    python -m qreality.runner v8 v10 --sign 1 -1 --iterations 10 20 30 \\
+        --opt-levels 1 2 --shots 1024 8192 --oracle diagonal --workers 4 -o sweep.jsonl
+    python -m qreality.runner --grid grid.json -o sweep.jsonl     # relanzar = reanudar
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Set
+
+from qreality import variants
+
+Config = Dict[str, Any]
+
+DEFAULTS: Config = {
+    "sign": None, "iterations": None, "opt_level": 1, "shots": 4096, "oracle": "ancilla",
+    "backend": "aer", "sampling": False, "mcx_mode": "noancilla",
+}
+_FIELDS = ("variant",) + tuple(DEFAULTS)
+
+
+# ---------------------------
+# Rejilla
+# ---------------------------
+def grid(variants_: Sequence[str], **axes: Iterable[Any]) -> List[Config]:
+    """Producto cartesiano; los ejes ausentes o vacíos toman el valor de DEFAULTS."""
+    unknown = set(axes) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"parámetros desconocidos: {', '.join(sorted(unknown))}")
+    names = list(DEFAULTS)
+    values = [list(axes.get(n) or [DEFAULTS[n]]) for n in names]
+    out, seen = [], set()
+    for v in variants_:
+        signed = v in variants.SIGNED
+        for combo in itertools.product(*values):
+            c = dict(variant=v, **dict(zip(names, combo)))
+            if not signed:
+                c["sign"] = None   # v5 no tiene rama ±
+            key = config_key(c)
+            if key not in seen:
+                seen.add(key)
+                out.append(c)
+    return out
+
+
+def load_grid(path: str) -> List[Config]:
+    """JSON: lista de configuraciones o {"variants": [...], "<parámetro>": [...]}."""
+    with open(path) as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        return [dict(DEFAULTS, **c) for c in spec]
+    spec = dict(spec)
+    return grid(spec.pop("variants", list(variants.VARIANTS)), **spec)
+
+
+def config_key(config: Config) -> str:
+    return json.dumps({k: config.get(k, DEFAULTS.get(k)) for k in _FIELDS}, sort_keys=True)
+
+
+def check_config(config: Config) -> None:
+    if config.get("sign") is not None and config["variant"] not in variants.SIGNED:
+        raise ValueError(f"{config['variant']} no tiene rama de signo (sign={config['sign']})")
+
+
+# ---------------------------
+# Proceso del pool
+# ---------------------------
+def _init_worker(threads: int) -> None:
+    os.environ["QREALITY_AER_THREADS"] = str(threads)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+
+def run_config(config: Config, quiet: bool = True) -> Dict[str, Any]:
+    """Ejecuta una configuración en este proceso y devuelve su registro."""
+    from qreality.instrument import collect
+
+    config = dict(DEFAULTS, **config)
+    m = variants.load(config["variant"])
+    rec: Dict[str, Any] = {"config": config, "key": config_key(config), "pid": os.getpid()}
+    t0 = time.perf_counter()
+    out = io.StringIO()
+    try:
+        check_config(config)
+        with collect() as records, contextlib.redirect_stdout(out if quiet else sys.stdout):
+            common = dict(backend=config["backend"], oracle=config["oracle"],
+                          sampling=config["sampling"], mcx_mode=config["mcx_mode"],
+                          sign=config["sign"])
+            if config["variant"] == "v13":
+                k = config["iterations"] if config["iterations"] is not None else m.K_FIXED
+                m.run(k_fixed=k, shots=config["shots"], opt_level=config["opt_level"], **common)
+            else:
+                m.run(shots=config["shots"], iterations=config["iterations"],
+                      opt_level=config["opt_level"], **common)
+        rec["trace"] = records[-1] if records else None
+        rec["error"] = None
+    except Exception as e:   # el barrido sigue; el punto queda pendiente para reanudar
+        rec["trace"] = None
+        rec["error"] = repr(e)
+    rec["seconds"] = time.perf_counter() - t0
+    rec["p_good"] = (rec["trace"] or {}).get("p_good")
+    return rec
+
+
+# ---------------------------
+# Barrido
+# ---------------------------
+def completed(path: str) -> Set[str]:
+    """Claves de los puntos ya terminados sin error en `path` (JSONL)."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue   # línea a medias de un proceso interrumpido
+            if rec.get("error") is None and "key" in rec:
+                done.add(rec["key"])
+    return done
+
+
+def sweep(configs: Sequence[Config], output: str, workers: int | None = None,
+          threads: int | None = None, verbose: bool = True) -> Iterator[Dict[str, Any]]:
+    """Ejecuta las configuraciones pendientes y va añadiendo cada resultado a `output`."""
+    done = completed(output)
+    pending, seen, skipped = [], set(), 0
+    for c in configs:
+        key = config_key(dict(DEFAULTS, **c))
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in done:
+            skipped += 1
+        else:
+            pending.append(c)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(pending) or 1))
+    threads = threads or max(1, cpus // workers)
+    if verbose:
+        print(f"[runner] {len(pending)} pendientes ({skipped} ya hechas) workers={workers} "
+              f"hilos/worker={threads} -> {output}")
+    if not pending:
+        return
+
+    if os.path.exists(output) and os.path.getsize(output):
+        with open(output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            partial = f.read(1) != b"\n"
+        if partial:   # última línea cortada por una interrupción
+            with open(output, "a") as f:
+                f.write("\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(threads,)) as pool, open(output, "a") as f:
+        futures = [pool.submit(run_config, c) for c in pending]
+        for i, fut in enumerate(as_completed(futures), 1):
+            rec = fut.result()
+            f.write(json.dumps(rec, default=str) + "\n")
+            f.flush()
+            if verbose:
+                c = rec["config"]
+                if rec["error"]:
+                    status = f"error={rec['error']}"
+                elif rec["p_good"] is None:   # M = 0: run() no simula
+                    status = f"M={(rec['trace'] or {}).get('M')} sin simular"
+                else:
+                    status = f"P(good)={rec['p_good']:.6f}"
+                print(f"[runner] {i}/{len(pending)} {c['variant']} sign={c['sign']} "
+                      f"k={c['iterations']} opt={c['opt_level']} shots={c['shots']} "
+                      f"{rec['seconds']:.2f}s {status}")
+            yield rec
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Barrido de configuraciones en paralelo.")
+    parser.add_argument("variants", nargs="*", help=f"{', '.join(variants.VARIANTS)} (por defecto todas)")
+    parser.add_argument("--grid", help="rejilla JSON (sustituye a los ejes de la línea de órdenes)")
+    parser.add_argument("--sign", type=int, nargs="+", choices=(1, -1))
+    parser.add_argument("--iterations", type=int, nargs="+")
+    parser.add_argument("--opt-levels", type=int, nargs="+")
+    parser.add_argument("--shots", type=int, nargs="+")
+    parser.add_argument("--oracle", nargs="+", choices=("ancilla", "diagonal", "mcp"))
+    parser.add_argument("--backend", nargs="+", choices=("aer", "analytic", "numpy", "symmetric"))
+    parser.add_argument("--sampling", action="store_true")
+    parser.add_argument("--mcx-mode", nargs="+", choices=("noancilla", "vchain"))
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto cpu_count)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="hilos de Aer por proceso (por defecto cpu_count // workers)")
+    parser.add_argument("-o", "--output", default="sweep.jsonl")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.variants) - set(variants.VARIANTS)
+    if unknown:
+        parser.error(f"variante desconocida: {', '.join(sorted(unknown))}")
+    if args.grid:
+        configs = load_grid(args.grid)
+    else:
+        configs = grid(args.variants or list(variants.VARIANTS), sign=args.sign,
+                       iterations=args.iterations, opt_level=args.opt_levels, shots=args.shots,
+                       oracle=args.oracle, backend=args.backend,
+                       sampling=[True] if args.sampling else None, mcx_mode=args.mcx_mode)
+    failed = sum(rec["error"] is not None for rec in
+                 sweep(configs, args.output, args.workers, args.threads))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
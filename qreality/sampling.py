@@ -0,0 +1,62 @@
+"""
+qreality/sampling.py
+
+Muestreo directo de shots: la distribución del registro de datos está
+fijada antes de medir, así que se calcula UNA vez (save_probabilities de Aer
+o el statevector) y los shots salen de un único multinomial vectorizado,
+sin simular ni contar medida a medida. Coste O(2^n) independiente de shots
+(10^8 shots cuestan lo mismo que 10^3).
+
+Los conteos se devuelven como array entero indexado por estado
+(índice x = bit i en q[i] = int(bitstring medido, 2)); counts_to_dict da el
+formato de get_counts() cuando hace falta.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+from qreality.instrument import aer_result
+
+
+def multinomial_counts(probs: np.ndarray, shots: int,
+                       rng: np.random.Generator | None = None) -> np.ndarray:
+    """Array int64 (2^n) con los conteos de `shots` medidas de P(x)."""
+    rng = np.random.default_rng() if rng is None else rng
+    p = np.asarray(probs, dtype=np.float64)
+    p = p / p.sum()
+    return rng.multinomial(shots, p)
+
+
+def counts_to_dict(counts: np.ndarray, n_bits: int) -> Dict[str, int]:
+    """Conteos por índice -> dict {bitstring medido: conteo} (solo entradas no nulas)."""
+    fmt = f"0{n_bits}b"
+    nz = np.flatnonzero(counts)
+    return {format(x, fmt): v for x, v in zip(nz.tolist(), counts[nz].tolist())}
+
+
+def aer_probabilities(qc, backend, label: str = "probs") -> np.ndarray:
+    """
+    P(x) del primer registro cuántico (datos) al final de `qc`, que no debe
+    llevar medidas. Una sola ejecución (shots=1) con save_probabilities.
+    """
+    import qiskit_aer  # noqa: F401  (registra save_probabilities en QuantumCircuit)
+
+    qc = qc.copy()
+    qc.save_probabilities(qc.qregs[0], label=label)
+    result = backend.run(qc, shots=1).result()
+    aer_result(result)
+    return np.asarray(result.data(0)[label], dtype=np.float64)
+
+
+def sample_probabilities(probs: np.ndarray, shots: int, n_bits: int | None = None,
+                         rng: np.random.Generator | None = None, as_dict: bool = False):
+    """Conteos como array (por defecto) o dict get_counts() con `as_dict=True`."""
+    counts = multinomial_counts(probs, shots, rng)
+    if not as_dict:
+        return counts
+    if n_bits is None:
+        n_bits = int(counts.size).bit_length() - 1
+    return counts_to_dict(counts, n_bits)
@@ -0,0 +1,239 @@
+"""
+qreality/scaling.py
+
+Benchmark de escalado del modelo p x d (qreality.model) de 12 a ~32 bits
+lógicos: por forma, el conteo y la enumeración de good (M, k) y, por
+backend, tiempo de pared y pico de RSS (VmHWM, como qreality.bench) de
+
+  analytic   subespacio 2D + muestreo (necesita los índices good, no 2^n)
+  numpy      statevector NumPy de 2^n amplitudes (GroverStatevector)
+  symmetric  una amplitud por órbita de permutaciones (qreality.symmetry)
+  aer        circuito del modelo transpilado y simulado en AerSimulator
+
+Cada forma es PlaneModel(p, d) con peso d//2 por plano, los d-1 primeros ejes
+alineados y, con --sign, restricción de paridad (la familia de v5/v8);
+--weight/--axes/--sign-rule lo cambian. Los backends que no caben en el
+presupuesto de memoria (--budget, $QREALITY_MEMORY_BUDGET o RAM/2), o cuyo
+tiempo previsto por preflight supera --max-seconds, se anotan como saltados
+con el motivo en lugar de lanzarse. En Aer la memoria incluye los parámetros
+del circuito (k copias de la DiagonalGate de 2^n entradas con el oráculo
+"diagonal"), que desde ~20 bits domina sobre el statevector.
+
+Uso:
+    python -m qreality.scaling                                  # 3x4 ... 4x8
+    python -m qreality.scaling --shapes 3x4 4x4 3x6 --backends analytic numpy \\
+        --sign 1 --k 5 -o scaling.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Sequence, Tuple
+
+from qreality.analytic import iteration_phases, p_good, sample_counts
+from qreality.bench import stage
+from qreality.model import SIGN_RULES, PlaneModel
+from qreality.preflight import format_bytes, memory_budget
+
+BACKENDS = ("analytic", "numpy", "symmetric", "aer")
+DEFAULT_SHAPES = ("3x4", "4x4", "3x6", "5x4", "4x6", "7x4", "4x8")   # 12 ... 32 bits
+# numpy: psi (complex128) + |psi|^2 (float64) + máscara good (bool)
+NUMPY_BYTES_PER_STATE = 16 + 8 + 1
+
+Record = Dict[str, Any]
+
+
+def parse_shape(text: str) -> Tuple[int, int]:
+    p, _, d = text.lower().partition("x")
+    try:
+        return int(p), int(d)
+    except ValueError:
+        raise ValueError(f"forma inválida: {text!r} (usa PxD, p. ej. 3x4)") from None
+
+
+def shape_model(planes: int, dim: int, weight: int | None = None, axes: int | None = None,
+                sign: int | None = None, sign_rule: str = "total") -> PlaneModel:
+    """Peso d//2 y d-1 ejes alineados por defecto (v5/v8 generalizados)."""
+    n_axes = dim - 1 if axes is None else axes
+    return PlaneModel(planes, dim, weight=dim // 2 if weight is None else weight,
+                      axes=tuple(range(n_axes)) if planes > 1 else (), sign=sign, sign_rule=sign_rule)
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+def bench_analytic(model: PlaneModel, k: int, shots: int, good) -> Record:
+    stages: Dict[str, Dict[str, float]] = {}
+    with stage(stages, "simulate"):
+        pg = p_good(len(good) / model.n_states, iteration_phases(k))
+        sample_counts(good, model.n_bits, pg, shots)
+    return {"stages": stages, "p_good": pg}
+
+
+def bench_numpy(model: PlaneModel, k: int, shots: int, budget: int | None) -> Record:
+    from qreality.bitmask import good_mask
+    from qreality.statevector import GroverStatevector, counts_from_probabilities
+
+    need = NUMPY_BYTES_PER_STATE * model.n_states
+    if budget is not None and need > budget:
+        return {"skipped": f"memoria {format_bytes(need)} > presupuesto {format_bytes(budget)}"}
+    stages: Dict[str, Dict[str, float]] = {}
+    with stage(stages, "mask"):
+        good = good_mask(model.spec())
+    with stage(stages, "simulate"):
+        sv = GroverStatevector(good).evolve(iteration_phases(k))
+        pg = sv.p_good()
+    with stage(stages, "sampling"):
+        counts_from_probabilities(sv.probabilities(), model.n_bits, shots)
+    return {"stages": stages, "p_good": pg}
+
+
+def bench_symmetric(model: PlaneModel, k: int, shots: int, budget: int | None) -> Record:
+    from qreality.symmetry import OrbitBasis, orbit_count, orbit_statevector
+
+    n_orbits = orbit_count(model)
+    need = (NUMPY_BYTES_PER_STATE + 8 + 2 * model.planes) * n_orbits   # + |o| y las filas
+    if budget is not None and need > budget:
+        return {"orbits": n_orbits,
+                "skipped": f"{n_orbits} órbitas: {format_bytes(need)} > presupuesto {format_bytes(budget)}"}
+    stages: Dict[str, Dict[str, float]] = {}
+    with stage(stages, "orbits"):
+        basis = OrbitBasis(model)
+    with stage(stages, "simulate"):
+        sv = orbit_statevector(basis, iteration_phases(k))
+        pg = sv.p_good()
+    with stage(stages, "sampling"):
+        basis.sample(sv.probabilities(), shots)
+    return {"orbits": n_orbits, "stages": stages, "p_good": pg}
+
+
+def bench_aer(model: PlaneModel, k: int, shots: int, budget: int | None, oracle: str,
+              opt_level: int, max_seconds: float | None) -> Record:
+    from qreality.bitmask import good_mask
+    from qreality.model import build_iteration, build_prep, new_circuit
+    from qreality.postprocess import count_good_shots, counts_to_arrays
+    from qreality.preflight import estimate, oracle_bytes, plan_simulation
+    from qreality.repeat import assemble_repeated
+
+    plan = plan_simulation(lambda o: new_circuit(model, o).num_qubits, oracle, budget,
+                           downgrades=("oracle", "single"),
+                           circuit_bytes_for=lambda o: oracle_bytes(o, model.n_bits, k))
+    if not plan.fits:
+        return {"skipped": f"demasiado grande: {plan.n_qubits} qubits, oracle={plan.oracle}, "
+                           f"{format_bytes(plan.memory)} > presupuesto {format_bytes(budget)}"}
+    sim = plan.simulator()
+    stages: Dict[str, Dict[str, float]] = {}
+    with stage(stages, "build"):
+        prep = build_prep(model, plan.oracle)
+        step = build_iteration(model, plan.oracle)
+    with stage(stages, "transpile"):
+        # lo que deja el statevector para los parámetros (comprobado con el bloque real)
+        room = None if budget is None else budget - (plan.memory - plan.circuit_memory)
+        try:
+            tqc = assemble_repeated(lambda: prep, lambda: step, k, sim, opt_level, max_bytes=room)
+        except MemoryError as e:
+            return {"skipped": f"demasiado grande: {e}"}
+    est = estimate(tqc, plan)
+    out: Record = {"oracle": plan.oracle, "precision": plan.precision, "width": tqc.num_qubits,
+                   "gates_per_iteration": step.size(), "predicted_seconds": est.seconds,
+                   "stages": stages}
+    if max_seconds is not None and est.seconds is not None and est.seconds > max_seconds:
+        out["skipped"] = f"tiempo previsto {est.seconds:.0f}s > {max_seconds:.0f}s"
+        return out
+    with stage(stages, "simulate"):
+        counts = sim.run(tqc, shots=shots, seed_simulator=1234).result().get_counts()
+    with stage(stages, "postprocess"):
+        idx, cnt = counts_to_arrays(counts)
+        out["p_good"] = count_good_shots(idx, cnt, good_mask(model.spec())) / shots
+    return out
+
+
+# ---------------------------
+# Barrido de formas
+# ---------------------------
+def bench_shape(model: PlaneModel, backends: Sequence[str], iterations: int | None = None,
+                shots: int = 4096, budget: int | None = None, oracle: str = "ancilla",
+                opt_level: int = 1, max_seconds: float | None = 120.0) -> Record:
+    stages: Dict[str, Dict[str, float]] = {}
+    with stage(stages, "count"):
+        m_good = model.count()
+    with stage(stages, "enumerate"):
+        good = model.good_indices()
+    k = model.iterations(m_good) if iterations is None else iterations
+    rec: Record = {"shape": f"{model.planes}x{model.dim}", "model": model.label,
+                   "n_bits": model.n_bits, "M": m_good, "k": k, "stages": stages, "backends": {}}
+    for b in backends:
+        if b == "analytic":
+            r = bench_analytic(model, k, shots, good)
+        elif b == "numpy":
+            r = bench_numpy(model, k, shots, budget)
+        elif b == "symmetric":
+            r = bench_symmetric(model, k, shots, budget)
+        else:
+            r = bench_aer(model, k, shots, budget, oracle, opt_level, max_seconds)
+        rec["backends"][b] = r
+    return rec
+
+
+def format_record(r: Record) -> List[str]:
+    c, e = r["stages"]["count"], r["stages"]["enumerate"]
+    lines = [f"[scaling] {r['model']} n={r['n_bits']} M={r['M']} k={r['k']} "
+             f"count={c['seconds']:.3f}s enumerate={e['seconds']:.3f}s "
+             f"rss={max(c['peak_rss'], e['peak_rss']) / 2**20:.0f}MB"]
+    for b, x in r["backends"].items():
+        if "skipped" in x:
+            lines.append(f"[scaling]   {b:<9} saltado: {x['skipped']}")
+            continue
+        secs = sum(s["seconds"] for s in x["stages"].values())
+        rss = max(s["peak_rss"] for s in x["stages"].values())
+        st = " ".join(f"{n}={s['seconds']:.3f}s" for n, s in x["stages"].items())
+        extra = f" width={x['width']} oracle={x['oracle']}" if "width" in x else ""
+        if "orbits" in x:
+            extra = f" órbitas={x['orbits']}"
+        lines.append(f"[scaling]   {b:<9} {secs:8.3f}s rss={rss / 2**20:.0f}MB ({st}){extra} "
+                     f"P(good)={x['p_good']:.4f}")
+    return lines
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Escalado del modelo p x d por backend.")
+    parser.add_argument("--shapes", nargs="+", default=list(DEFAULT_SHAPES), help="formas PxD")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--weight", type=int, default=None, help="peso por plano (por defecto d//2)")
+    parser.add_argument("--axes", type=int, default=None, help="ejes alineados (por defecto d-1)")
+    parser.add_argument("--sign", type=int, default=None, choices=(1, -1))
+    parser.add_argument("--sign-rule", default="total", choices=SIGN_RULES)
+    parser.add_argument("--k", type=int, default=None, help="iteraciones (por defecto el k sugerido)")
+    parser.add_argument("--shots", type=int, default=4096)
+    parser.add_argument("--oracle", default="ancilla", choices=("ancilla", "diagonal", "mcp"))
+    parser.add_argument("--opt-level", type=int, default=1)
+    parser.add_argument("--budget", default=None, help='presupuesto de memoria ("2G"; por defecto RAM/2)')
+    parser.add_argument("--max-seconds", type=float, default=120.0,
+                        help="saltar Aer si el tiempo previsto lo supera")
+    parser.add_argument("-o", "--output", default=None, help="guardar los registros en JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        models = [shape_model(*parse_shape(s), args.weight, args.axes, args.sign, args.sign_rule)
+                  for s in args.shapes]
+    except ValueError as e:
+        parser.error(str(e))
+    budget = memory_budget(args.budget)
+
+    results = []
+    for model in models:
+        r = bench_shape(model, args.backends, args.k, args.shots, budget, args.oracle,
+                        args.opt_level, args.max_seconds)
+        results.append(r)
+        print("\n".join(format_record(r)), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"budget": budget, "results": results}, f, indent=1)
+        print(f"[scaling] {len(results)} formas -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
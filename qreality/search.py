@@ -0,0 +1,406 @@
+"""
+qreality/search.py
+
+Modo "M desconocido": encontrar un estado good o estimar M sin contar ni
+enumerar good clásicamente. Solo se usan medidas tras k iteraciones estándar
+(pi, pi) y la comprobación clásica de C(x) sobre cada muestra (O(n) por
+muestra, nunca los 2^n estados).
+
+  find   búsqueda exponencial aleatorizada (Boyer-Brassard-Høyer-Tapp):
+         k uniforme en [0, m), m *= 6/5 tras cada fallo (tope sqrt(N)).
+         Llamadas esperadas <= 9/2 * sqrt(N/M) sin conocer M.
+  count  estimación de amplitud por máxima verosimilitud (MLAE) con
+         k = 0, 1, 2, 4, ... y `shots` por ronda; se para en cuanto el
+         intervalo de confianza (razón de verosimilitud, nivel 1 - alpha)
+         de M tiene semianchura <= eps * M, o distingue ya el entero M.
+
+El "dispositivo" (AnalyticDevice, NumpyDevice, AerDevice) hace de hardware:
+internamente conoce good para simular, pero los algoritmos solo ven muestras.
+Llamadas al oráculo = suma de k por shot.
+
+Referencia (M conocido, lo que hacen hoy los scripts): k = k_sugerido y se
+repite hasta acertar, k / P(good | k) llamadas esperadas; para contar, la
+enumeración clásica evalúa C(x) en los 2^n estados.
+
+Uso:
+    python -m qreality.search v5 v8 v13 --mode both --trials 200
+    python -m qreality.search --shapes 4x6 4x8 --sign 1 --mode find --eps 0.05 -o search.json
+    python -m qreality.search v13 --backend aer --oracle diagonal --trials 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from dataclasses import asdict, dataclass, field
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from qreality.analytic import iteration_phases, p_good, sample_counts
+from qreality.bitmask import CoherenceSpec, good_indices, good_mask, is_good_index
+from qreality.postprocess import counts_to_arrays
+
+MODES = ("find", "count", "both")
+BACKENDS = ("analytic", "numpy", "aer")
+BBHT_GROWTH = 6 / 5
+LIKELIHOOD_GRID = 4001   # puntos de theta por ronda en count
+FULL_SCAN_DENSITY = 64   # puntos por periodo de sin^2((2k+1) theta) al barrer todo [0, pi/2]
+LOGLIK_CHUNK = 1 << 16   # filas de theta por bloque al evaluar la verosimilitud
+
+Record = Dict[str, Any]
+
+
+# ---------------------------
+# Dispositivos: k iteraciones estándar + medida de q
+# ---------------------------
+class AnalyticDevice:
+    """Subespacio 2D good/bad (qreality.analytic)."""
+
+    def __init__(self, spec: CoherenceSpec):
+        self.n_bits = spec.n_bits
+        self._good = good_indices(spec)
+        self._theta = math.asin(math.sqrt(len(self._good) / (1 << spec.n_bits)))
+
+    def sample(self, k: int, shots: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        pg = math.sin((2 * k + 1) * self._theta) ** 2   # iteraciones estándar: forma cerrada
+        return counts_to_arrays(sample_counts(self._good, self.n_bits, pg, shots, rng))
+
+
+class NumpyDevice:
+    """Statevector NumPy; P(x) por k se guarda (BBHT repite k a menudo)."""
+
+    def __init__(self, spec: CoherenceSpec):
+        self.n_bits = spec.n_bits
+        self._good = good_mask(spec)
+        self._probs: Dict[int, np.ndarray] = {}
+
+    def sample(self, k: int, shots: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        from qreality.sampling import multinomial_counts
+        from qreality.statevector import GroverStatevector
+
+        if k not in self._probs:
+            self._probs[k] = GroverStatevector(self._good).evolve(iteration_phases(k)).probabilities()
+        return counts_to_arrays(multinomial_counts(self._probs[k], shots, rng))
+
+
+class AerDevice:
+    """Circuito prep + step^k en AerSimulator; los bloques se transpilan una vez (caché)."""
+
+    def __init__(self, n_bits: int, prep: Callable, step: Callable, backend, opt_level: int = 1,
+                 cache_inputs: Dict[str, Any] | None = None):
+        self.n_bits = n_bits
+        self._prep, self._step = prep, step
+        self._backend, self._opt_level = backend, opt_level
+        self._cache_inputs = cache_inputs
+
+    def sample(self, k: int, shots: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        from qreality.repeat import assemble_repeated
+
+        tqc = assemble_repeated(self._prep, self._step, k, self._backend, self._opt_level,
+                                cache_inputs=self._cache_inputs)
+        seed = int(rng.integers(2**31))
+        return counts_to_arrays(self._backend.run(tqc, shots=shots, seed_simulator=seed)
+                                .result().get_counts())
+
+
+def good_shots(spec: CoherenceSpec, idx: np.ndarray, cnt: np.ndarray) -> int:
+    """Shots good comprobando C(x) solo en los índices medidos."""
+    return int(sum(c for x, c in zip(idx.tolist(), cnt.tolist()) if is_good_index(spec, x)))
+
+
+# ---------------------------
+# find: búsqueda exponencial (BBHT)
+# ---------------------------
+@dataclass
+class SearchResult:
+    found: int | None          # índice good (bit i = q[i]) o None si se agotó max_calls
+    oracle_calls: int
+    attempts: int
+
+
+def exponential_search(device, spec: CoherenceSpec, rng: np.random.Generator | None = None,
+                       growth: float = BBHT_GROWTH, max_calls: int | None = None) -> SearchResult:
+    """
+    BBHT: en cada intento k ~ U[0, m) y un shot; si x no es good, m = min(growth*m, sqrt(N)).
+    Con M = 0 no termina sola: `max_calls` (por defecto 20 * sqrt(N)) la corta.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    cap = math.sqrt(1 << spec.n_bits)
+    max_calls = int(20 * cap) if max_calls is None else max_calls
+    m, calls, attempts = 1.0, 0, 0
+    while calls <= max_calls:
+        k = int(rng.integers(0, math.ceil(m)))
+        idx, _ = device.sample(k, 1, rng)
+        calls += k
+        attempts += 1
+        x = int(idx[0])
+        if is_good_index(spec, x):
+            return SearchResult(x, calls, attempts)
+        m = min(growth * m, cap)
+    return SearchResult(None, calls, attempts)
+
+
+# ---------------------------
+# count: estimación de M por máxima verosimilitud (MLAE)
+# ---------------------------
+@dataclass
+class CountEstimate:
+    m: float                   # M estimado
+    low: float                 # intervalo de confianza 1 - alpha
+    high: float
+    oracle_calls: int
+    schedule: List[Tuple[int, int, int]] = field(default_factory=list)   # (k, shots, good)
+
+    @property
+    def m_int(self) -> int:
+        return int(round(self.m))
+
+
+def _loglik(theta: np.ndarray, schedule: Sequence[Tuple[int, int, int]]) -> np.ndarray:
+    """log-verosimilitud de las rondas (k, shots, good) para cada theta (a = sin^2 theta)."""
+    ks = np.array([2 * k + 1 for k, _, _ in schedule], dtype=float)
+    shots = np.array([s for _, s, _ in schedule], dtype=float)
+    hits = np.array([h for _, _, h in schedule], dtype=float)
+    p = np.clip(np.sin(np.outer(theta, ks)) ** 2, 1e-300, 1 - 1e-16)
+    return (hits * np.log(p) + (shots - hits) * np.log1p(-p)).sum(axis=1)
+
+
+def _loglik_grid(grid: np.ndarray, schedule: Sequence[Tuple[int, int, int]]) -> np.ndarray:
+    """_loglik por bloques de LOGLIK_CHUNK (rejillas grandes: k alto en n grande)."""
+    return np.concatenate([_loglik(grid[i:i + LOGLIK_CHUNK], schedule)
+                           for i in range(0, len(grid), LOGLIK_CHUNK)])
+
+
+def _likelihood_interval(schedule: Sequence[Tuple[int, int, int]], lo: float, hi: float,
+                         chi2: float, points: int = LIKELIHOOD_GRID) -> Tuple[float, float, float]:
+    """
+    (theta_mle, theta_low, theta_high) buscando en [lo, hi]: intervalo de razón de
+    verosimilitud 2 (l_max - l(theta)) <= chi2 (más fiable que +-z/sqrt(Fisher)
+    con pocos shots y P(good) cerca de 0 o 1).
+    """
+    grid = np.linspace(lo, hi, points)
+    ll = _loglik_grid(grid, schedule)
+    best = int(np.argmax(ll))
+    inside = np.flatnonzero(2 * (ll[best] - ll) <= chi2)
+    step = grid[1] - grid[0]
+    return (float(grid[best]), max(float(grid[inside[0]]) - step, 0.0),
+            min(float(grid[inside[-1]]) + step, math.pi / 2))
+
+
+def _full_interval(schedule: Sequence[Tuple[int, int, int]], chi2: float) -> Tuple[float, float, float]:
+    """
+    Como _likelihood_interval pero en todo [0, pi/2]: con k grande la verosimilitud
+    tiene alias (picos separados pi/(2k+1)) y la ventana de la ronda anterior puede
+    haber perdido el bueno. Rejilla de FULL_SCAN_DENSITY puntos por periodo de la k
+    mayor, cota de perfil = envolvente de todas las regiones admitidas, y refinado
+    en esa envolvente.
+    """
+    k_max = max(k for k, _, _ in schedule)
+    grid = np.linspace(0.0, math.pi / 2, max(LIKELIHOOD_GRID, FULL_SCAN_DENSITY // 2 * (2 * k_max + 1) + 1))
+    ll = _loglik_grid(grid, schedule)
+    inside = np.flatnonzero(2 * (ll.max() - ll) <= chi2)
+    step = grid[1] - grid[0]
+    lo = max(float(grid[inside[0]]) - step, 0.0)
+    hi = min(float(grid[inside[-1]]) + step, math.pi / 2)
+    # el refinado no debe ser más grueso que el barrido
+    points = max(LIKELIHOOD_GRID, 4 * (int(inside[-1] - inside[0]) + 3))
+    theta, r_lo, r_hi = _likelihood_interval(schedule, lo, hi, chi2, points)
+    return theta, min(lo + step, r_lo), max(hi - step, r_hi)
+
+
+def estimate_count(device, spec: CoherenceSpec, eps: float = 0.1, alpha: float = 0.05,
+                   shots: int = 32, rng: np.random.Generator | None = None,
+                   max_k: int | None = None) -> CountEstimate:
+    """
+    Rondas k = 0, 1, 2, 4, ... con `shots` cada una hasta que el intervalo de M
+    (1 - alpha) tenga semianchura <= eps * M o anchura < 1 (M entero ya fijado),
+    o hasta k >= max_k (por defecto ~ (pi/4) sqrt(N), donde M = 0 ya se distinguiría).
+    Cada ronda busca theta en el intervalo anterior ensanchado (una anchura por lado);
+    antes de parar se vuelve a barrer todo [0, pi/2] (_full_interval) y, si el
+    intervalo completo ya no cumple el criterio, se sigue con él. Las cotas
+    devueltas se redondean hacia fuera al entero.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    n_states = 1 << spec.n_bits
+    max_k = int(math.pi / 4 * math.sqrt(n_states)) + 1 if max_k is None else max_k
+    chi2 = NormalDist().inv_cdf(1 - alpha / 2) ** 2
+
+    def to_m(t: float) -> float:
+        return n_states * math.sin(t) ** 2
+
+    def done(theta: float, lo: float, hi: float) -> bool:
+        m, low, high = to_m(theta), to_m(lo), to_m(hi)
+        return high - low < 1 or (m > 0 and (high - low) / 2 <= eps * m) or k >= max_k
+
+    schedule: List[Tuple[int, int, int]] = []
+    calls, k = 0, 0
+    lo, hi = 0.0, math.pi / 2
+    while True:
+        idx, cnt = device.sample(k, shots, rng)
+        schedule.append((k, shots, good_shots(spec, idx, cnt)))
+        calls += k * shots
+
+        width = hi - lo
+        theta, lo, hi = _likelihood_interval(schedule, max(lo - width, 0.0),
+                                             min(hi + width, math.pi / 2), chi2)
+        if done(theta, lo, hi):
+            theta, lo, hi = _full_interval(schedule, chi2)
+            if done(theta, lo, hi) or k >= max_k:
+                # M es entero: cotas hacia fuera (la chi2 de Wilks se queda corta con
+                # P(good) cerca de 0 o 1 en alguna ronda; v13 cubría ~0.87 sin esto)
+                return CountEstimate(to_m(theta), math.floor(to_m(lo)), math.ceil(to_m(hi)),
+                                     calls, schedule)
+        k = 1 if k == 0 else min(2 * k, max_k)
+
+
+# ---------------------------
+# Referencia con M conocido
+# ---------------------------
+def known_m_calls(n_bits: int, m_good: int) -> float:
+    """Llamadas esperadas con k_sugerido y repetición hasta acertar: k / P(good | k)."""
+    if m_good == 0:
+        return math.inf
+    a = m_good / (1 << n_bits)
+    k = max(0, int(math.pi / (4 * math.asin(math.sqrt(a))) - 0.5)) if a < 1 else 0
+    return k / p_good(a, iteration_phases(k))
+
+
+# ---------------------------
+# Benchmark
+# ---------------------------
+def make_device(spec: CoherenceSpec, backend: str, blocks: Tuple[Callable, Callable] | None = None,
+                oracle: str = "diagonal", opt_level: int = 1, cache_inputs: Dict[str, Any] | None = None):
+    if backend == "analytic":
+        return AnalyticDevice(spec)
+    if backend == "numpy":
+        return NumpyDevice(spec)
+    if backend == "aer":
+        from qiskit_aer import AerSimulator
+
+        if blocks is None:
+            raise ValueError("backend 'aer' necesita los bloques prep/step del circuito")
+        return AerDevice(spec.n_bits, *blocks, AerSimulator(method="statevector"), opt_level,
+                         cache_inputs)
+    raise ValueError(f"backend desconocido: {backend!r} (usa {', '.join(BACKENDS)})")
+
+
+def bench_target(name: str, spec: CoherenceSpec, device, mode: str = "both", trials: int = 100,
+                 eps: float = 0.1, alpha: float = 0.05, shots: int = 32, seed: int = 1234) -> Record:
+    """
+    `trials` ejecuciones de find y/o count frente a la referencia con M conocido.
+    M exacto (combinatorio) solo se usa aquí para puntuar, no en los algoritmos.
+    """
+    from qreality.bitmask import count_good
+
+    rng = np.random.default_rng(seed)
+    n_states = 1 << spec.n_bits
+    m_true = count_good(spec)
+    rec: Record = {"target": name, "n_bits": spec.n_bits, "M": m_true,
+                   "known_m_calls": known_m_calls(spec.n_bits, m_true), "classical_checks": n_states}
+    if mode in ("find", "both"):
+        runs = [exponential_search(device, spec, rng) for _ in range(trials)]
+        calls = np.array([r.oracle_calls for r in runs], dtype=float)
+        rec["find"] = {"mean_calls": float(calls.mean()), "median_calls": float(np.median(calls)),
+                       "p90_calls": float(np.percentile(calls, 90)),
+                       "found": sum(r.found is not None for r in runs) / trials,
+                       "bound": 4.5 * math.sqrt(n_states / m_true) if m_true else None}
+    if mode in ("count", "both"):
+        runs = [estimate_count(device, spec, eps, alpha, shots, rng) for _ in range(trials)]
+        calls = np.array([r.oracle_calls for r in runs], dtype=float)
+        err = np.array([abs(r.m - m_true) for r in runs])
+        rec["count"] = {"mean_calls": float(calls.mean()), "median_calls": float(np.median(calls)),
+                        "mean_abs_error": float(err.mean()),
+                        "exact": sum(r.m_int == m_true for r in runs) / trials,
+                        "coverage": sum(r.low <= m_true <= r.high for r in runs) / trials,
+                        "example": asdict(runs[0])}
+    return rec
+
+
+def format_record(r: Record) -> List[str]:
+    lines = [f"[search] {r['target']} n={r['n_bits']} M={r['M']} "
+             f"ref(M conocido)={r['known_m_calls']:.1f} llamadas  ref(conteo clásico)={r['classical_checks']} C(x)"]
+    if "find" in r:
+        f = r["find"]
+        bound = "n/d" if f["bound"] is None else f"{f['bound']:.1f}"
+        lines.append(f"[search]   find   media={f['mean_calls']:.1f} mediana={f['median_calls']:.0f} "
+                     f"p90={f['p90_calls']:.0f} (cota 9/2·sqrt(N/M)={bound}) encontrado={f['found']:.2%}")
+    if "count" in r:
+        c = r["count"]
+        lines.append(f"[search]   count  media={c['mean_calls']:.1f} mediana={c['median_calls']:.0f} "
+                     f"|M̂-M|={c['mean_abs_error']:.2f} exacto={c['exact']:.2%} cobertura={c['coverage']:.2%}")
+    return lines
+
+
+def _variant_target(name: str, backend: str, oracle: str, opt_level: int):
+    """spec y bloques (prep, step estándar) de un script de variante."""
+    from qreality import variants
+    from qreality.cache import file_digest
+
+    m = variants.load(name)
+    spec = m.coherence_spec()
+    if hasattr(m, "build_circuit_exact"):
+        step = lambda: m.build_iteration(math.pi, math.pi, oracle)   # noqa: E731
+    else:
+        step = lambda: m.build_iteration(oracle)                       # noqa: E731
+    key = {"variant": name, "source": file_digest(m.__file__), "sign": getattr(m, "SIGN", None), "oracle": oracle,
+           "mcx_mode": "noancilla"}
+    return spec, make_device(spec, backend, (lambda: m.build_prep(oracle), step), oracle, opt_level, key)
+
+
+def _shape_target(model, backend: str, oracle: str, opt_level: int):
+    from qreality.model import build_iteration, build_prep
+
+    spec = model.spec()
+    blocks = (lambda: build_prep(model, oracle), lambda: build_iteration(model, oracle))
+    return spec, make_device(spec, backend, blocks, oracle, opt_level)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    from qreality import variants
+    from qreality.scaling import parse_shape, shape_model
+
+    parser = argparse.ArgumentParser(description="Búsqueda / conteo con M desconocido frente a M conocido.")
+    parser.add_argument("variants", nargs="*", help=f"{', '.join(variants.VARIANTS)}")
+    parser.add_argument("--shapes", nargs="+", default=[], help="formas PxD del modelo p x d (qreality.scaling)")
+    parser.add_argument("--sign", type=int, default=None, choices=(1, -1), help="paridad de las formas")
+    parser.add_argument("--mode", default="both", choices=MODES)
+    parser.add_argument("--backend", default="analytic", choices=BACKENDS)
+    parser.add_argument("--oracle", default="diagonal", choices=("ancilla", "diagonal", "mcp"))
+    parser.add_argument("--opt-level", type=int, default=1)
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--eps", type=float, default=0.1, help="semianchura relativa objetivo de M")
+    parser.add_argument("--alpha", type=float, default=0.05, help="1 - nivel de confianza")
+    parser.add_argument("--shots", type=int, default=32, help="shots por ronda en count")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("-o", "--output", default=None, help="guardar los registros en JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        targets = [(n, *_variant_target(n, args.backend, args.oracle, args.opt_level)) for n in args.variants]
+        for s in args.shapes:
+            model = shape_model(*parse_shape(s), sign=args.sign)
+            targets.append((model.label, *_shape_target(model, args.backend, args.oracle, args.opt_level)))
+    except ValueError as e:
+        parser.error(str(e))
+    if not targets:
+        parser.error("indica al menos una variante o --shapes")
+
+    results = []
+    for name, spec, device in targets:
+        r = bench_target(name, spec, device, args.mode, args.trials, args.eps, args.alpha,
+                         args.shots, args.seed)
+        results.append(r)
+        print("\n".join(format_record(r)), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"backend": args.backend, "results": results}, f, indent=1)
+        print(f"[search] {len(results)} objetivos -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+qreality/snapshots.py
+
+Barrido en k con UNA sola simulación: en lugar de llamar run(iterations=k)
+para cada k (circuitos de profundidad creciente, coste O(k_max^2)), se guarda
+la distribución del registro de datos tras cada iteración de Grover:
+
+  - "numpy": motor GroverStatevector, snapshot tras cada paso
+  - "aer"  : instrucciones save_probabilities de Aer tras cada bloque
+
+Resultado: tabla P(good) frente a k (k = 0..k_max) y, opcionalmente, la
+distribución por estado en cada k (filas de un array (k_max+1, 2^n)).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from qreality.statevector import GroverStatevector, Phases
+
+
+SweepResult = Dict[str, Any]   # {"k": [...], "p_good": [...], "probs": ndarray | None}
+
+
+def _result(p_good: List[float], probs: List[np.ndarray] | None) -> SweepResult:
+    return {
+        "k": list(range(len(p_good))),
+        "p_good": p_good,
+        "probs": np.vstack(probs) if probs else None,
+    }
+
+
+def numpy_sweep(good: np.ndarray, k_max: int, phases: Sequence[Phases] | None = None,
+                keep_states: bool = True) -> SweepResult:
+    """Snapshots tras cada iteración; `phases` (longitud k_max) por defecto (pi, pi)."""
+    if phases is None:
+        phases = [(math.pi, math.pi)] * k_max
+    sv = GroverStatevector(good)
+    p_good = [sv.p_good()]
+    probs = [sv.probabilities()] if keep_states else None
+    for phi_o, phi_d in phases[:k_max]:
+        sv.step(phi_o, phi_d)
+        p_good.append(sv.p_good())
+        if keep_states:
+            probs.append(sv.probabilities())
+    return _result(p_good, probs)
+
+
+def aer_sweep(prep: Callable, step: Callable, k_max: int, good: np.ndarray, backend,
+              opt_level: int = 1, cache_inputs: Dict[str, Any] | None = None,
+              keep_states: bool = True) -> SweepResult:
+    """
+    Un circuito prep + k_max bloques con save_probabilities(q) tras cada uno.
+    `backend` debe ser un AerSimulator con método statevector (o automático).
+    """
+    import qiskit_aer  # noqa: F401  (registra save_probabilities en QuantumCircuit)
+    from qreality.repeat import transpile_block
+
+    qc = transpile_block("prep", prep, backend, opt_level, cache_inputs).copy()
+    q = qc.qregs[0]
+    qc.save_probabilities(q, label="k0")
+    if k_max > 0:
+        tstep = transpile_block("step", step, backend, opt_level, cache_inputs)
+        for k in range(1, k_max + 1):
+            qc.compose(tstep, inplace=True)
+            qc.save_probabilities(q, label=f"k{k}")
+
+    data = backend.run(qc, shots=1).result().data(0)
+    p_good = []
+    probs = [] if keep_states else None
+    for k in range(k_max + 1):
+        p = np.asarray(data[f"k{k}"], dtype=float)
+        p_good.append(float(p[good].sum()))
+        if keep_states:
+            probs.append(p)
+    return _result(p_good, probs)
+
+
+def best_k(result: SweepResult) -> int:
+    return int(np.argmax(result["p_good"]))
+
+
+def print_sweep(result: SweepResult) -> None:
+    print("k   P(good)")
+    for k, p in zip(result["k"], result["p_good"]):
+        print(f"{k:<3d} {p:.6f}")
+    kb = best_k(result)
+    print(f"mejor k={kb}  P(good)={result['p_good'][kb]:.6f}")
@@ -0,0 +1,82 @@
+"""
+qreality/variants.py
+
+Acceso a los scripts de variante (quant_v5/v8/v10, Q-12_v13) desde las
+herramientas del paquete. Los scripts no son importables por nombre (Q-12_v13
+lleva guion), así que se cargan por ruta con importlib, una vez por proceso.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import math
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+VARIANTS: Dict[str, str] = {
+    "v5": "quant_v5_3axes.py",
+    "v8": "quant_v8_3axes_parity_pm.py",
+    "v10": "quant_v10_12sign_product_pm.py",
+    "v13": "Q-12_v13.py",
+}
+
+# variantes con rama ± (run(sign=+1/-1)); v5 no la tiene
+SIGNED = ("v8", "v10", "v13")
+
+_LOADED: Dict[str, ModuleType] = {}
+
+
+def load(name: str) -> ModuleType:
+    """Módulo de la variante `name` ('v5', 'v8', 'v10', 'v13')."""
+    if name not in VARIANTS:
+        raise ValueError(f"variante desconocida: {name!r} (usa {', '.join(VARIANTS)})")
+    if name not in _LOADED:
+        path = ROOT / VARIANTS[name]
+        spec = importlib.util.spec_from_file_location(f"qreality_variant_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _LOADED[name] = module
+    return _LOADED[name]
+
+
+def default_iterations(name: str) -> int:
+    m = load(name)
+    if hasattr(m, "K_FIXED"):
+        return m.K_FIXED
+    return m.suggested_grover_iterations(2**12, m.count_good_states())
+
+
+def blocks(name: str, iterations: int | None = None, oracle: str = "ancilla") -> Dict[str, QuantumCircuit]:
+    """
+    Bloques sin transpilar: prep, step y, en v13, last (fases exactas de la
+    última iteración para `iterations`, por defecto K_FIXED).
+    """
+    m = load(name)
+    if not hasattr(m, "build_circuit_exact"):
+        return {"prep": m.build_prep(oracle), "step": m.build_iteration(oracle)}
+    phi, var, _, _ = m.last_step_phases(m.count_good_states(),
+                                        default_iterations(name) if iterations is None else iterations)
+    return {"prep": m.build_prep(oracle), "step": m.build_iteration(math.pi, math.pi, oracle),
+            "last": m.build_iteration(phi, var, oracle)}
+
+
+def transpiled(name: str, iterations: int, backend, oracle: str = "ancilla", opt_level: int = 1,
+               measure: bool = True):
+    """Circuito transpilado de la variante (v13: fases exactas de la última iteración)."""
+    m = load(name)
+    if hasattr(m, "build_circuit_exact"):
+        phi, var, _, _ = m.last_step_phases(m.count_good_states(), iterations)
+        return m.build_transpiled(iterations, phi, var, backend, opt_level, oracle=oracle,
+                                  measure=measure)
+    return m.build_transpiled(iterations, backend, opt_level, oracle=oracle, measure=measure)
+
+
+def n_qubits(name: str, oracle: str = "ancilla") -> int:
+    return load(name).new_circuit(oracle).num_qubits
+
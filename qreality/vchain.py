@@ -0,0 +1,116 @@
+"""
+qreality/vchain.py
+
+Síntesis de MCX/MCP grandes con ancillas. Sin qubits de sobra, qc.mcx con 11
+controles (difusor) o 6-7 controles (oráculo -> ph) se descompone en
+circuitos muy profundos. Pero en los circuitos con oráculo por ancillas hay
+qubits que se pueden reutilizar:
+
+  - limpios (|0>) durante la difusión: w/eq/t ya se han descomputado
+  - sucios (estado arbitrario, se devuelve igual) durante el oráculo: los
+    12 qubits de datos no intervienen en la MCX final sobre ph
+
+Estrategia (síntesis de qiskit.synthesis, qubits = controles, target, ancillas):
+
+  k-2 limpias  -> synth_mcx_n_clean_m15   (V-chain de Maslov, <= 6k-6 CX)
+  1 limpia     -> synth_mcx_1_clean_kg24
+  k-2 sucias   -> synth_mcx_n_dirty_i15   (Iten et al., <= 8k-6 CX)
+  1 sucia      -> synth_mcx_1_dirty_kg24
+  ninguna      -> qc.mcx (lo de siempre)
+
+MCP(phi): AND de los controles en una ancilla limpia (MCX anterior con las
+restantes), cp(phi) ancilla -> target y descomputar. Sin ancilla limpia,
+qc.mcp.
+
+Aer ejecuta mcx/mcp de forma nativa, así que la ganancia aparece al
+transpilar a una base cx/u (hardware, matrix_product_state, pases de
+transpile), no en el statevector de Aer. compare() da CX y profundidad antes
+y después en esa base.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+
+MCX_MODES = ("noancilla", "vchain")
+COMPARE_BASIS = ["cx", "u"]
+
+
+def check_mode(mode: str) -> None:
+    if mode not in MCX_MODES:
+        raise ValueError(f"mcx_mode desconocido: {mode!r} (usa {', '.join(MCX_MODES)})")
+
+
+def mcx(qc: QuantumCircuit, controls: Sequence, target, clean: Sequence = (),
+        dirty: Sequence = ()) -> str:
+    """
+    MCX controls -> target usando las ancillas dadas (que no pueden solaparse
+    con controls/target). Devuelve el esquema usado.
+    """
+    from qiskit.synthesis import (
+        synth_mcx_1_clean_kg24,
+        synth_mcx_1_dirty_kg24,
+        synth_mcx_n_clean_m15,
+        synth_mcx_n_dirty_i15,
+    )
+
+    controls = list(controls)
+    k = len(controls)
+    clean = [a for a in clean if a not in controls and a != target]
+    dirty = [a for a in dirty if a not in controls and a != target]
+
+    if k < 3:
+        qc.mcx(controls, target)
+        return "noancilla"
+    if len(clean) >= k - 2:
+        qc.compose(synth_mcx_n_clean_m15(k), controls + [target] + clean[:k - 2], inplace=True)
+        return "vchain-clean"
+    if k >= 4 and len(dirty) + len(clean) >= k - 2:
+        anc = (clean + dirty)[:k - 2]
+        qc.compose(synth_mcx_n_dirty_i15(k), controls + [target] + anc, inplace=True)
+        return "vchain-dirty"
+    if clean:
+        qc.compose(synth_mcx_1_clean_kg24(k), controls + [target] + clean[:1], inplace=True)
+        return "1-clean"
+    if dirty:
+        qc.compose(synth_mcx_1_dirty_kg24(k), controls + [target] + dirty[:1], inplace=True)
+        return "1-dirty"
+    qc.mcx(controls, target)
+    return "noancilla"
+
+
+def mcp(qc: QuantumCircuit, phi: float, controls: Sequence, target, clean: Sequence = ()) -> str:
+    """MCP(phi): AND(controls) en una ancilla limpia + cp(phi) + descomputar."""
+    controls = list(controls)
+    clean = [a for a in clean if a not in controls and a != target]
+    if len(controls) < 2 or not clean:
+        qc.mcp(phi, controls, target)
+        return "noancilla"
+    flag, rest = clean[0], clean[1:]
+    scheme = mcx(qc, controls, flag, clean=rest)
+    qc.cp(phi, flag, target)
+    mcx(qc, controls, flag, clean=rest)
+    return f"flag+{scheme}"
+
+
+def idle_ancillas(qc: QuantumCircuit, exclude: Sequence[str] = ("q", "ph")) -> list:
+    """Qubits de los registros de ancillas (todo salvo datos y ph), en orden."""
+    return [b for reg in qc.qregs if reg.name not in exclude for b in reg]
+
+
+def cx_depth(qc: QuantumCircuit, opt_level: int = 1):
+    from qiskit import transpile
+
+    t = transpile(qc, basis_gates=COMPARE_BASIS, optimization_level=opt_level)
+    return t.count_ops().get("cx", 0), t.depth()
+
+
+def compare(before: QuantumCircuit, after: QuantumCircuit, opt_level: int = 1) -> str:
+    """CX y profundidad (base cx/u) de un bloque antes y después de la síntesis con ancillas."""
+    cx0, d0 = cx_depth(before, opt_level)
+    cx1, d1 = cx_depth(after, opt_level)
+    return f"[vchain] por iteración (base cx/u): CX {cx0} -> {cx1}  depth {d0} -> {d1}"
@@ -20,21 +20,46 @@ Requisitos:
 
 from __future__ import annotations
 
-import itertools
 import math
-from typing import List, Tuple
-
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
-from qiskit_aer import AerSimulator
-
-
+from typing import TYPE_CHECKING, List, Tuple
+
+from qreality import vchain
+from qreality.analytic import analytic_counts, iteration_phases
+from qreality.autotune import load_profile
+from qreality.bitmask import (
+    CoherenceSpec,
+    count_good,
+    good_mask,
+    index_from_phys,
+    is_good_index,
+    measured_string,
+)
+from qreality.cache import file_digest, transpile_cache
+from qreality.instrument import aer_result, note, stage, traced
+from qreality.model import PlaneModel
+from qreality.oracle import compile_phase_oracle
+from qreality.postprocess import count_good_shots, counts_to_arrays, phys_strings, top_k
+from qreality.preflight import estimate, oracle_bytes, plan_simulation
+from qreality.redundancy import analyze, report
+from qreality.repeat import assemble_repeated
+from qreality.sampling import aer_probabilities, sample_probabilities
+from qreality.snapshots import aer_sweep, numpy_sweep, print_sweep
+from qreality.statevector import statevector_counts
+from qreality.symmetry import symmetric_counts
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit  # qiskit se importa al construir circuitos
+
+
+# orden Gray: patrones consecutivos a distancia 2, así las X entre MCX se cancelan
+# (qreality.peephole) y quedan 10 en vez de 12 por flag
 _PATTERNS_W2 = (
     (1, 1, 0, 0),
     (1, 0, 1, 0),
-    (1, 0, 0, 1),
     (0, 1, 1, 0),
     (0, 1, 0, 1),
     (0, 0, 1, 1),
+    (1, 0, 0, 1),
 )
 
 
@@ -83,29 +108,29 @@ def uncompute_eq_three(qc: QuantumCircuit, qa, qb, qcbit, eq, t1, t2):
     qc.cx(qa, t1)
 
 
-def grover_diffusion(qc: QuantumCircuit, qubits):
+def grover_diffusion(qc: QuantumCircuit, qubits, ancillas=()):
+    # ancillas: qubits limpios (|0>) para la MCX de 11 controles; sin ellas, qc.mcx
     qc.h(qubits)
     qc.x(qubits)
     qc.h(qubits[-1])
-    qc.mcx(qubits[:-1], qubits[-1])
+    vchain.mcx(qc, qubits[:-1], qubits[-1], clean=ancillas)
     qc.h(qubits[-1])
     qc.x(qubits)
     qc.h(qubits)
 
 
-def coherent_string_phys(s_phys: str) -> bool:
-    def wt(x: str) -> int:
-        return sum(1 for b in x if b == "1")
+def plane_model() -> PlaneModel:
+    return PlaneModel(planes=3, dim=4, weight=2, axes=(0, 1, 2))
+
+
+def coherence_spec() -> CoherenceSpec:
+    return plane_model().spec()
 
+
+def coherent_string_phys(s_phys: str) -> bool:
     if len(s_phys) != 12:
         return False
-
-    b0, b1, b2 = s_phys[0:4], s_phys[4:8], s_phys[8:12]
-    w_ok = (wt(b0) == 2 and wt(b1) == 2 and wt(b2) == 2)
-    axis0_ok = (s_phys[0] == s_phys[4] == s_phys[8])
-    axis1_ok = (s_phys[1] == s_phys[5] == s_phys[9])
-    axis2_ok = (s_phys[2] == s_phys[6] == s_phys[10])
-    return w_ok and axis0_ok and axis1_ok and axis2_ok
+    return is_good_index(coherence_spec(), index_from_phys(s_phys))
 
 
 def coherent_string_measured(bitstring_measured: str) -> bool:
@@ -113,12 +138,7 @@ def coherent_string_measured(bitstring_measured: str) -> bool:
 
 
 def count_good_states() -> int:
-    good = 0
-    for bits in itertools.product("01", repeat=12):
-        s = "".join(bits)
-        if coherent_string_phys(s):
-            good += 1
-    return good
+    return count_good(coherence_spec())
 
 
 def suggested_grover_iterations(n_states: int, m_good: int) -> int:
@@ -129,8 +149,14 @@ def suggested_grover_iterations(n_states: int, m_good: int) -> int:
     return max(0, k)
 
 
-def build_circuit(iterations: int) -> QuantumCircuit:
+def new_circuit(oracle: str = "ancilla") -> QuantumCircuit:
+    """Registros del circuito; con oráculo sin ancillas solo q (12) y c."""
+    from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+
     data = QuantumRegister(12, "q")
+    c = ClassicalRegister(12, "c")
+    if oracle != "ancilla":
+        return QuantumCircuit(data, c)
 
     w0 = QuantumRegister(1, "w0")
     w1 = QuantumRegister(1, "w1")
@@ -143,71 +169,198 @@ def build_circuit(iterations: int) -> QuantumCircuit:
     t = QuantumRegister(6, "t")   # 2 ancillas por eje (3 ejes)
 
     ph = QuantumRegister(1, "ph")
-    c = ClassicalRegister(12, "c")
 
-    qc = QuantumCircuit(data, w0, w1, w2, eq0, eq1, eq2, t, ph, c)
+    return QuantumCircuit(data, w0, w1, w2, eq0, eq1, eq2, t, ph, c)
+
+
+def build_prep(oracle: str = "ancilla") -> QuantumCircuit:
+    qc = new_circuit(oracle)
+    r = {reg.name: reg for reg in qc.qregs}
+
+    qc.h(r["q"])
+
+    if oracle == "ancilla":
+        qc.x(r["ph"][0])
+        qc.h(r["ph"][0])
+    return qc
+
+
+def build_iteration(oracle: str = "ancilla", mcx_mode: str = "noancilla") -> QuantumCircuit:
+    """Una iteración de Grover (oráculo + difusión) como bloque reutilizable."""
+    vchain.check_mode(mcx_mode)
+    qc = new_circuit(oracle)
+    r = {reg.name: reg for reg in qc.qregs}
+    q = r["q"]
+
+    if oracle != "ancilla":
+        # Oráculo sin ancillas compilado desde C(x): solo los 12 qubits de datos
+        qc.compose(compile_phase_oracle(coherence_spec(), 12, math.pi, oracle), q, inplace=True)
+        grover_diffusion(qc, list(q))
+        return qc
+
+    w0, w1, w2 = r["w0"], r["w1"], r["w2"]
+    eq0, eq1, eq2 = r["eq0"], r["eq1"], r["eq2"]
+    t, ph = r["t"], r["ph"]
 
-    q = data
     b0 = [q[0], q[1], q[2], q[3]]
     b1 = [q[4], q[5], q[6], q[7]]
     b2 = [q[8], q[9], q[10], q[11]]
 
-    qc.h(q)
+    weight_eq_2_flag(qc, b0, w0[0])
+    weight_eq_2_flag(qc, b1, w1[0])
+    weight_eq_2_flag(qc, b2, w2[0])
 
-    qc.x(ph[0])
-    qc.h(ph[0])
+    compute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
+    compute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
+    compute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
 
-    for _ in range(iterations):
-        weight_eq_2_flag(qc, b0, w0[0])
-        weight_eq_2_flag(qc, b1, w1[0])
-        weight_eq_2_flag(qc, b2, w2[0])
+    # mcx_mode='vchain': los 12 qubits de datos sirven de ancillas sucias
+    vchain.mcx(qc, [w0[0], w1[0], w2[0], eq0[0], eq1[0], eq2[0]], ph[0],
+               dirty=list(q) if mcx_mode == "vchain" else ())
+
+    uncompute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
+    uncompute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
+    uncompute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
 
-        compute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
-        compute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
-        compute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
+    uncompute_weight_eq_2_flag(qc, b2, w2[0])
+    uncompute_weight_eq_2_flag(qc, b1, w1[0])
+    uncompute_weight_eq_2_flag(qc, b0, w0[0])
 
-        qc.mcx([w0[0], w1[0], w2[0], eq0[0], eq1[0], eq2[0]], ph[0])
+    # w/eq/t ya descomputados: vuelven a estar a |0> y sirven de ancillas limpias
+    grover_diffusion(qc, list(q), vchain.idle_ancillas(qc) if mcx_mode == "vchain" else ())
+    return qc
 
-        uncompute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
-        uncompute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
-        uncompute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
 
-        uncompute_weight_eq_2_flag(qc, b2, w2[0])
-        uncompute_weight_eq_2_flag(qc, b1, w1[0])
-        uncompute_weight_eq_2_flag(qc, b0, w0[0])
+def build_circuit(iterations: int, oracle: str = "ancilla",
+                  mcx_mode: str = "noancilla") -> QuantumCircuit:
+    qc = build_prep(oracle)
+    step = build_iteration(oracle, mcx_mode=mcx_mode)
 
-        grover_diffusion(qc, list(q))
+    for _ in range(iterations):
+        qc.compose(step, inplace=True)
 
-    qc.measure(q, c)
+    qc.measure(qc.qregs[0], qc.cregs[0])
     return qc
 
 
-def run(shots: int = 4096, iterations: int | None = None, opt_level: int = 1) -> None:
+def build_transpiled(iterations: int, backend, opt_level: int = 1, oracle: str = "ancilla",
+                     cache_inputs: dict | None = None, measure: bool = True,
+                     mcx_mode: str = "noancilla") -> QuantumCircuit:
+    # prep e iteración se transpilan una sola vez; el circuito son k copias del bloque
+    return assemble_repeated(lambda: build_prep(oracle),
+                             lambda: build_iteration(oracle, mcx_mode=mcx_mode),
+                             iterations, backend, opt_level, cache_inputs=cache_inputs,
+                             measure=measure)
+
+
+def sweep(k_max: int = 60, backend: str = "numpy", oracle: str = "ancilla", opt_level: int = 1):
+    """P(good) para k = 0..k_max en una sola simulación (snapshot tras cada iteración)."""
+    good = good_mask(coherence_spec())
+    if backend == "numpy":
+        result = numpy_sweep(good, k_max)
+    elif backend == "aer":
+        from qiskit_aer import AerSimulator
+
+        sim = AerSimulator(method="statevector")
+        result = aer_sweep(lambda: build_prep(oracle), lambda: build_iteration(oracle),
+                           k_max, good, sim, opt_level)
+    else:
+        raise ValueError(f"backend desconocido: {backend!r} (usa 'numpy' o 'aer')")
+    print_sweep(result)
+    return result
+
+
+@traced("v5")
+def run(shots: int = 4096, iterations: int | None = None, opt_level: int = 1,
+        backend: str = "aer", oracle: str = "ancilla", use_cache: bool = True,
+        sampling: bool = False, memory_budget: int | str | None = None,
+        mcx_mode: str = "noancilla", sign: int | None = None) -> None:
+    """sign solo por uniformidad con v8/v10/v13: v5 no tiene rama ±."""
+    if sign is not None:
+        raise ValueError(f"v5 no tiene rama de signo (sign={sign})")
     N = 2 ** 12
-    M = count_good_states()
+    with stage("count_good"):
+        M = count_good_states()
     k_suggested = suggested_grover_iterations(N, M)
 
     if iterations is None:
         iterations = k_suggested
 
     print(f"N={N}  M={M}  M/N={M/N:.6f}  k_sugerido≈{k_suggested}  k_usado={iterations}")
-
-    qc = build_circuit(iterations=iterations)
-
-    sim = AerSimulator()
-    tqc = transpile(qc, sim, optimization_level=opt_level)
-    res = sim.run(tqc, shots=shots).result()
-    counts = res.get_counts()
-
-    top10: List[Tuple[str, int]] = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    note(M=M, k=iterations)
+
+    with stage("redundancy"):
+        analysis = analyze(coherence_spec())
+    if analysis.empty:
+        print(report(analysis))
+        return
+
+    if backend == "analytic":
+        # evolución exacta en el subespacio 2D good/bad, sin simular puertas
+        with stage("simulate"):
+            counts = analytic_counts(coherence_spec(), iteration_phases(iterations), shots)
+    elif backend == "numpy":
+        # statevector NumPy: oráculo y difusión como operaciones O(N) in-place
+        with stage("simulate"):
+            counts = statevector_counts(good_mask(coherence_spec()), 12, iteration_phases(iterations),
+                                        shots)
+    elif backend == "symmetric":
+        # una amplitud por órbita (permutaciones de planos y bits libres); 2^12 solo al muestrear
+        with stage("simulate"):
+            counts = symmetric_counts(coherence_spec(), iteration_phases(iterations), shots)
+    elif backend == "aer":
+        # memoria/tiempo antes de simular; si no cabe se degrada (oráculo, precisión, método)
+        with stage("preflight"):
+            plan = plan_simulation(lambda o: new_circuit(o).num_qubits, oracle, memory_budget,
+                                   circuit_bytes_for=lambda o: oracle_bytes(o, 12, iterations))
+        print(plan.report())
+        oracle = plan.oracle
+        note(plan={"oracle": oracle, "method": plan.method, "precision": plan.precision,
+                   "qubits": plan.n_qubits})
+        profile = load_profile("v5", oracle, iterations)  # python -m qreality.autotune
+        if profile:
+            print(f"[autotune] perfil: {profile}")
+        sim = plan.simulator(**profile)
+        key = None
+        if use_cache:
+            key = {"variant": "v5", "source": file_digest(__file__), "oracle": oracle,
+                   "mcx_mode": mcx_mode}
+        tqc = build_transpiled(iterations, sim, opt_level, oracle=oracle, cache_inputs=key,
+                               measure=not sampling, mcx_mode=mcx_mode)
+        if use_cache:
+            print(transpile_cache().report())
+        if mcx_mode == "vchain" and oracle == "ancilla":
+            print(vchain.compare(build_iteration(oracle), build_iteration(oracle, mcx_mode=mcx_mode),
+                                 opt_level))
+        print(estimate(tqc, plan).report())
+        if sampling:
+            # P(x) una sola vez + multinomial: coste independiente de shots
+            with stage("simulate"):
+                probs = aer_probabilities(tqc, sim)
+            with stage("sampling"):
+                counts = sample_probabilities(probs, shots)
+        else:
+            with stage("simulate"):
+                res = sim.run(tqc, shots=shots).result()
+            aer_result(res)
+            counts = res.data(0)["counts"]  # claves hex, sin formatear strings
+    else:
+        raise ValueError(f"backend desconocido: {backend!r} (usa 'aer', 'analytic', 'numpy' o 'symmetric')")
+
+    # conteos -> arrays (idx, cnt); clasificación con la máscara, top-k con argpartition
+    with stage("postprocess"):
+        idx, cnt = counts_to_arrays(counts)
+        good = good_mask(coherence_spec())
+        top_idx, top_cnt = top_k(idx, cnt, 10)
+        top10: List[Tuple[str, int]] = [(measured_string(x, 12), c)
+                                        for x, c in zip(top_idx.tolist(), top_cnt.tolist())]
+        good_shots = count_good_shots(idx, cnt, good)
+    note(p_good=good_shots / shots)
     print("TOP10:", top10)
 
-    good_shots = sum(v for k, v in counts.items() if coherent_string_measured(k))
     print(f"Shots coherentes (según C en físico): {good_shots} / {shots} = {good_shots/shots:.6f}")
 
-    for s, c in top10:
-        s_phys = s[::-1]
-        ok = coherent_string_phys(s_phys)
+    for (s, c), s_phys, ok in zip(top10, phys_strings(top_idx, 12), good[top_idx].tolist()):
         print(s, c, "phys=", s_phys, "ok=", ok,
               "blocks=", [s_phys[0:4], s_phys[4:8], s_phys[8:12]])
 
@@ -215,4 +368,13 @@ def run(shots: int = 4096, iterations: int | None = None, opt_level: int = 1) ->
 if __name__ == "__main__":
     SHOTS = 4096
     ITERATIONS = None  # None -> usa k_sugerido automáticamente
-    run(shots=SHOTS, iterations=ITERATIONS, opt_level=1)
+    BACKEND = "aer"  # "analytic" -> 2D exacto; "numpy" -> statevector propio (O(N)/iter); "symmetric" -> órbitas
+    ORACLE = "ancilla"  # "diagonal"/"mcp" -> oráculo sin ancillas (12 qubits)
+    SAMPLING = False  # True -> P(x) una vez (save_probabilities) + multinomial de SHOTS
+    MCX_MODE = "noancilla"  # "vchain" -> MCX grandes sintetizadas con las ancillas libres
+    K_SWEEP = None  # entero -> barrido P(good) para k=0..K_SWEEP en una simulación
+    if K_SWEEP is not None:
+        sweep(K_SWEEP, oracle=ORACLE)
+    else:
+        run(shots=SHOTS, iterations=ITERATIONS, opt_level=1, backend=BACKEND, oracle=ORACLE,
+            sampling=SAMPLING, mcx_mode=MCX_MODE)
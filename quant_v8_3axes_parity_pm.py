@@ -16,7 +16,7 @@ Base estructural (en marco físico):
   (3) '+'  => paridad total PAR (XOR de los 12 bits == 0)
       '-'  => paridad total IMPAR (XOR de los 12 bits == 1)
 
-Por defecto implementa '+' (paridad par). Cambia SIGN a -1 para la rama '-'.
+Por defecto implementa '+' (paridad par). Cambia SIGN a -1 (o run(sign=-1)) para la rama '-'.
 
 Notas:
 - Marco físico: s_phys = s_measured[::-1] (según tus pruebas).
@@ -27,12 +27,35 @@ Requisitos:
 
 from __future__ import annotations
 
-import itertools
 import math
-from typing import List, Tuple
-
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
-from qiskit_aer import AerSimulator
+from typing import TYPE_CHECKING, List, Tuple
+
+from qreality import branches, vchain
+from qreality.analytic import analytic_counts, iteration_phases
+from qreality.autotune import load_profile
+from qreality.bitmask import (
+    CoherenceSpec,
+    count_good,
+    good_mask,
+    index_from_phys,
+    is_good_index,
+    measured_string,
+)
+from qreality.cache import file_digest, transpile_cache
+from qreality.instrument import aer_result, note, stage, traced
+from qreality.model import PlaneModel
+from qreality.oracle import compile_phase_oracle
+from qreality.postprocess import count_good_shots, counts_to_arrays, phys_strings, top_k
+from qreality.preflight import estimate, oracle_bytes, plan_simulation
+from qreality.redundancy import Analysis, analyze, report
+from qreality.repeat import assemble_repeated
+from qreality.sampling import aer_probabilities, sample_probabilities
+from qreality.snapshots import aer_sweep, numpy_sweep, print_sweep
+from qreality.statevector import statevector_counts
+from qreality.symmetry import symmetric_counts
+
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit  # qiskit se importa al construir circuitos
 
 
 # ---------------------------
@@ -43,13 +66,15 @@ from qiskit_aer import AerSimulator
 SIGN = +1 # +1/-1
 
 
+# orden Gray: patrones consecutivos a distancia 2, así las X entre MCX se cancelan
+# (qreality.peephole) y quedan 10 en vez de 12 por flag
 _PATTERNS_W2 = (
     (1, 1, 0, 0),
     (1, 0, 1, 0),
-    (1, 0, 0, 1),
     (0, 1, 1, 0),
     (0, 1, 0, 1),
     (0, 0, 1, 1),
+    (1, 0, 0, 1),
 )
 
 
@@ -97,11 +122,12 @@ def uncompute_eq_three(qc: QuantumCircuit, qa, qb, qcbit, eq, t1, t2):
     qc.cx(qa, t1)
 
 
-def grover_diffusion(qc: QuantumCircuit, qubits):
+def grover_diffusion(qc: QuantumCircuit, qubits, ancillas=()):
+    # ancillas: qubits limpios (|0>) para la MCX de 11 controles; sin ellas, qc.mcx
     qc.h(qubits)
     qc.x(qubits)
     qc.h(qubits[-1])
-    qc.mcx(qubits[:-1], qubits[-1])
+    vchain.mcx(qc, qubits[:-1], qubits[-1], clean=ancillas)
     qc.h(qubits[-1])
     qc.x(qubits)
     qc.h(qubits)
@@ -119,36 +145,28 @@ def parity_bitstring(s_phys: str) -> int:
     return p
 
 
-def coherent_string_phys(s_phys: str) -> bool:
-    def wt(x: str) -> int:
-        return sum(1 for b in x if b == "1")
+def plane_model(sign: int | None = None) -> PlaneModel:
+    # '+' => XOR total == 0 ; '-' => XOR total == 1
+    return PlaneModel(planes=3, dim=4, weight=2, axes=(0, 1, 2),
+                      sign=SIGN if sign is None else sign)
 
-    if len(s_phys) != 12:
-        return False
 
-    b0, b1, b2 = s_phys[0:4], s_phys[4:8], s_phys[8:12]
-    w_ok = (wt(b0) == 2 and wt(b1) == 2 and wt(b2) == 2)
-    axis0_ok = (s_phys[0] == s_phys[4] == s_phys[8])
-    axis1_ok = (s_phys[1] == s_phys[5] == s_phys[9])
-    axis2_ok = (s_phys[2] == s_phys[6] == s_phys[10])
+def coherence_spec(sign: int | None = None) -> CoherenceSpec:
+    return plane_model(sign).spec()
 
-    p = parity_bitstring(s_phys)
-    sign_ok = (p == 0) if SIGN == +1 else (p == 1)
 
-    return w_ok and axis0_ok and axis1_ok and axis2_ok and sign_ok
+def coherent_string_phys(s_phys: str) -> bool:
+    if len(s_phys) != 12:
+        return False
+    return is_good_index(coherence_spec(), index_from_phys(s_phys))
 
 
 def coherent_string_measured(bitstring_measured: str) -> bool:
     return coherent_string_phys(bitstring_measured[::-1])
 
 
-def count_good_states() -> int:
-    good = 0
-    for bits in itertools.product("01", repeat=12):
-        s = "".join(bits)
-        if coherent_string_phys(s):
-            good += 1
-    return good
+def count_good_states(sign: int | None = None) -> int:
+    return count_good(coherence_spec(sign))
 
 
 def suggested_grover_iterations(n_states: int, m_good: int) -> int:
@@ -163,105 +181,288 @@ def suggested_grover_iterations(n_states: int, m_good: int) -> int:
 # Circuito: oracle incluye paridad global
 # ---------------------------
 
-def build_circuit(iterations: int) -> QuantumCircuit:
-    data = QuantumRegister(12, "q")
+def oracle_analysis(sign: int | None = None) -> Analysis:
+    """Restricciones implícitas en las demás (o conjunto vacío), antes de construir el oráculo."""
+    return analyze(coherence_spec(sign))
 
-    w0 = QuantumRegister(1, "w0")
-    w1 = QuantumRegister(1, "w1")
-    w2 = QuantumRegister(1, "w2")
 
-    eq0 = QuantumRegister(1, "eq0")
-    eq1 = QuantumRegister(1, "eq1")
-    eq2 = QuantumRegister(1, "eq2")
+def new_circuit(oracle: str = "ancilla", reduce: bool = True, both_signs: bool = False,
+                sign: int | None = None) -> QuantumCircuit:
+    """
+    Registros del circuito; con oráculo sin ancillas solo q (12) y c.
+    Con reduce=True no se reservan ancillas para restricciones redundantes.
+    Con both_signs=True q[12] es el qubit de signo (qreality.branches) y no se
+    reduce nada (lo redundante en una rama no lo es en la otra).
+    """
+    from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
 
-    # ancillas XOR: 2 por eje (6) + 1 para paridad
-    t = QuantumRegister(7, "t")   # t[0..5] ejes, t[6] paridad
+    data = QuantumRegister(12 + both_signs, "q")
+    c = ClassicalRegister(12 + both_signs, "c")
+    if oracle != "ancilla":
+        return QuantumCircuit(data, c)
 
-    ph = QuantumRegister(1, "ph")
-    c = ClassicalRegister(12, "c")
+    dropped = oracle_analysis(sign).removed if reduce and not both_signs else ()
+    w = [QuantumRegister(1, f"w{i}") for i in range(3) if ("plane", i) not in dropped]
+    eq = [QuantumRegister(1, f"eq{i}") for i in range(3) if ("axis", i) not in dropped]
+    parity = ("parity", 0) not in dropped
 
-    qc = QuantumCircuit(data, w0, w1, w2, eq0, eq1, eq2, t, ph, c)
+    # ancillas XOR: 2 por eje + 1 (la última) para paridad
+    t = QuantumRegister(2 * len(eq) + parity, "t")
 
-    q = data
-    b0 = [q[0], q[1], q[2], q[3]]
-    b1 = [q[4], q[5], q[6], q[7]]
-    b2 = [q[8], q[9], q[10], q[11]]
+    ph = QuantumRegister(1, "ph")
 
-    qc.h(q)
+    return QuantumCircuit(data, *w, *eq, t, ph, c)
 
-    qc.x(ph[0])
-    qc.h(ph[0])
 
-    for _ in range(iterations):
-        # ---- Observador: compute estructura ----
-        weight_eq_2_flag(qc, b0, w0[0])
-        weight_eq_2_flag(qc, b1, w1[0])
-        weight_eq_2_flag(qc, b2, w2[0])
+def build_prep(oracle: str = "ancilla", both_signs: bool = False,
+               sign: int | None = None) -> QuantumCircuit:
+    qc = new_circuit(oracle, both_signs=both_signs, sign=sign)
+    r = {reg.name: reg for reg in qc.qregs}
 
-        compute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
-        compute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
-        compute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
+    qc.h(r["q"])
 
-        # ---- Observador: compute paridad global en t[6] ----
-        for i in range(12):
-            qc.cx(q[i], t[6])
+    if oracle == "ancilla":
+        qc.x(r["ph"][0])
+        qc.h(r["ph"][0])
+    return qc
 
-        # Para '+' queremos paridad par => t6=0; convertimos a control=1
-        if SIGN == +1:
-            qc.x(t[6])  # ahora t6=1 <=> paridad par
 
-        # ---- Oracle: fase si (estructura + paridad) ----
-        qc.mcx([w0[0], w1[0], w2[0], eq0[0], eq1[0], eq2[0], t[6]], ph[0])
+def build_iteration(oracle: str = "ancilla", reduce: bool = True,
+                    mcx_mode: str = "noancilla", both_signs: bool = False,
+                    sign: int | None = None) -> QuantumCircuit:
+    """Una iteración de Grover (oráculo + difusión) como bloque reutilizable."""
+    vchain.check_mode(mcx_mode)
+    sign = SIGN if sign is None else sign
+    qc = new_circuit(oracle, reduce, both_signs, sign)
+    r = {reg.name: reg for reg in qc.qregs}
+    q = r["q"]
+    data = list(q)[:12]  # la difusión no toca el qubit de signo
+
+    if oracle != "ancilla":
+        # Oráculo sin ancillas compilado desde C(x): solo los 12 qubits de datos (+ signo)
+        if both_signs:
+            qc.compose(branches.joint_oracle([coherence_spec(s) for s in branches.SIGNS], math.pi, oracle),
+                       q, inplace=True)
+        else:
+            qc.compose(compile_phase_oracle(coherence_spec(sign), 12, math.pi, oracle), q, inplace=True)
+        grover_diffusion(qc, data)
+        return qc
+
+    t, ph = r["t"], r["ph"]
+
+    blocks = {0: [q[0], q[1], q[2], q[3]], 1: [q[4], q[5], q[6], q[7]], 2: [q[8], q[9], q[10], q[11]]}
+    axes = {0: (q[0], q[4], q[8]), 1: (q[1], q[5], q[9]), 2: (q[2], q[6], q[10])}
+
+    # solo las restricciones que no se han quitado por redundantes
+    w = {i: r[f"w{i}"][0] for i in blocks if f"w{i}" in r}
+    kept_axes = [i for i in axes if f"eq{i}" in r]
+    eq = {i: (r[f"eq{i}"][0], t[2 * j], t[2 * j + 1]) for j, i in enumerate(kept_axes)}
+    parity = len(t) > 2 * len(eq)
+
+    # ---- Observador: compute estructura ----
+    for i, flag in w.items():
+        weight_eq_2_flag(qc, blocks[i], flag)
+
+    for i, (e, t1, t2) in eq.items():
+        compute_eq_three(qc, *axes[i], e, t1, t2)
+
+    # con both_signs q[12] elige la rama ('+' = 0); sin él, la de `sign`
+    sign_model = plane_model(+1 if both_signs else sign)
+    sign_qubit = q[12] if both_signs else None
+    if parity:
+        # ---- Observador: compute paridad global en t[-1] (t=1 <=> paridad de la rama) ----
+        branches.compute_sign_flag(qc, q, t[-1], sign_model, sign_qubit)
+
+    # ---- Oracle: fase si (estructura + paridad) ----
+    controls = list(w.values()) + [e for e, _, _ in eq.values()] + ([t[-1]] if parity else [])
+    # mcx_mode='vchain': los 12 qubits de datos sirven de ancillas sucias
+    vchain.mcx(qc, controls, ph[0], dirty=data if mcx_mode == "vchain" else ())
+
+    if parity:
+        branches.uncompute_sign_flag(qc, q, t[-1], sign_model, sign_qubit)
+
+    # ---- Uncompute estructura ----
+    for i, (e, t1, t2) in reversed(eq.items()):
+        uncompute_eq_three(qc, *axes[i], e, t1, t2)
+
+    for i, flag in reversed(w.items()):
+        uncompute_weight_eq_2_flag(qc, blocks[i], flag)
+
+    # w/eq/t ya descomputados: vuelven a estar a |0> y sirven de ancillas limpias
+    grover_diffusion(qc, data, vchain.idle_ancillas(qc) if mcx_mode == "vchain" else ())
 
-        # ---- Uncompute paridad ----
-        if SIGN == +1:
-            qc.x(t[6])
-        for i in reversed(range(12)):
-            qc.cx(q[i], t[6])
+    return qc
 
-        # ---- Uncompute estructura ----
-        uncompute_eq_three(qc, q[2], q[6], q[10], eq2[0], t[4], t[5])
-        uncompute_eq_three(qc, q[1], q[5], q[9],  eq1[0], t[2], t[3])
-        uncompute_eq_three(qc, q[0], q[4], q[8],  eq0[0], t[0], t[1])
 
-        uncompute_weight_eq_2_flag(qc, b2, w2[0])
-        uncompute_weight_eq_2_flag(qc, b1, w1[0])
-        uncompute_weight_eq_2_flag(qc, b0, w0[0])
+def build_circuit(iterations: int, oracle: str = "ancilla", mcx_mode: str = "noancilla",
+                  both_signs: bool = False, sign: int | None = None) -> QuantumCircuit:
+    qc = build_prep(oracle, both_signs, sign)
+    step = build_iteration(oracle, mcx_mode=mcx_mode, both_signs=both_signs, sign=sign)
 
-        grover_diffusion(qc, list(q))
+    for _ in range(iterations):
+        qc.compose(step, inplace=True)
 
-    qc.measure(q, c)
+    qc.measure(qc.qregs[0], qc.cregs[0])
     return qc
 
 
-def run(shots: int = 4096, iterations: int | None = None, opt_level: int = 1) -> None:
+def build_transpiled(iterations: int, backend, opt_level: int = 1, oracle: str = "ancilla",
+                     cache_inputs: dict | None = None, measure: bool = True,
+                     mcx_mode: str = "noancilla", both_signs: bool = False,
+                     sign: int | None = None) -> QuantumCircuit:
+    # prep e iteración se transpilan una sola vez; el circuito son k copias del bloque
+    return assemble_repeated(lambda: build_prep(oracle, both_signs, sign),
+                             lambda: build_iteration(oracle, mcx_mode=mcx_mode, both_signs=both_signs,
+                                                     sign=sign),
+                             iterations, backend, opt_level, cache_inputs=cache_inputs,
+                             measure=measure)
+
+
+def sweep(k_max: int = 60, backend: str = "numpy", oracle: str = "ancilla", opt_level: int = 1):
+    """P(good) para k = 0..k_max en una sola simulación (snapshot tras cada iteración)."""
+    good = good_mask(coherence_spec())
+    if backend == "numpy":
+        result = numpy_sweep(good, k_max)
+    elif backend == "aer":
+        from qiskit_aer import AerSimulator
+
+        sim = AerSimulator(method="statevector")
+        result = aer_sweep(lambda: build_prep(oracle), lambda: build_iteration(oracle),
+                           k_max, good, sim, opt_level)
+    else:
+        raise ValueError(f"backend desconocido: {backend!r} (usa 'numpy' o 'aer')")
+    print_sweep(result)
+    return result
+
+
+@traced("v8")
+def run(shots: int = 4096, iterations: int | None = None, opt_level: int = 1,
+        backend: str = "aer", oracle: str = "ancilla", use_cache: bool = True,
+        sampling: bool = False, memory_budget: int | str | None = None,
+        mcx_mode: str = "noancilla", both_signs: bool = False, sign: int | None = None) -> None:
+    """sign: +1/-1 (None -> SIGN del módulo); con both_signs se simulan las dos ramas."""
+    if both_signs and backend == "symmetric":
+        raise ValueError("both_signs no está soportado con el backend 'symmetric'")
+    sign = SIGN if sign is None else sign
     N = 2 ** 12
-    M = count_good_states()
+    specs = [coherence_spec(s) for s in branches.SIGNS]
+    with stage("count_good"):
+        M = count_good_states(sign)
+        if both_signs:
+            # las dos ramas comparten k: el de la rama con más estados good
+            M_branches = [count_good(spec) for spec in specs]
+            M = max(M_branches)
     k_suggested = suggested_grover_iterations(N, M)
 
     if iterations is None:
         iterations = k_suggested
 
-    sign_label = "+" if SIGN == +1 else "-"
-    print(f"SIGN={sign_label} (paridad {'PAR' if SIGN==+1 else 'IMPAR'})")
+    if both_signs:
+        print("SIGN=± (qubit de signo q[12]: 0 -> '+', 1 -> '-')  "
+              + "  ".join(f"M({branches.label(b)})={m}" for b, m in enumerate(M_branches)))
+    else:
+        sign_label = "+" if sign == +1 else "-"
+        print(f"SIGN={sign_label} (paridad {'PAR' if sign == +1 else 'IMPAR'})")
     print(f"N={N}  M={M}  M/N={M/N:.6f}  k_sugerido≈{k_suggested}  k_usado={iterations}")
-
-    qc = build_circuit(iterations=iterations)
-
-    sim = AerSimulator()
-    tqc = transpile(qc, sim, optimization_level=opt_level)
-    res = sim.run(tqc, shots=shots).result()
-    counts = res.get_counts()
-
-    top10: List[Tuple[str, int]] = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    note(M=M, k=iterations, sign="±" if both_signs else sign)
+
+    with stage("redundancy"):
+        analysis = oracle_analysis(sign)
+    if analysis.empty and not both_signs:
+        print(report(analysis))
+        return
+    if oracle == "ancilla" and analysis.removed and not both_signs:
+        # contar puertas exige construir el circuito (qiskit): solo con backend aer
+        saved = None
+        if backend == "aer":
+            saved = (build_iteration(oracle, reduce=False, sign=sign).size()
+                     - build_iteration(oracle, sign=sign).size())
+        print(report(analysis, saved))
+
+    if backend == "analytic":
+        # evolución exacta en el subespacio 2D good/bad, sin simular puertas
+        with stage("simulate"):
+            if both_signs:
+                # las dos ramas en una pasada (una fila por rama)
+                counts = branches.analytic_counts(specs, iteration_phases(iterations), shots)
+            else:
+                counts = analytic_counts(coherence_spec(sign), iteration_phases(iterations), shots)
+    elif backend == "numpy":
+        # statevector NumPy: oráculo y difusión como operaciones O(N) in-place
+        with stage("simulate"):
+            if both_signs:
+                counts = branches.numpy_counts(specs, iteration_phases(iterations), shots)
+            else:
+                counts = statevector_counts(good_mask(coherence_spec(sign)), 12, iteration_phases(iterations),
+                                            shots)
+    elif backend == "symmetric":
+        # una amplitud por órbita (permutaciones de planos y bits libres); 2^12 solo al muestrear
+        with stage("simulate"):
+            counts = symmetric_counts(coherence_spec(sign), iteration_phases(iterations), shots)
+    elif backend == "aer":
+        # memoria/tiempo antes de simular; si no cabe se degrada (oráculo, precisión, método)
+        with stage("preflight"):
+            plan = plan_simulation(lambda o: new_circuit(o, both_signs=both_signs, sign=sign).num_qubits,
+                                   oracle, memory_budget,
+                                   circuit_bytes_for=lambda o: oracle_bytes(o, 12 + both_signs, iterations))
+        print(plan.report())
+        oracle = plan.oracle
+        note(plan={"oracle": oracle, "method": plan.method, "precision": plan.precision,
+                   "qubits": plan.n_qubits})
+        profile = load_profile("v8", oracle, iterations)  # python -m qreality.autotune
+        if profile:
+            print(f"[autotune] perfil: {profile}")
+        sim = plan.simulator(**profile)
+        key = None
+        if use_cache:
+            key = {"variant": "v8", "source": file_digest(__file__), "sign": sign, "oracle": oracle,
+                   "mcx_mode": mcx_mode, "both_signs": both_signs}
+        tqc = build_transpiled(iterations, sim, opt_level, oracle=oracle, cache_inputs=key,
+                               measure=not sampling, mcx_mode=mcx_mode, both_signs=both_signs,
+                               sign=sign)
+        if use_cache:
+            print(transpile_cache().report())
+        if mcx_mode == "vchain" and oracle == "ancilla":
+            print(vchain.compare(build_iteration(oracle, both_signs=both_signs, sign=sign),
+                                 build_iteration(oracle, mcx_mode=mcx_mode, both_signs=both_signs,
+                                                 sign=sign),
+                                 opt_level))
+        print(estimate(tqc, plan).report())
+        if sampling:
+            # P(x) una sola vez + multinomial: coste independiente de shots
+            with stage("simulate"):
+                probs = aer_probabilities(tqc, sim)
+            with stage("sampling"):
+                counts = sample_probabilities(probs, shots)
+        else:
+            with stage("simulate"):
+                res = sim.run(tqc, shots=shots).result()
+            aer_result(res)
+            counts = res.data(0)["counts"]  # claves hex, sin formatear strings
+    else:
+        raise ValueError(f"backend desconocido: {backend!r} (usa 'aer', 'analytic', 'numpy' o 'symmetric')")
+
+    # conteos -> arrays (idx, cnt); clasificación con la máscara, top-k con argpartition
+    with stage("postprocess"):
+        idx, cnt = counts_to_arrays(counts)
+        if both_signs:
+            rows = branches.summary(idx, cnt, specs)
+        else:
+            good = good_mask(coherence_spec(sign))
+            top_idx, top_cnt = top_k(idx, cnt, 10)
+            top10: List[Tuple[str, int]] = [(measured_string(x, 12), c)
+                                            for x, c in zip(top_idx.tolist(), top_cnt.tolist())]
+            good_shots = count_good_shots(idx, cnt, good)
+    if both_signs:
+        note(p_good={branches.label(b): r["p_good"] for b, r in enumerate(rows)})
+        print(branches.report(rows))
+        return
+    note(p_good=good_shots / shots)
     print("TOP10:", top10)
 
-    good_shots = sum(v for k, v in counts.items() if coherent_string_measured(k))
     print(f"Shots coherentes (según C en físico): {good_shots} / {shots} = {good_shots/shots:.6f}")
 
-    for s, c in top10:
-        s_phys = s[::-1]
-        ok = coherent_string_phys(s_phys)
+    for (s, c), s_phys, ok in zip(top10, phys_strings(top_idx, 12), good[top_idx].tolist()):
         print(s, c, "phys=", s_phys, "ok=", ok,
               "parity=", parity_bitstring(s_phys),
               "blocks=", [s_phys[0:4], s_phys[4:8], s_phys[8:12]])
@@ -270,4 +471,14 @@ def run(shots: int = 4096, iterations: int | None = None, opt_level: int = 1) ->
 if __name__ == "__main__":
     SHOTS = 4096
     ITERATIONS = None  # None -> usa k_sugerido automáticamente
-    run(shots=SHOTS, iterations=ITERATIONS, opt_level=1)
+    BACKEND = "aer"  # "analytic" -> 2D exacto; "numpy" -> statevector propio (O(N)/iter); "symmetric" -> órbitas
+    ORACLE = "ancilla"  # "diagonal"/"mcp" -> oráculo sin ancillas (12 qubits)
+    SAMPLING = False  # True -> P(x) una vez (save_probabilities) + multinomial de SHOTS
+    MCX_MODE = "noancilla"  # "vchain" -> MCX grandes sintetizadas con las ancillas libres
+    BOTH_SIGNS = False  # True -> ramas '+' y '-' en la misma ejecución (qubit de signo q[12])
+    K_SWEEP = None  # entero -> barrido P(good) para k=0..K_SWEEP en una simulación
+    if K_SWEEP is not None:
+        sweep(K_SWEEP, oracle=ORACLE)
+    else:
+        run(shots=SHOTS, iterations=ITERATIONS, opt_level=1, backend=BACKEND, oracle=ORACLE,
+            sampling=SAMPLING, mcx_mode=MCX_MODE, both_signs=BOTH_SIGNS)
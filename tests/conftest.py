@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# los tests importan qreality y cargan los scripts desde la raíz del repo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def grover_phases():
+    """Fases de la ejecución por defecto de una variante (v13: última iteración exacta)."""
+    from qreality import variants
+    from qreality.analytic import iteration_phases
+
+    def phases(name):
+        m = variants.load(name)
+        k = variants.default_iterations(name)
+        if hasattr(m, "build_circuit_exact"):
+            phi, var, _, _ = m.last_step_phases(m.count_good_states(), k)
+            return iteration_phases(k, last=(phi, var))
+        return iteration_phases(k)
+
+    return phases
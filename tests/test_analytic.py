@@ -0,0 +1,21 @@
+"""Backend analítico (subespacio 2D good/bad): P(good) ≈ 1 con el k de cada variante."""
+
+import pytest
+
+from qreality import variants
+from qreality.analytic import analytic_counts, p_good
+from qreality.bitmask import count_good, index_from_measured, is_good_index
+
+
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_p_good_close_to_one(name, grover_phases):
+    spec = variants.load(name).coherence_spec()
+    assert p_good(count_good(spec) / (1 << spec.n_bits), grover_phases(name)) == pytest.approx(1.0, abs=1e-4)
+
+
+def test_counts_only_good_states(grover_phases):
+    # v13: fases exactas, P(good) = 1 salvo redondeo
+    spec = variants.load("v13").coherence_spec()
+    counts = analytic_counts(spec, grover_phases("v13"), 4096)
+    assert sum(counts.values()) == 4096
+    assert all(is_good_index(spec, index_from_measured(s)) for s in counts)
@@ -0,0 +1,22 @@
+"""Motor de bitmask: M y k de cada variante y conteo frente al barrido de los 2^n estados."""
+
+import pytest
+
+from qreality import variants
+from qreality.bitmask import count_good, count_good_scan, good_indices, good_indices_scan
+
+# variante -> (M, k)
+EXPECTED = {"v5": (6, 20), "v8": (6, 20), "v10": (6, 20), "v13": (8, 18)}
+
+
+@pytest.mark.parametrize("name", list(EXPECTED))
+def test_m_and_k(name):
+    m = variants.load(name)
+    assert (m.count_good_states(), variants.default_iterations(name)) == EXPECTED[name]
+
+
+@pytest.mark.parametrize("name", list(EXPECTED))
+def test_count_good_matches_scan(name):
+    spec = variants.load(name).coherence_spec()
+    assert count_good(spec) == count_good_scan(spec)
+    assert good_indices(spec).tolist() == good_indices_scan(spec).tolist()
@@ -0,0 +1,81 @@
+"""Ramas ± en una ejecución: oráculo conjunto con qubit de signo y marginales por rama."""
+
+import math
+
+import numpy as np
+import pytest
+
+from qreality import branches, variants
+from qreality.analytic import iteration_phases
+from qreality.bitmask import count_good
+from qreality.postprocess import counts_to_arrays
+
+pytest.importorskip("qiskit")
+
+# variante -> M por rama ('+', '-'); en v8/v10 wt=2 por plano fija la paridad: '-' vacía
+EXPECTED_M = {"v8": (6, 0), "v10": (6, 0), "v13": (8, 8)}
+
+
+def oracle_marks(qc, n_data: int) -> np.ndarray:
+    """
+    Estados de q[0..n_data-1] marcados por el oráculo con ancillas, simulando en la
+    base computacional (X/CX/MCX) hasta la puerta sobre ph y comprobando el uncompute.
+    """
+    x = np.arange(1 << n_data)
+    bits = np.zeros((qc.num_qubits, x.size), dtype=bool)
+    bits[:n_data] = (x >> np.arange(n_data)[:, None]) & 1
+    ph = qc.find_bit(qc.qregs[-1][0]).index
+    marked = None
+    for inst in qc.data:
+        idx = [qc.find_bit(b).index for b in inst.qubits]
+        name = inst.operation.name
+        if name == "h":   # empieza la difusión
+            break
+        if ph in idx:     # fase (MCX a ph en |->, o MCPhase con ph en |1>)
+            marked = bits[[i for i in idx if i != ph]].all(axis=0)
+        elif name == "x":
+            bits[idx[0]] ^= True
+        elif name in ("cx", "ccx", "mcx"):
+            bits[idx[-1]] ^= bits[idx[:-1]].all(axis=0)
+        else:
+            raise AssertionError(f"puerta inesperada en el oráculo: {name}")
+    assert not bits[n_data:].any(), "ancillas sin descomputar"
+    return np.flatnonzero(marked)
+
+
+def _iteration(name: str, both_signs: bool, sign: int | None = None):
+    m = variants.load(name)
+    if hasattr(m, "build_circuit_exact"):
+        return m.build_iteration(math.pi, math.pi, "ancilla", both_signs=both_signs, sign=sign)
+    return m.build_iteration("ancilla", both_signs=both_signs, sign=sign)
+
+
+@pytest.mark.parametrize("name", list(EXPECTED_M))
+def test_joint_oracle_marks_both_branches(name):
+    m = variants.load(name)
+    specs = [m.coherence_spec(s) for s in branches.SIGNS]
+    marks = oracle_marks(_iteration(name, both_signs=True), 13)
+    assert marks.tolist() == sorted(branches.joint_indices(specs).tolist())
+    assert tuple(int(((marks >> 12) == b).sum()) for b in range(2)) == EXPECTED_M[name]
+
+
+@pytest.mark.parametrize("name", list(EXPECTED_M))
+@pytest.mark.parametrize("sign", branches.SIGNS)
+def test_single_branch_oracle(name, sign):
+    # el mismo helper de signo (compute_sign_flag) sin qubit de signo: solo los good de la rama
+    spec = variants.load(name).coherence_spec(sign)
+    marks = oracle_marks(_iteration(name, both_signs=False, sign=sign), 12)
+    assert marks.size == count_good(spec) == EXPECTED_M[name][branches.SIGNS.index(sign)]
+
+
+def test_joint_run_marginals():
+    # v13: fases exactas compartidas (misma M en las dos ramas), P(good | rama) = 1
+    m = variants.load("v13")
+    specs = [m.coherence_spec(s) for s in branches.SIGNS]
+    phi, var, _, _ = m.last_step_phases(8, m.K_FIXED)
+    counts = branches.numpy_counts(specs, iteration_phases(m.K_FIXED, last=(phi, var)), 4000,
+                                   np.random.default_rng(0))
+    rows = branches.summary(*counts_to_arrays(counts), specs)
+    assert sum(r["shots"] for r in rows) == 4000
+    assert all(abs(r["shots"] - 2000) < 200 for r in rows)
+    assert [r["p_good"] for r in rows] == pytest.approx([1.0, 1.0], abs=1e-9)
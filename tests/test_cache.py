@@ -0,0 +1,87 @@
+"""Caché de circuitos transpilados: clave, ida y vuelta QPY en disco y expulsión LRU."""
+
+import pytest
+
+pytest.importorskip("qiskit")
+
+from qiskit import QuantumCircuit  # noqa: E402
+from qiskit.providers.basic_provider import BasicSimulator  # noqa: E402
+
+from qreality import cache  # noqa: E402
+from qreality.cache import TranspileCache  # noqa: E402
+
+INPUTS = {"variant": "v5", "source": "abc", "oracle": "ancilla", "block": "step"}
+
+
+def bell() -> QuantumCircuit:
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.cx(0, 1)
+    return qc
+
+
+def key(inputs=INPUTS, opt_level=1):
+    return TranspileCache.make_key(dict(inputs, opt_level=opt_level), "basic_simulator")
+
+
+def test_key_changes_with_inputs_and_opt_level():
+    base = key()
+    assert key() == base
+    assert key(dict(INPUTS, source="abd")) != base
+    assert key(dict(INPUTS, block="last", phases=(1.0, 0.5))) != key(dict(INPUTS, block="last"))
+    assert key(opt_level=2) != base
+
+
+def test_key_changes_with_package_sources(monkeypatch):
+    base = key()
+    monkeypatch.setattr(cache, "package_digest", lambda: "otro")
+    assert key() != base
+
+
+def test_disk_round_trip(tmp_path):
+    backend = BasicSimulator()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return bell()
+
+    first = TranspileCache(cache_dir=tmp_path).get_or_transpile(INPUTS, build, backend, 1)
+    assert list(tmp_path.glob("*.qpy")) and list(tmp_path.glob("*.json"))
+    assert not list(tmp_path.glob("*.tmp"))
+
+    fresh = TranspileCache(cache_dir=tmp_path)
+    again = fresh.get_or_transpile(INPUTS, build, backend, 1)
+    assert (fresh.hits_disk, fresh.misses, len(builds)) == (1, 0, 1)
+    assert again == first
+
+
+def test_lru_eviction():
+    backend = BasicSimulator()
+    c = TranspileCache(maxsize=2, use_disk=False)
+    for block in ("a", "b", "a", "c"):   # "a" se usa de nuevo: sale "b"
+        c.get_or_transpile(dict(INPUTS, block=block), bell, backend, 1)
+    assert (c.hits_mem, c.misses) == (1, 3)
+    c.get_or_transpile(dict(INPUTS, block="a"), bell, backend, 1)
+    c.get_or_transpile(dict(INPUTS, block="b"), bell, backend, 1)
+    assert (c.hits_mem, c.misses) == (2, 4)
+
+
+def test_last_inputs_only_key_last_block(monkeypatch):
+    from qiskit import ClassicalRegister, QuantumRegister
+
+    from qreality.repeat import assemble_repeated
+
+    def block():
+        qc = QuantumCircuit(QuantumRegister(2, "q"), ClassicalRegister(2, "c"))
+        qc.h(0)
+        return qc
+
+    c = TranspileCache(use_disk=False)
+    monkeypatch.setattr(cache, "_DEFAULT", c)
+    backend = BasicSimulator()
+    for phases in ((1.0, 0.5), (1.1, 0.5)):
+        assemble_repeated(block, block, 3, backend, 1, last_step=block, cache_inputs=INPUTS,
+                          last_inputs={"phases": phases})
+    # prep y step se reutilizan; solo "last" cambia de clave
+    assert (c.misses, c.hits_mem) == (4, 2)
@@ -0,0 +1,39 @@
+"""Puertas de la iteración construida, sin backend: reduce=True y mcx_mode="vchain"."""
+
+import math
+
+import pytest
+
+pytest.importorskip("qiskit")
+
+from qreality import variants, vchain  # noqa: E402
+
+# (tamaño, MCX) de la iteración con oráculo de ancillas: por defecto / vchain
+EXPECTED = {
+    "v5": ((286, 38), (411, 36)),
+    "v8": ((286, 38), (411, 36)),
+    "v10": ((286, 38), (411, 36)),
+    "v13": ((130, 0), (168, 0)),
+}
+
+
+def _iteration(name, **kwargs):
+    m = variants.load(name)
+    if name == "v13":
+        return m.build_iteration(math.pi, math.pi, "ancilla", **kwargs)
+    return m.build_iteration("ancilla", **kwargs)
+
+
+@pytest.mark.parametrize("name", ["v8", "v10"])
+def test_reduce_saves_gates(name):
+    m = variants.load(name)
+    assert m.build_iteration("ancilla", reduce=False).size() - m.build_iteration("ancilla").size() == 26
+
+
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_vchain_counts(name):
+    base, chained = _iteration(name), _iteration(name, mcx_mode="vchain")
+    sizes = tuple((qc.size(), qc.count_ops().get("mcx", 0)) for qc in (base, chained))
+    assert sizes == EXPECTED[name]
+    # las ancillas limpias deben bajar el número de CX en base cx/u
+    assert vchain.cx_depth(chained)[0] < vchain.cx_depth(base)[0]
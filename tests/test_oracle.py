@@ -0,0 +1,46 @@
+"""Oráculo de fase sin ancillas: la fase -1 cae exactamente en los estados de coherent_string_phys."""
+
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("qiskit_aer")
+
+from qiskit import QuantumCircuit, transpile  # noqa: E402
+from qiskit_aer import AerSimulator  # noqa: E402
+
+from qreality import variants  # noqa: E402
+from qreality.bitmask import index_from_phys  # noqa: E402
+from qreality.oracle import ORACLE_METHODS, compile_phase_oracle  # noqa: E402
+
+
+def predicate_mask(m, n_bits: int = 12) -> np.ndarray:
+    mask = np.zeros(1 << n_bits, dtype=bool)
+    for bits in itertools.product("01", repeat=n_bits):
+        s = "".join(bits)
+        mask[index_from_phys(s)] = m.coherent_string_phys(s)
+    return mask
+
+
+def oracle_signs(oracle: QuantumCircuit) -> np.ndarray:
+    """Signo de cada amplitud tras H^n + oráculo (índice x = bit i en q[i])."""
+    n = oracle.num_qubits
+    qc = QuantumCircuit(n)
+    qc.h(range(n))
+    qc.compose(oracle, inplace=True)
+    qc.save_statevector()
+    sim = AerSimulator(method="statevector")
+    psi = np.asarray(sim.run(transpile(qc, sim)).result().get_statevector())
+    return np.sign(psi.real * math.sqrt(1 << n)).round()
+
+
+@pytest.mark.parametrize("method", ORACLE_METHODS)
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_oracle_marks_predicate_states(name, method):
+    m = variants.load(name)
+    mask = predicate_mask(m)
+    for source in (m.coherence_spec(), m.coherent_string_phys):
+        signs = oracle_signs(compile_phase_oracle(source, 12, math.pi, method))
+        assert np.array_equal(signs == -1, mask), source
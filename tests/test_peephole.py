@@ -0,0 +1,23 @@
+"""Puertas por bloque antes/después del pase de mirilla (qreality.peephole.EXPECTED)."""
+
+import pytest
+
+pytest.importorskip("qiskit")
+
+from qreality import peephole, variants  # noqa: E402
+
+
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_block_sizes_match_expected(name):
+    for block, qc in variants.blocks(name).items():
+        assert (qc.size(), peephole.optimize(qc).size()) == peephole.EXPECTED[(name, block)], block
+
+
+@pytest.mark.parametrize("name", ["v5", "v8", "v10"])
+def test_weight_patterns_in_gray_order(name):
+    # 6 patrones de peso 2 en orden Gray: 5 transiciones a distancia 2
+    assert peephole.x_between(variants.load(name)._PATTERNS_W2) == 10
+
+
+def test_check_passes():
+    assert peephole.check(list(variants.VARIANTS))
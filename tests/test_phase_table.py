@@ -0,0 +1,28 @@
+"""qreality.phase_table: la consulta coincide con resolver las fases en el momento."""
+
+import numpy as np
+import pytest
+
+from qreality.phase_table import PhaseTable, build_table
+from qreality.phases import find_last_step_phases
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    return PhaseTable(build_table(tmp_path_factory.mktemp("phases") / "phases.npy", (1, 8), 40))
+
+
+@pytest.mark.parametrize("n", [3, 6, 8])
+def test_lookup_matches_solver(table, n):
+    rng = np.random.default_rng(n)
+    for M, k in zip(rng.integers(1, 2**n, 50), rng.integers(1, 41, 50)):
+        got = table.lookup(n, int(M), int(k))
+        want = find_last_step_phases(int(M) / 2**n, int(k))
+        assert got == pytest.approx(want, abs=1e-12), (n, M, k)
+
+
+def test_infeasible_entries_refined(table):
+    # M = 1 de 2^8 con k = 1: sin solución exacta, la tabla guarda la fase refinada
+    phi, var, p, err = table.lookup(8, 1, 1)
+    assert err > 0
+    assert (phi, var, p, err) == pytest.approx(find_last_step_phases(1 / 2**8, 1), abs=1e-12)
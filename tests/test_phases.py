@@ -0,0 +1,27 @@
+"""Fases exactas de la última iteración (forma cerrada y rejilla)."""
+
+import pytest
+
+from qreality import variants
+from qreality.phases import find_last_step_phases
+
+V13_PHASES = (1.839103417297, 0.538618447582)
+
+
+def test_v13_last_step_phases():
+    phi, var, p, err = variants.load("v13").last_step_phases(8, 18)
+    assert (phi, var) == pytest.approx(V13_PHASES, abs=1e-9)
+    assert p == pytest.approx(1.0, abs=1e-12)
+    assert err < 1e-6
+
+
+def test_closed_form_matches_grid():
+    closed = find_last_step_phases(8 / 4096, 18)
+    grid = find_last_step_phases(8 / 4096, 18, method="grid")
+    assert grid[3] < 1e-9
+    assert closed[2] == pytest.approx(grid[2], abs=1e-12)
+
+
+def test_k17_infeasible():
+    # M/N = 8/4096 con k = 17 no llega a P(good) = 1 (docstring de Q-12_v13)
+    assert find_last_step_phases(8 / 4096, 17)[3] > 1e-3
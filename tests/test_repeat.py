@@ -0,0 +1,76 @@
+"""Ensamblado por bloques (qreality.repeat): costuras entre bloques transpilados."""
+
+import pytest
+
+pytest.importorskip("qiskit")
+
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister, transpile  # noqa: E402
+from qiskit.providers.basic_provider import BasicSimulator  # noqa: E402
+from qiskit.quantum_info import Operator  # noqa: E402
+
+from qreality import variants  # noqa: E402
+from qreality.repeat import assemble_repeated, split_block  # noqa: E402
+
+
+def _new():
+    return QuantumCircuit(QuantumRegister(3, "q"), ClassicalRegister(3, "c"))
+
+
+def _prep():
+    qc = _new()
+    qc.h(range(3))
+    return qc
+
+
+def _step():
+    # X al empezar (como mark_pattern) y H al acabar (como la difusión)
+    qc = _new()
+    qc.x([0, 2])
+    qc.t(1)
+    qc.ccx(0, 1, 2)
+    qc.rz(0.3, 0)
+    qc.cx(0, 1)
+    qc.h(range(3))
+    return qc
+
+
+def _last():
+    qc = _step()
+    qc.s(2)
+    return qc
+
+
+def test_split_block():
+    head, body, tail = split_block(_step())
+    assert dict(head.count_ops()) == {"x": 2, "t": 1}
+    assert dict(body.count_ops()) == {"ccx": 1, "rz": 1, "cx": 1}
+    assert dict(tail.count_ops()) == {"h": 3}
+    # un bloque sin puertas multi-qubit va entero a la cola
+    assert split_block(_prep())[2].size() == 3
+
+
+@pytest.mark.parametrize("last_step", [None, _last])
+def test_assembled_equals_direct(last_step):
+    k = 4
+    direct = _prep()
+    for i in range(k):
+        direct.compose((last_step if last_step and i == k - 1 else _step)(), inplace=True)
+    qc = assemble_repeated(_prep, _step, k, BasicSimulator(), 1, last_step=last_step, measure=False)
+    # == compara también la fase global
+    assert Operator(qc) == Operator(direct)
+
+
+@pytest.mark.parametrize("name", ["v5", "v13"])
+def test_no_overhead_at_seams(name):
+    # las fusiones de 1 qubit entre bloques no se pierden: mismo tamaño que transpilar entero
+    AerSimulator = pytest.importorskip("qiskit_aer").AerSimulator
+
+    m, k, sim = variants.load(name), 3, AerSimulator()
+    if name == "v13":
+        phi, var, _, _ = m.last_step_phases(m.count_good_states(), k)
+        full = m.build_circuit_exact(k, phi, var, oracle="ancilla")
+    else:
+        full = m.build_circuit(k, oracle="ancilla")
+    full.remove_final_measurements()
+    assembled = variants.transpiled(name, k, sim, oracle="ancilla", measure=False)
+    assert assembled.size() <= transpile(full, sim, optimization_level=1).size()
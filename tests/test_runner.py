@@ -0,0 +1,51 @@
+"""Runner de barridos: expansión de la rejilla, signo por argumento y reanudación del JSONL."""
+
+import json
+
+import pytest
+
+from qreality import runner, variants
+from qreality.bitmask import count_good
+
+
+def test_grid_expansion():
+    configs = runner.grid(["v5", "v8"], sign=[1, -1], iterations=[10, 20])
+    # v5 no tiene rama ±: sus dos signos se funden en sign=None
+    assert len(configs) == 2 + 4
+    assert {c["sign"] for c in configs if c["variant"] == "v5"} == {None}
+    assert {(c["sign"], c["iterations"]) for c in configs if c["variant"] == "v8"} == {
+        (1, 10), (1, 20), (-1, 10), (-1, 20)}
+    assert all(c["shots"] == runner.DEFAULTS["shots"] for c in configs)
+
+
+def test_grid_rejects_unknown_axis():
+    with pytest.raises(ValueError):
+        runner.grid(["v5"], qubits=[12])
+
+
+@pytest.mark.parametrize("name", ["v8", "v13"])
+def test_run_config_sign_argument(name):
+    m = variants.load(name)
+    rec = runner.run_config({"variant": name, "sign": -1, "backend": "analytic", "shots": 64})
+    assert rec["error"] is None
+    assert rec["trace"]["M"] == count_good(m.coherence_spec(-1))
+    assert m.SIGN == +1
+
+
+def test_sign_on_unsigned_variant_is_error():
+    rec = runner.run_config({"variant": "v5", "sign": -1, "backend": "analytic"})
+    assert rec["error"] is not None
+
+
+def test_sweep_resumes_from_jsonl(tmp_path):
+    out = tmp_path / "sweep.jsonl"
+    configs = runner.grid(["v5"], iterations=[5, 6], backend=["analytic"], shots=[64])
+    done = runner.run_config(configs[0])
+    with open(out, "w") as f:
+        f.write(json.dumps(done, default=str) + "\n")
+        f.write('{"config": {"variant": "v5"')   # línea cortada por una interrupción
+
+    recs = list(runner.sweep(configs, str(out), workers=1, verbose=False))
+    assert [r["config"]["iterations"] for r in recs] == [6]
+    assert runner.completed(str(out)) == {runner.config_key(c) for c in configs}
+    assert list(runner.sweep(configs, str(out), workers=1, verbose=False)) == []
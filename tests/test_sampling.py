@@ -0,0 +1,54 @@
+"""sampling=True (save_probabilities + multinomial) frente a shots de Aer: mismo formato y distribución."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("qiskit_aer")
+
+from qiskit_aer import AerSimulator  # noqa: E402
+
+from qreality import variants  # noqa: E402
+from qreality.analytic import iteration_phases, p_good  # noqa: E402
+from qreality.bitmask import count_good, good_mask  # noqa: E402
+from qreality.postprocess import count_good_shots, counts_to_arrays  # noqa: E402
+from qreality.sampling import aer_probabilities, sample_probabilities  # noqa: E402
+
+K = 5          # P(good) ≈ 0.17 en v5: distribución no trivial
+SHOTS = 20000
+
+
+@pytest.fixture(scope="module")
+def v5():
+    spec = variants.load("v5").coherence_spec()
+    sim = AerSimulator(method="statevector")
+    shot_qc = variants.transpiled("v5", K, sim, oracle="diagonal")
+    prob_qc = variants.transpiled("v5", K, sim, oracle="diagonal", measure=False)
+    return spec, sim, shot_qc, prob_qc
+
+
+def test_probabilities_match_analytic(v5):
+    spec, sim, _, prob_qc = v5
+    probs = aer_probabilities(prob_qc, sim)
+    assert probs.shape == (1 << spec.n_bits,)
+    expected = p_good(count_good(spec) / (1 << spec.n_bits), iteration_phases(K))
+    assert probs[good_mask(spec)].sum() == pytest.approx(expected, abs=1e-9)
+
+
+def test_sampled_counts_match_shots(v5):
+    spec, sim, shot_qc, prob_qc = v5
+    shot_counts = sim.run(shot_qc, shots=SHOTS, seed_simulator=7).result().get_counts()
+    probs = aer_probabilities(prob_qc, sim)
+    sampled = sample_probabilities(probs, SHOTS, spec.n_bits, np.random.default_rng(7), as_dict=True)
+
+    # mismo formato que get_counts(): bitstrings de n bits que suman los shots
+    assert {len(k) for k in sampled} == {len(k) for k in shot_counts} == {spec.n_bits}
+    assert sum(sampled.values()) == sum(shot_counts.values()) == SHOTS
+
+    # array del modo sampling y dict de Aer pasan igual por el post-proceso
+    good = good_mask(spec)
+    array_counts = sample_probabilities(probs, SHOTS, rng=np.random.default_rng(7))
+    rates = [count_good_shots(*counts_to_arrays(c), good) / SHOTS
+             for c in (shot_counts, sampled, array_counts)]
+    assert rates[1] == rates[2]   # mismo rng: mismos conteos en array y en dict
+    assert rates[0] == pytest.approx(rates[1], abs=0.015)
+    assert rates[1] == pytest.approx(probs[good].sum(), abs=0.015)
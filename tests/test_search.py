@@ -0,0 +1,32 @@
+"""Cobertura del intervalo de qreality.search.estimate_count (dispositivo analítico)."""
+
+import math
+
+import numpy as np
+import pytest
+
+from qreality import search, variants
+from qreality.bitmask import count_good
+
+TRIALS = 200
+
+
+@pytest.mark.parametrize("name", ["v5", "v13"])
+def test_count_coverage(name):
+    spec = variants.load(name).coherence_spec()
+    device = search.make_device(spec, "analytic")
+    m_true = count_good(spec)
+    rng = np.random.default_rng(1234)
+    runs = [search.estimate_count(device, spec, alpha=0.05, rng=rng) for _ in range(TRIALS)]
+    coverage = sum(r.low <= m_true <= r.high for r in runs) / TRIALS
+    assert coverage >= 0.93
+
+
+def test_full_interval_finds_alias():
+    # k = 51 solo: sin^2(103 theta) tiene picos cada pi/103; la ventana [0, 0.02]
+    # no contiene el theta verdadero, el barrido completo sí
+    theta = math.asin(math.sqrt(8 / 4096))
+    schedule = [(51, 64, round(64 * math.sin(103 * theta) ** 2))]
+    chi2 = 1.96 ** 2
+    _, lo, hi = search._full_interval(schedule, chi2)
+    assert lo <= theta <= hi
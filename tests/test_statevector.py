@@ -0,0 +1,32 @@
+"""Motor statevector NumPy frente al backend analítico."""
+
+import numpy as np
+import pytest
+
+from qreality import variants
+from qreality.analytic import p_good
+from qreality.bitmask import count_good, good_mask
+from qreality.statevector import GroverStatevector, statevector_counts
+
+
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_p_good_matches_analytic(name, grover_phases):
+    spec = variants.load(name).coherence_spec()
+    phases = grover_phases(name)
+    analytic = p_good(count_good(spec) / (1 << spec.n_bits), phases)
+    assert GroverStatevector(good_mask(spec)).evolve(phases).p_good() == pytest.approx(analytic, abs=1e-9)
+
+
+def test_amplitude_uniform_within_good(grover_phases):
+    spec = variants.load("v5").coherence_spec()
+    mask = good_mask(spec)
+    p = GroverStatevector(mask).evolve(grover_phases("v5")).probabilities()
+    assert np.ptp(p[mask]) < 1e-12 and np.ptp(p[~mask]) < 1e-12
+
+
+def test_counts_format(grover_phases):
+    spec = variants.load("v5").coherence_spec()
+    counts = statevector_counts(good_mask(spec), spec.n_bits, grover_phases("v5"), 1000,
+                                rng=np.random.default_rng(0))
+    assert sum(counts.values()) == 1000
+    assert all(len(s) == spec.n_bits and set(s) <= {"0", "1"} for s in counts)
@@ -0,0 +1,33 @@
+"""Backend simétrico (una amplitud por órbita) frente al analítico y al barrido de estados."""
+
+import numpy as np
+import pytest
+
+from qreality import variants
+from qreality.analytic import p_good
+from qreality.bitmask import count_good, index_from_measured, is_good_index
+from qreality.symmetry import OrbitBasis, detect, orbit_count, orbit_statevector, symmetric_counts
+
+
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_orbits_partition_states(name):
+    spec = variants.load(name).coherence_spec()
+    basis = OrbitBasis(detect(spec))
+    assert basis.n_orbits == orbit_count(basis.model)
+    assert basis.size.sum() == 1 << spec.n_bits
+    assert basis.size[basis.good].sum() == count_good(spec)
+
+
+@pytest.mark.parametrize("name", list(variants.VARIANTS))
+def test_p_good_matches_analytic(name, grover_phases):
+    spec = variants.load(name).coherence_spec()
+    phases = grover_phases(name)
+    analytic = p_good(count_good(spec) / (1 << spec.n_bits), phases)
+    assert orbit_statevector(OrbitBasis(detect(spec)), phases).p_good() == pytest.approx(analytic, abs=1e-9)
+
+
+def test_counts_only_good_states(grover_phases):
+    spec = variants.load("v13").coherence_spec()
+    counts = symmetric_counts(spec, grover_phases("v13"), 2000, np.random.default_rng(0))
+    assert sum(counts.values()) == 2000
+    assert all(is_good_index(spec, index_from_measured(s)) for s in counts)